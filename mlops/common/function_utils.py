@@ -1,4 +1,6 @@
 """This module contains a few utility methods that allow us to verify functions work as expected."""
+import json
+
 from azure.identity import DefaultAzureCredential
 from azure.mgmt.web import WebSiteManagementClient
 
@@ -10,6 +12,10 @@ def get_app_settings(config: dict, index_name: str):
     settings_dict["AZURE_OPENAI_API_VERSION"] = config.aoai_config["aoai_api_version"]
     settings_dict["AZURE_OPENAI_EMBEDDING_DEPLOYMENT"] = config.aoai_config["aoai_embedding_model_deployment"]
     settings_dict["AZURE_OPENAI_ENDPOINT"] = config.aoai_config["aoai_api_base"]
+    # Optional list of embedding deployments sharing the indexing load
+    embedding_endpoints = config.aoai_config.get("aoai_embedding_endpoints")
+    if embedding_endpoints:
+        settings_dict["AZURE_OPENAI_EMBEDDING_ENDPOINTS"] = json.dumps(embedding_endpoints)
     settings_dict["AZURE_SEARCH_ENDPOINT"] = config.acs_config["acs_api_base"]
 
     settings_dict["AZURE_SEARCH_API_KEY"] = config.acs_config["acs_api_key"]
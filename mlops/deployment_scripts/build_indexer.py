@@ -211,6 +211,12 @@ def main():
         default=False,
         help="allows to use functions from production slot",
     )
+    parser.add_argument(
+        "--fused_skill",
+        action="store_true",
+        default=False,
+        help="use a single skill that chunks documents and generates embeddings in one pass",
+    )
     args = parser.parse_args()
 
     # initialize parameters from config.yaml
@@ -284,16 +290,24 @@ def main():
     else:
         slot_name = None
 
+    # The fused skillset calls a single function instead of chaining Chunk and Vector_Embed
+    if args.fused_skill:
+        skillset_file = acs_config["acs_document_fused_skillset_file"]
+        skillset_function_names = func_config["fused_function_names"]
+    else:
+        skillset_file = acs_config["acs_document_skillset_file"]
+        skillset_function_names = func_config["function_names"]
+
     # Create full document Skillset
     document_skillset = _generate_skillset(
         skillset_name,
-        acs_config["acs_document_skillset_file"],
+        skillset_file,
         credential,
         sub_config["subscription_id"],
         sub_config["resource_group_name"],
         index_name,
         func_config["function_app_name"],
-        func_config["function_names"],
+        skillset_function_names,
         slot_name
     )
 
@@ -6,7 +6,7 @@ creating any kind of indexes and skillsets. This script is a part of DevOps pipe
 """
 
 import argparse
-from src.skills_tests import test_chunker, test_embedder
+from src.skills_tests import test_chunker, test_embedder, test_chunk_embedder
 from mlops.common.config_utils import MLOpsConfig
 from mlops.common.naming_utils import generate_slot_name
 from mlops.common.function_utils import get_function_key
@@ -45,6 +45,8 @@ def _verify_function_works(
         return test_chunker(url, headers)
     elif function_name == "Vector_Embed":
         return test_embedder(url, headers)
+    elif function_name == "Chunk_Embed":
+        return test_chunk_embedder(url, headers)
     else:
         return True
 
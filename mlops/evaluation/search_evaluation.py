@@ -4,23 +4,36 @@ import os
 
 import argparse
 from dotenv import load_dotenv
-from azure.ai.evaluation import evaluate
 from src.evaluation.evaluators.search.reciprocal_rank import ReciprocalRankEvaluator
 from src.evaluation.evaluators.search.recall_at_k import RecallAtKEvaluator
 from src.evaluation.evaluators.search.precision_at_k import PrecisionAtKEvaluator
 from src.evaluation.evaluators.search.f1_at_k import F1AtKEvaluator
 from src.evaluation.evaluators.search.average_precision import AveragePrecisionEvaluator
+from src.evaluation.evaluators.search.gains import NeighborPageGain
+from src.evaluation.evaluators.search.map_at_k import MAPAtKEvaluator
+from src.evaluation.evaluators.search.ndcg_at_k import NDCGAtKEvaluator
+from src.evaluation.local_evaluation import evaluate_locally
 from src.evaluation.targets.search_evaluation_target import SearchEvaluationTarget
 from mlops.common.naming_utils import generate_experiment_name, generate_index_name
 
 
-def main(index_name: str, semantic_config: str, data_path: str):
+def main(
+    index_name: str,
+    semantic_config: str,
+    data_path: str,
+    local: bool = False,
+    output_path: str = "evaluation_results",
+    max_workers: int = None,
+):
     """Run evaluation for the given search index.
 
     Args:
         index_name (str): search index name
         semantic_config (str): semantic configuration name
         data_path (str): path to the ground truth data
+        local (bool): evaluate locally and write the results to `output_path` instead of an AI Studio project
+        output_path (str): folder of the local results, a subfolder is created for the experiment
+        max_workers (int): number of processes computing the metrics of a local evaluation
     """
     experiment_name = generate_experiment_name(index_name)
 
@@ -56,9 +69,12 @@ def main(index_name: str, semantic_config: str, data_path: str):
         "F1-score@10": F1AtKEvaluator(k=10),
         "AveragePrecision": AveragePrecisionEvaluator(),
         "ReciprocalRank": ReciprocalRankEvaluator(),
+        # Graded metrics, giving partial credit to the pages next to a ground truth page
+        "NDCG@10": NDCGAtKEvaluator(k=10, gain=NeighborPageGain()),
+        "MAP@10": MAPAtKEvaluator(k=10, gain=NeighborPageGain()),
     }
 
-    # Setup evaluator inputs (__call__ function arguments)
+    # Setup evaluator inputs (__call__ function arguments), shared by all the evaluators
     evaluators_config = {
         "default": {
             "column_mapping": {
@@ -68,6 +84,23 @@ def main(index_name: str, semantic_config: str, data_path: str):
         }
     }
 
+    if local:
+        results = evaluate_locally(
+            data=data_path,
+            evaluators=evaluators,
+            evaluator_config=evaluators_config,
+            target=target,
+            output_path=os.path.join(output_path, experiment_name),
+            max_workers=max_workers,
+        )
+        for name, value in sorted(results["metrics"].items()):
+            print(f"{name}: {value:.4f}")
+        print(f"Results of {results['rows']} rows written to {results['rows_path']}")
+        return
+
+    # The hosted evaluation needs azure-ai-evaluation, which the local evaluation does not
+    from azure.ai.evaluation import evaluate
+
     # Run evaluations
     results = evaluate(
         evaluation_name=experiment_name,
@@ -104,6 +137,23 @@ if __name__ == "__main__":
         required=True,
         help="Name of the semantic configuration to use",
     )
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="Evaluate locally and write the results to files instead of uploading them to AI Studio",
+    )
+    parser.add_argument(
+        "--output_path",
+        type=str,
+        default="evaluation_results",
+        help="Folder of the results of a local evaluation",
+    )
+    parser.add_argument(
+        "--max_workers",
+        type=int,
+        required=False,
+        help="Number of processes computing the metrics of a local evaluation, 0 for the current process",
+    )
     args = parser.parse_args()
 
     load_dotenv()
@@ -111,4 +161,4 @@ if __name__ == "__main__":
     if not args.index_name:
         args.index_name = generate_index_name()
 
-    main(args.index_name, args.semantic_config, args.gt_path)
+    main(args.index_name, args.semantic_config, args.gt_path, args.local, args.output_path, args.max_workers)
@@ -3,98 +3,265 @@ import os
 import logging
 import json
 import jsonschema
-from azure.identity import DefaultAzureCredential
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.document_loaders import PyPDFLoader
+from common.schema import get_request_validator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from azure.core import MatchConditions
 
-from azure.storage.blob import BlobServiceClient
+from common.clients import get_container_client
+from common.deadline import Deadline, DeadlineExceededError
+from common.memory import start_memory_tracing, trace_peak_memory
+from common.serialization import dumps
+from common.tokenizer import TOKENIZER_ENCODING, count_tokens
+from Chunk.chunk_record import ChunkRecord
+from Chunk.near_duplicates import NEAR_DUPLICATE_MODE, remove_near_duplicates
+from Chunk.pdf_loader import Page, stream_pdf_pages
+from Chunk.text_splitter import RecursiveTextSplitter
+from Chunk.chunk_cache import create_chunk_cache_from_environment, make_cache_key
 
 
 REQUEST_SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "request_schema.json")
 
+# Maximum number of records of a single request that are downloaded and parsed at the same time
+MAX_CONCURRENCY = int(os.environ.get("CHUNK_MAX_CONCURRENCY", 4))
+
+# Unit of the size and overlap of the chunks: 'characters', or 'tokens' of the embedding model
+CHUNK_SIZE_UNITS = ("characters", "tokens")
+CHUNK_SIZE_UNIT = os.environ.get("CHUNK_SIZE_UNIT", "characters").lower()
+if CHUNK_SIZE_UNIT not in CHUNK_SIZE_UNITS:
+    raise ValueError(f"Unknown CHUNK_SIZE_UNIT '{CHUNK_SIZE_UNIT}', expected one of {', '.join(CHUNK_SIZE_UNITS)}")
+CHUNK_SIZE = int(os.environ.get("CHUNK_SIZE", 256 if CHUNK_SIZE_UNIT == "tokens" else 1000))
+CHUNK_OVERLAP = int(os.environ.get("CHUNK_OVERLAP", 25 if CHUNK_SIZE_UNIT == "tokens" else 100))
+
+# Prepend the end of the last chunk of a page to the next page, so chunks keep context across page boundaries
+CARRY_PAGE_OVERLAP = os.environ.get("CHUNK_CARRY_PAGE_OVERLAP", "false").lower() == "true"
+
+# Report the peak of the Python memory allocated while every document is chunked
+if os.environ.get("CHUNK_TRACE_MEMORY", "false").lower() == "true":
+    start_memory_tracing()
+
+_chunk_cache = create_chunk_cache_from_environment()
+
 
 def function_chunk(req: func.HttpRequest) -> func.HttpResponse:
     """Divide document into chunks of text."""
     logging.info("Python HTTP trigger function processed a request.")
+    deadline = Deadline()
 
     request = req.get_json()
 
     try:
-        jsonschema.validate(request, schema=_get_request_schema())
+        get_request_validator(REQUEST_SCHEMA_PATH).validate(request)
     except jsonschema.exceptions.ValidationError as e:
         return func.HttpResponse("Invalid request: {0}".format(e), status_code=400)
 
-    values = []
-    for value in request["values"]:
-        record_id = value["recordId"]
-        filename = value["data"]["filename"]
-
-        chunks = _chunk_pdf_file_from_azure2(filename)
+    records = request["values"]
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENCY, len(records)))) as executor:
+        results = list(executor.map(lambda value: _process_record(value, deadline), records))
 
-        values.append(
-            {
-                "recordId": record_id,
-                "data": {"chunks": chunks},
-                "errors": None,
-                "warnings": None,
-            }
-        )
+    if NEAR_DUPLICATE_MODE != "off":
+        results = _remove_near_duplicates_from_results(records, results)
 
-    response_body = {"values": values}
+    # Records are serialized as soon as they are chunked, so the response is assembled from JSON fragments
+    values = [
+        _serialize_record(value["recordId"], chunks_json, errors)
+        for value, (chunks_json, errors) in zip(records, results)
+    ]
+    response_body = '{"values":[' + ",".join(values) + "]}"
 
-    logging.info(f"Python HTTP trigger function created {len(chunks)} chunks.")
+    logging.info(f"Python HTTP trigger function chunked {len(values)} records.")
+    logging.info(f"Chunk cache statistics: {_chunk_cache.get_stats()}")
 
-    response = func.HttpResponse(
-        json.dumps(response_body, default=lambda obj: obj.__dict__)
-    )
+    response = func.HttpResponse(response_body)
     response.headers["Content-Type"] = "application/json"
     return response
 
 
-def _get_request_schema():
-    """Retrieve the request schema from path."""
-    with open(REQUEST_SCHEMA_PATH) as f:
-        schema = json.load(f)
-    return schema
+def _process_record(value: dict, deadline: Optional[Deadline] = None) -> Tuple[str, Optional[List[Dict]]]:
+    """
+    Chunk a single record of the request.
+
+    Failures are reported in the 'errors' field of the record instead of failing the whole request,
+    including records that could not be chunked within the time budget of the request.
+
+    Args:
+        value: a record of the request containing 'recordId' and 'data' fields
+        deadline: the time budget of the request
+
+    Returns:
+        The chunks of the record serialized to a JSON array, and the errors of the record or None
+    """
+    record_id = value["recordId"]
+    filename = value["data"]["filename"]
+
+    try:
+        return _chunk_pdf_file_from_azure2(filename, deadline=deadline), None
+    except Exception as e:
+        if isinstance(e, DeadlineExceededError):
+            logging.warning(f"Skipped {filename} (record {record_id}): {e}")
+        else:
+            logging.exception(f"Failed to chunk {filename} (record {record_id}).")
+        return "[]", [{"message": f"Failed to chunk {filename}: {e}"}]
+
+
+def _remove_near_duplicates_from_results(
+    records: List[dict], results: List[Tuple[str, Optional[List[Dict]]]]
+) -> List[Tuple[str, Optional[List[Dict]]]]:
+    """Flag or drop the near-duplicate chunks of the serialized results of the records."""
+    documents = [
+        (value["data"]["filename"], json.loads(chunks_json) if errors is None else None)
+        for value, (chunks_json, errors) in zip(records, results)
+    ]
+    chunk_lists = remove_near_duplicate_chunks(documents)
+    return [
+        (dumps(chunks) if chunks is not None else chunks_json, errors)
+        for chunks, (chunks_json, errors) in zip(chunk_lists, results)
+    ]
+
+
+def remove_near_duplicate_chunks(documents: Sequence[Tuple[str, Optional[List[Dict]]]]) -> List[Optional[List[Dict]]]:
+    """
+    Flag or drop near-duplicate chunks across the documents of a request, as configured by CHUNK_NEAR_DUPLICATES.
+
+    Args:
+        documents: the filename and the chunks of every document, None for documents that failed
+
+    Returns:
+        The chunks of every document
+    """
+    if NEAR_DUPLICATE_MODE == "off":
+        return [chunks for _, chunks in documents]
+
+    chunk_lists, stats = remove_near_duplicates(documents, NEAR_DUPLICATE_MODE)
+    if stats["near_duplicates"]:
+        action, savings = ("Dropped", "saved") if NEAR_DUPLICATE_MODE == "drop" else ("Flagged", "could be saved")
+        # About 4 characters per token for English text
+        logging.info(
+            f"{action} {stats['near_duplicates']} near-duplicate chunks out of {stats['chunks']} "
+            f"({stats['near_duplicates'] / stats['chunks']:.1%}): {stats['near_duplicates']} index documents and "
+            f"embeddings of {stats['characters']} characters (~{stats['characters'] // 4} tokens) {savings}."
+        )
+    return chunk_lists
+
+
+def _serialize_record(record_id: str, chunks_json: str, errors) -> str:
+    """Serialize a record of the response around an already serialized JSON array of chunks."""
+    return (
+        f'{{"recordId":{dumps(record_id)},"data":{{"chunks":{chunks_json}}},'
+        f'"errors":{dumps(errors)},"warnings":null}}'
+    )
+
+
+def chunk_document(file_name: str, deadline: Optional[Deadline] = None) -> List[Dict]:
+    """
+    Split a PDF file into chunks of text.
+
+    Args:
+        file_name: The name of the PDF file in Azure Blob Storage
+        deadline: The time budget of the request, DeadlineExceededError is raised when it is spent
+
+    Returns:
+        A list of dictionaries with the 'page_content', 'page', 'start' and 'end' of every chunk, and its
+        'token_count' when chunks are sized in tokens
+    """
+    return json.loads(_chunk_pdf_file_from_azure2(file_name, deadline=deadline))
 
 
 def _chunk_pdf_file_from_azure2(
-    file_name: str, chunk_size: int = 1000, overlap_size: int = 100
-):
+    file_name: str,
+    chunk_size: int = CHUNK_SIZE,
+    overlap_size: int = CHUNK_OVERLAP,
+    deadline: Optional[Deadline] = None,
+    size_unit: str = CHUNK_SIZE_UNIT,
+) -> str:
     """
     Split a PDF file into chunks of text.
 
+    Pages are parsed, split and serialized one at a time, so only the current page and the JSON of the
+    chunks produced so far are kept in memory. Chunks are cached by blob version and chunking parameters,
+    so unchanged files are neither downloaded nor parsed again.
+
     Args:
         file_name: The name of the PDF file in Azure Blob Storage
         chunk_size: The size of the chunks
         overlap_size: The size of the overlap between chunks
+        deadline: The time budget of the request, checked before every page so a large file stops
+            with DeadlineExceededError instead of outliving the skill timeout; partial results are not cached
+        size_unit: The unit of the chunk size and overlap, 'tokens' of the embedding model or 'characters'
 
     Returns:
-        A list of Documents, each containing a 'page_content' chunk of text
+        A JSON array of chunks, each containing a 'page_content' chunk of text, its 'page', its 'start' and 'end'
+        offsets in the text of the page and, when chunks are sized in tokens, its 'token_count' for the embedding model
     """
-    account_name = os.environ.get("AZURE_STORAGE_ACCOUNT_NAME")
-    container = os.environ.get("AZURE_STORAGE_CONTAINER_NAME")
-    managed_identity_client_id = os.environ.get("MANAGED_IDENTITY_CLIENT_ID")
+    if size_unit not in CHUNK_SIZE_UNITS:
+        raise ValueError(f"Unknown chunk size unit '{size_unit}', expected one of {', '.join(CHUNK_SIZE_UNITS)}")
+    if deadline is not None:
+        deadline.check(f"{file_name} was chunked")
+    container_client = get_container_client()
 
-    credential = DefaultAzureCredential(managed_identity_client_id=managed_identity_client_id)
+    blob_client = container_client.get_blob_client(blob=file_name)
+    properties = blob_client.get_blob_properties()
+    cache_key = make_cache_key(
+        file_name,
+        properties.etag,
+        properties.content_settings.content_md5,
+        chunk_size=chunk_size,
+        overlap_size=overlap_size,
+        size_unit=size_unit,
+        carry_overlap=CARRY_PAGE_OVERLAP,
+        # Chunks sized in tokens depend on the tokenizer, chunks sized in characters don't
+        encoding=TOKENIZER_ENCODING if size_unit == "tokens" else None,
+    )
+    chunks_json = _chunk_cache.get(cache_key)
+    if chunks_json is not None:
+        logging.info(f"Chunks of {file_name} were found in the cache.")
+        return chunks_json
 
-    blob_service_client = BlobServiceClient(
-        account_url=f"https://{account_name}.blob.core.windows.net",
-        credential=credential)
+    # Chunks are only tokenized when they are sized in tokens, so sizing in characters needs no tokenizer
+    if size_unit == "tokens":
+        text_splitter = RecursiveTextSplitter.from_tokenizer(chunk_size, overlap_size)
+        token_count = count_tokens
+    else:
+        text_splitter = RecursiveTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap_size)
+        token_count = None
 
-    container_client = blob_service_client.get_container_client(container)
+    with trace_peak_memory() as memory_usage:
+        # Make sure the cached chunks belong to the version of the blob the key was built from
+        pages = stream_pdf_pages(
+            blob_client, file_name, etag=properties.etag, match_condition=MatchConditions.IfNotModified
+        )
+        with closing(pages):
+            if deadline is not None:
+                pages = _iter_pages_before(deadline, pages, file_name)
+            chunks = (
+                ChunkRecord(chunk, page.metadata["page"], start, end, token_count(chunk) if token_count else None)
+                for page, chunk, start, end in text_splitter.iter_document_chunks(pages, CARRY_PAGE_OVERLAP)
+            )
+            chunks_json, chunks_count = _serialize_chunks(chunks)
 
-    blob_client = container_client.get_blob_client(blob=file_name)
-    with open(f"/tmp/{file_name}", "wb") as file:
-        file.write(blob_client.download_blob().readall())
+    logging.info(f"Created {chunks_count} chunks for {file_name}, memory usage: {memory_usage or 'not traced'}.")
+    _chunk_cache.put(cache_key, chunks_json)
 
-    loader = PyPDFLoader(f"/tmp/{file_name}")
-    pages = loader.load()
+    return chunks_json
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size, chunk_overlap=overlap_size
-    )
 
-    chunks = text_splitter.split_documents(pages)
+def _iter_pages_before(deadline: Deadline, pages: Iterable[Page], file_name: str) -> Iterator[Page]:
+    """Yield the pages while there is time left, raising DeadlineExceededError once the deadline has passed."""
+    for page in pages:
+        deadline.check(f"{file_name} was chunked")
+        yield page
+
 
-    return chunks
+def _serialize_chunks(chunks: Iterable) -> tuple:
+    """
+    Serialize chunks to a JSON array as they are produced.
+
+    Args:
+        chunks: the chunk records
+
+    Returns:
+        The JSON array and the number of chunks
+    """
+    fragments = [dumps(chunk.to_dict()) for chunk in chunks]
+    return "[" + ",".join(fragments) + "]", len(fragments)
@@ -0,0 +1,114 @@
+"""Content-addressed cache of serialized chunk lists, keyed by blob version and chunking parameters."""
+import hashlib
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+from common.cache_backends import BlobContainerBackend, LocalDirectoryBackend
+from common.lru_cache import SizedLruCache
+
+
+# Bumped whenever the serialized chunk format changes, so stale entries of persistent backends are ignored
+CHUNK_FORMAT_VERSION = 4
+
+
+def make_cache_key(file_name: str, etag: str, content_md5: Optional[bytes], **parameters) -> str:
+    """
+    Build a cache key that changes whenever the blob, the chunking parameters or the chunk format change.
+
+    Args:
+        file_name: The name of the PDF file in Azure Blob Storage
+        etag: The ETag of the blob
+        content_md5: The MD5 hash of the blob content, if known
+        parameters: The chunking parameters, e.g. the size of the chunks and of their overlap, and the
+            tokenizer encoding when the chunks are sized in tokens
+
+    Returns:
+        A hex digest identifying the chunk list
+    """
+    md5 = content_md5.hex() if content_md5 else ""
+    options = "|".join(f"{name}={value}" for name, value in sorted(parameters.items()))
+    raw_key = f"v{CHUNK_FORMAT_VERSION}|{file_name}|{etag}|{md5}|{options}"
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+
+class ChunkCache:
+    """
+    Two-level cache of chunk lists, stored as the JSON arrays returned by the skill.
+
+    The first level is an in-process LRU capped by the total size of the serialized values.
+    The second level is an optional persistent backend shared between instances.
+    """
+
+    def __init__(self, max_bytes: int, backend=None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: the maximum total size of the values kept in memory
+            backend: an optional persistent backend with `get` and `put` methods
+        """
+        self.backend = backend
+        self._memory = SizedLruCache(max_bytes)
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "backend_hits": 0, "misses": 0}
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached JSON array of chunks or None."""
+        value = self._memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value.decode("utf-8")
+
+        value = self._get_from_backend(key)
+        if value is None:
+            self._count("misses")
+            return None
+        self._count("backend_hits")
+        self._memory.put(key, value)
+        return value.decode("utf-8")
+
+    def put(self, key: str, chunks_json: str) -> None:
+        """Store the JSON array of chunks in both levels of the cache."""
+        value = chunks_json.encode("utf-8")
+        self._memory.put(key, value)
+        if self.backend is not None:
+            try:
+                self.backend.put(key, value)
+            except Exception:
+                logging.exception(f"Failed to store chunks {key} in the persistent cache.")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return the hit and miss counts of the cache."""
+        with self._lock:
+            return dict(self._stats)
+
+    def _get_from_backend(self, key: str) -> Optional[bytes]:
+        if self.backend is None:
+            return None
+        try:
+            return self.backend.get(key)
+        except Exception:
+            logging.exception(f"Failed to read chunks {key} from the persistent cache.")
+            return None
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self._stats[stat] += 1
+
+
+def create_chunk_cache_from_environment() -> ChunkCache:
+    """
+    Create the chunk cache configured by the app settings.
+
+    CHUNK_CACHE_MAX_BYTES caps the in-memory level, CHUNK_CACHE_DIR enables the local directory backend
+    and CHUNK_CACHE_CONTAINER enables the Blob Storage backend.
+    """
+    max_bytes = int(os.environ.get("CHUNK_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+    backend = None
+    if os.environ.get("CHUNK_CACHE_DIR"):
+        backend = LocalDirectoryBackend(os.environ["CHUNK_CACHE_DIR"])
+    elif os.environ.get("CHUNK_CACHE_CONTAINER"):
+        backend = BlobContainerBackend(os.environ["CHUNK_CACHE_CONTAINER"])
+    return ChunkCache(max_bytes=max_bytes, backend=backend)
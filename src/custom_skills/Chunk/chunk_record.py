@@ -0,0 +1,28 @@
+"""Compact representation of a chunk of text."""
+from typing import Dict, Optional
+
+
+class ChunkRecord:
+    """
+    A chunk of text with the page it comes from, its offsets in the text of that page and its number of tokens.
+
+    `start` is negative when the chunk begins with text carried over from the previous page. `token_count` is
+    None when the chunk was not tokenized, and is then left out of the returned fields.
+    """
+
+    __slots__ = ("page_content", "page", "start", "end", "token_count")
+
+    def __init__(self, page_content: str, page: int, start: int, end: int, token_count: Optional[int] = None):
+        """Create a chunk record."""
+        self.page_content = page_content
+        self.page = page
+        self.start = start
+        self.end = end
+        self.token_count = token_count
+
+    def to_dict(self) -> Dict:
+        """Return the fields of the chunk as they are returned by the skill."""
+        fields = {"page_content": self.page_content, "page": self.page, "start": self.start, "end": self.end}
+        if self.token_count is not None:
+            fields["token_count"] = self.token_count
+        return fields
@@ -0,0 +1,148 @@
+"""Detect near-duplicate chunks with MinHash signatures and locality-sensitive hashing."""
+import os
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# off: keep every chunk, flag: mark near-duplicate chunks, drop: remove near-duplicate chunks
+NEAR_DUPLICATE_MODES = ("off", "flag", "drop")
+NEAR_DUPLICATE_MODE = os.environ.get("CHUNK_NEAR_DUPLICATES", "off").lower()
+if NEAR_DUPLICATE_MODE not in NEAR_DUPLICATE_MODES:
+    raise ValueError(
+        f"Unknown CHUNK_NEAR_DUPLICATES '{NEAR_DUPLICATE_MODE}', expected one of {', '.join(NEAR_DUPLICATE_MODES)}"
+    )
+
+# Minimum estimated Jaccard similarity of the word shingles of two chunks to consider them near duplicates
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get("CHUNK_NEAR_DUPLICATE_THRESHOLD", 0.9))
+if not 0 < NEAR_DUPLICATE_THRESHOLD <= 1:
+    raise ValueError(f"CHUNK_NEAR_DUPLICATE_THRESHOLD must be in (0, 1], got {NEAR_DUPLICATE_THRESHOLD}")
+
+_WORD = re.compile(r"\w+")
+_PRIME = np.uint64(4294967311)  # the smallest prime above 2**32
+
+
+def _choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Return the (bands, rows) split of the signature whose LSH threshold (1/b)^(1/r) is closest to the threshold."""
+    splits = [(bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    return min(splits, key=lambda split: abs((1 / split[0]) ** (1 / split[1]) - threshold))
+
+
+class NearDuplicateDetector:
+    """
+    Index of MinHash signatures of chunks, answering whether a new chunk is a near duplicate of an indexed one.
+
+    Chunks are compared by the Jaccard similarity of their sets of word shingles, estimated with MinHash.
+    Candidates are found with LSH bands and confirmed with the estimated similarity.
+    """
+
+    def __init__(self, threshold: float = NEAR_DUPLICATE_THRESHOLD, num_perm: int = 128, shingle_size: int = 3):
+        """
+        Create an empty index.
+
+        Args:
+            threshold: the minimum estimated Jaccard similarity of near duplicates
+            num_perm: the number of hash functions of the signatures
+            shingle_size: the number of consecutive words of a shingle
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError(f"The near-duplicate threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _choose_bands(num_perm, threshold)
+
+        # Fixed coefficients, so signatures do not depend on the process; small enough not to overflow uint64
+        rng = np.random.RandomState(1)
+        self._a = rng.randint(1, 2 ** 31, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, 2 ** 31, size=num_perm).astype(np.uint64)
+
+        self._signatures: Dict[int, np.ndarray] = {}
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Return the MinHash signature of the text, None if it has no words."""
+        words = _WORD.findall(text.lower())
+        if not words:
+            return None
+        size = min(self.shingle_size, len(words))
+        shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+        hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64)
+        return ((np.outer(hashes, self._a) + self._b) % _PRIME).min(axis=0)
+
+    def find(self, signature: np.ndarray) -> Optional[int]:
+        """Return the id of the most similar indexed chunk at or above the threshold, None if there is none."""
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self._buckets.get((band, key), ()))
+
+        best, best_similarity = None, self.threshold
+        for candidate in sorted(candidates):
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        return best
+
+    def add(self, chunk_id: int, signature: np.ndarray) -> None:
+        """Index the signature of a chunk."""
+        self._signatures[chunk_id] = signature
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[(band, key)].append(chunk_id)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+
+def remove_near_duplicates(
+    documents: Sequence[Tuple[str, Optional[List[Dict]]]], mode: str, threshold: float = NEAR_DUPLICATE_THRESHOLD
+) -> Tuple[List[Optional[List[Dict]]], Dict[str, int]]:
+    """
+    Flag or drop the chunks that are near duplicates of an earlier chunk of the same documents.
+
+    The first chunk of a group of near duplicates is kept and lists the 'duplicates' it stands for,
+    with their filename and page, so the provenance of dropped chunks is not lost. In 'flag' mode the
+    near-duplicate chunks are kept and point to the chunk they duplicate with 'duplicate_of'.
+
+    Args:
+        documents: the filename and the chunks (dictionaries with 'page_content' and 'page') of every document,
+            None for documents that failed
+        mode: 'flag' or 'drop'
+        threshold: the minimum estimated Jaccard similarity of near duplicates
+
+    Returns:
+        The chunks of every document and statistics: the number of chunks, of near duplicates and of their characters
+    """
+    if mode not in NEAR_DUPLICATE_MODES[1:]:
+        raise ValueError(f"Unknown near-duplicate mode '{mode}', expected one of {', '.join(NEAR_DUPLICATE_MODES)}")
+
+    detector = NearDuplicateDetector(threshold)
+    canonical_chunks: List[Tuple[Dict, Dict]] = []
+    stats = {"chunks": 0, "near_duplicates": 0, "characters": 0}
+    results = []
+    for filename, chunks in documents:
+        if chunks is None:
+            results.append(None)
+            continue
+        kept = []
+        for chunk in chunks:
+            stats["chunks"] += 1
+            source = {"filename": filename, "page": chunk["page"]}
+            signature = detector.signature(chunk["page_content"])
+            original = detector.find(signature) if signature is not None else None
+            if original is None:
+                if signature is not None:
+                    detector.add(len(canonical_chunks), signature)
+                    canonical_chunks.append((chunk, source))
+                kept.append(chunk)
+                continue
+
+            stats["near_duplicates"] += 1
+            stats["characters"] += len(chunk["page_content"])
+            canonical, canonical_source = canonical_chunks[original]
+            canonical.setdefault("duplicates", []).append(source)
+            if mode == "flag":
+                chunk["duplicate_of"] = dict(canonical_source)
+                kept.append(chunk)
+        results.append(kept)
+    return results, stats
@@ -0,0 +1,142 @@
+"""Extract the text of the pages of large PDF documents on a process pool."""
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import BinaryIO, Iterator, List, Optional
+
+import pypdf
+
+# Number of worker processes extracting page text, 0 disables the process pool
+PARALLEL_WORKERS = int(os.environ.get("CHUNK_PARALLEL_WORKERS", 0))
+
+# Documents smaller than these thresholds are extracted in the calling thread
+PARALLEL_MIN_BYTES = int(os.environ.get("CHUNK_PARALLEL_MIN_BYTES", 1024 * 1024))
+PARALLEL_MIN_PAGES = int(os.environ.get("CHUNK_PARALLEL_MIN_PAGES", 32))
+
+# Number of consecutive pages extracted by a single task
+PAGES_PER_TASK = int(os.environ.get("CHUNK_PARALLEL_PAGES_PER_TASK", 16))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+class MemoryViewStream(io.RawIOBase):
+    """Read-only, seekable binary stream over a memoryview, e.g. a shared memory block, without copying it."""
+
+    def __init__(self, view: memoryview):
+        """Wrap the memoryview."""
+        self._view = view
+        self._position = 0
+
+    def readable(self) -> bool:
+        """Return True, the stream can be read."""
+        return True
+
+    def seekable(self) -> bool:
+        """Return True, the stream supports random access."""
+        return True
+
+    def readinto(self, buffer) -> int:
+        """Copy the next bytes of the view into the buffer and return their number."""
+        count = max(0, min(len(buffer), len(self._view) - self._position))
+        buffer[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """Move to the given position and return it."""
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def tell(self) -> int:
+        """Return the current position."""
+        return self._position
+
+
+def get_page_extraction_pool(document_size: int) -> Optional[Executor]:
+    """
+    Return the shared process pool if it is enabled and worth using for a document of the given size.
+
+    Args:
+        document_size: the size of the PDF document in bytes
+
+    Returns:
+        The process pool, or None to extract the pages in the calling thread
+    """
+    global _pool
+    if PARALLEL_WORKERS < 1 or document_size < PARALLEL_MIN_BYTES:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # Workers are spawned rather than forked, the function host runs many threads
+            _pool = ProcessPoolExecutor(max_workers=PARALLEL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def iter_page_texts_in_parallel(
+    stream: BinaryIO, page_count: int, executor: Executor, pages_per_task: int = PAGES_PER_TASK
+) -> Iterator[str]:
+    """
+    Extract the text of the pages of a PDF document on a process pool, in page order.
+
+    The document is copied once into a shared memory block that every worker reads in place.
+    Each task parses the document and extracts a range of consecutive pages.
+
+    Args:
+        stream: a seekable binary stream containing the PDF document
+        page_count: the number of pages of the document
+        executor: the process pool
+        pages_per_task: the number of consecutive pages extracted by a single task
+
+    Yields:
+        The text of every page
+    """
+    size = stream.seek(0, io.SEEK_END)
+    stream.seek(0)
+    shared_memory = SharedMemory(create=True, size=max(1, size))
+    futures = []
+    try:
+        offset = 0
+        while offset < size:
+            read = stream.readinto(shared_memory.buf[offset:size])
+            if not read:
+                raise IOError(f"Unexpected end of the PDF stream after {offset} of {size} bytes")
+            offset += read
+
+        for start in range(0, page_count, pages_per_task):
+            stop = min(start + pages_per_task, page_count)
+            futures.append(executor.submit(_extract_page_range, shared_memory.name, size, start, stop))
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+        for future in futures:
+            if not future.cancelled():
+                # Workers must be done with the block before it is removed
+                future.exception()
+        shared_memory.close()
+        shared_memory.unlink()
+
+
+def _extract_page_range(shared_memory_name: str, size: int, start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop) of the PDF document in the shared memory block."""
+    shared_memory = SharedMemory(name=shared_memory_name)
+    try:
+        with shared_memory.buf[:size] as view:
+            reader = pypdf.PdfReader(MemoryViewStream(view))
+            texts = [reader.pages[page_number].extract_text() for page_number in range(start, stop)]
+            # Drop the references to the view before it is released
+            del reader
+        return texts
+    finally:
+        shared_memory.close()
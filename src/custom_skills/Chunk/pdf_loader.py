@@ -0,0 +1,125 @@
+"""Load PDF pages from Azure Blob Storage without a round trip through the local disk."""
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+import pypdf
+
+from Chunk.parallel_extraction import PARALLEL_MIN_PAGES, get_page_extraction_pool, iter_page_texts_in_parallel
+
+# Blobs up to this size stay in memory, bigger ones are spilled to a temporary file
+SPOOL_MAX_SIZE = int(os.environ.get("CHUNK_SPOOL_MAX_SIZE", 64 * 1024 * 1024))
+
+
+@dataclass
+class Page:
+    """The text of a page, with the same 'page_content' and 'metadata' attributes as a langchain Document."""
+
+    page_content: str
+    metadata: Dict = field(default_factory=dict)
+
+
+@dataclass
+class PdfLoadStats:
+    """Statistics collected while loading a single PDF document."""
+
+    file_name: str
+    bytes_read: int = 0
+    download_time: float = 0.0
+    parse_time: float = 0.0
+    pages: int = 0
+
+
+def stream_pdf_pages(
+    blob_client, file_name: str, spool_max_size: int = SPOOL_MAX_SIZE, **download_kwargs
+) -> Iterator[Page]:
+    """
+    Download a PDF blob into a bounded buffer and yield its pages one at a time.
+
+    The blob is streamed into a spooled buffer that lives in memory until it grows beyond
+    `spool_max_size` bytes and is transparently moved to a temporary file after that.
+    The text of a page is only extracted when the consumer asks for it, so at most one page is
+    held by the loader at any time. Large documents are extracted on a process pool when it is
+    enabled (see `Chunk.parallel_extraction`). The buffer is released (and the temporary file removed)
+    when the generator is exhausted or closed.
+
+    Args:
+        blob_client: The BlobClient pointing to the PDF document
+        file_name: The name of the PDF file in Azure Blob Storage
+        spool_max_size: The maximum number of bytes to keep in memory
+        download_kwargs: Extra keyword arguments for `download_blob`, e.g. access conditions
+
+    Yields:
+        Pages, one per page, with 'source' and 'page' metadata
+    """
+    stats = PdfLoadStats(file_name=file_name)
+
+    with tempfile.SpooledTemporaryFile(max_size=spool_max_size) as buffer:
+        start = time.perf_counter()
+        stats.bytes_read = blob_client.download_blob(**download_kwargs).readinto(buffer)
+        stats.download_time = time.perf_counter() - start
+
+        buffer.seek(0)
+        executor = get_page_extraction_pool(stats.bytes_read)
+        yield from iter_pdf_pages(buffer, file_name, stats, executor)
+
+    logging.info(
+        f"Loaded {stats.file_name}: {stats.bytes_read} bytes read in {stats.download_time:.3f}s, "
+        f"{stats.pages} pages parsed in {stats.parse_time:.3f}s."
+    )
+
+
+def iter_pdf_pages(
+    stream: BinaryIO, file_name: str, stats: Optional[PdfLoadStats] = None, executor: Optional[Executor] = None
+) -> Iterator[Page]:
+    """
+    Extract the text of the pages of a PDF stream lazily, in page order.
+
+    Args:
+        stream: A seekable binary stream containing the PDF document
+        file_name: The name of the PDF file to store in the 'source' metadata
+        stats: Optional statistics updated with the number of pages and the parsing time
+        executor: Optional process pool used for documents with at least `PARALLEL_MIN_PAGES` pages
+
+    Yields:
+        Pages, one per page
+    """
+    start = time.perf_counter()
+    reader = pypdf.PdfReader(stream)
+    page_count = len(reader.pages)
+    if executor is not None and page_count >= PARALLEL_MIN_PAGES:
+        texts = iter_page_texts_in_parallel(stream, page_count, executor)
+    else:
+        texts = (page.extract_text() for page in reader.pages)
+    elapsed = time.perf_counter() - start
+
+    try:
+        for page_number in range(page_count):
+            start = time.perf_counter()
+            text = next(texts)
+            elapsed += time.perf_counter() - start
+            if stats is not None:
+                stats.pages += 1
+                stats.parse_time = elapsed
+            yield Page(page_content=text, metadata={"source": file_name, "page": page_number})
+    finally:
+        # Release the shared memory of the process pool when the consumer stops early
+        texts.close()
+
+
+def parse_pdf_pages(stream: BinaryIO, file_name: str) -> List[Page]:
+    """
+    Extract the text of every page from a PDF stream.
+
+    Args:
+        stream: A seekable binary stream containing the PDF document
+        file_name: The name of the PDF file to store in the 'source' metadata
+
+    Returns:
+        A list of Pages, one per page
+    """
+    return list(iter_pdf_pages(stream, file_name))
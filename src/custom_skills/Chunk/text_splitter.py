@@ -0,0 +1,239 @@
+"""A dependency-light recursive text splitter working on offsets into the original text."""
+import re
+from collections import deque
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+# The first character of every word
+_WORD_START = re.compile(r"(?<!\S)\S")
+
+# A piece of the text: start offset, end offset and length
+_Piece = Tuple[int, int, int]
+
+
+class RecursiveTextSplitter:
+    """
+    Split text recursively by a list of separators, like langchain's `RecursiveCharacterTextSplitter`.
+
+    The output is the same as `RecursiveCharacterTextSplitter` with the default `keep_separator=True`
+    and literal (non-regex) separators. Instead of copying the text on every level of recursion, the
+    splitter works with (start, end) offsets into the original text and only slices the final chunks.
+
+    The size of the pieces is measured in characters by default. When a `length_function` is given
+    (e.g. a tokenizer), the sizes are measured with it, like `RecursiveCharacterTextSplitter.from_tiktoken_encoder`.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 100,
+        separators: Optional[Sequence[str]] = None,
+        length_function: Optional[Callable[[str], int]] = None,
+    ):
+        """
+        Create a new splitter.
+
+        Args:
+            chunk_size: the maximum size of a chunk
+            chunk_overlap: the maximum size of the overlap between consecutive chunks
+            separators: the separators to try, in order of preference
+            length_function: a function measuring the size of a text, the number of characters if None
+        """
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size ({chunk_size}), should be smaller."
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = list(separators) if separators else DEFAULT_SEPARATORS
+        self.length_function = length_function
+
+    @classmethod
+    def from_tokenizer(
+        cls, chunk_size: int, chunk_overlap: int, separators: Optional[Sequence[str]] = None
+    ) -> "RecursiveTextSplitter":
+        """Create a splitter measuring the size of the chunks in tokens of the embedding model."""
+        from common.tokenizer import count_tokens
+
+        return cls(chunk_size, chunk_overlap, separators, length_function=count_tokens)
+
+    def split_text(self, text: str) -> List[str]:
+        """Split the text into chunks."""
+        return [text[start:end] for start, end in self.split_text_with_offsets(text)]
+
+    def split_text_with_offsets(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Split the text into chunks.
+
+        Args:
+            text: the text to split
+
+        Returns:
+            The (start, end) offsets of the chunks in the text
+        """
+        return self._split(text, 0, len(text), self.separators)
+
+    def split_documents(self, documents: Iterable) -> List:
+        """
+        Split documents with 'page_content' and 'metadata' attributes (e.g. `Chunk.pdf_loader.Page`).
+
+        Args:
+            documents: the documents to split
+
+        Returns:
+            A list of documents of the same type, one per chunk, with a copy of the metadata of their source
+        """
+        chunks = []
+        for document in documents:
+            text = document.page_content
+            for start, end in self.split_text_with_offsets(text):
+                chunks.append(document.__class__(page_content=text[start:end], metadata=dict(document.metadata)))
+        return chunks
+
+    def iter_split_documents(self, documents: Iterable, carry_overlap: bool = False) -> Iterator:
+        """
+        Split documents lazily, one document at a time, e.g. the pages of a PDF file as they are parsed.
+
+        Args:
+            documents: the documents to split, consumed one at a time
+            carry_overlap: whether the end of the last chunk of a document (up to `chunk_overlap`, cut at a word
+                boundary) is prepended to the next document, so chunks starting at a page boundary keep the context
+                of the previous page
+
+        Yields:
+            Documents of the same type, one per chunk, with a copy of the metadata of their source
+        """
+        for document, chunk, _, _ in self.iter_document_chunks(documents, carry_overlap):
+            yield document.__class__(page_content=chunk, metadata=dict(document.metadata))
+
+    def iter_document_chunks(
+        self, documents: Iterable, carry_overlap: bool = False
+    ) -> Iterator[Tuple[Any, str, int, int]]:
+        """
+        Split documents lazily and yield every chunk with its source document and offsets.
+
+        Args:
+            documents: the documents to split, consumed one at a time
+            carry_overlap: whether the end of the last chunk of a document is prepended to the next document
+
+        Yields:
+            The source document, the chunk of text and its (start, end) offsets in the 'page_content' of the
+            document. The start is negative when the chunk begins with text carried over from the previous document.
+        """
+        carry = ""
+        for document in documents:
+            if not document.page_content.strip():
+                continue
+            prefix = carry + "\n" if carry else ""
+            text = prefix + document.page_content
+            last_chunk = None
+            for start, end in self.split_text_with_offsets(text):
+                last_chunk = (start, end)
+                yield document, text[start:end], start - len(prefix), end - len(prefix)
+            if carry_overlap and last_chunk is not None:
+                carry = self._overlap_tail(text, *last_chunk)
+
+    def _overlap_tail(self, text: str, start: int, end: int) -> str:
+        """Return the longest suffix of text[start:end] that starts at a word and fits in the chunk overlap."""
+        tail = ""
+        if self.chunk_overlap == 0:
+            return tail
+        word_starts = [match.start() for match in _WORD_START.finditer(text, start, end)]
+        for word_start in reversed(word_starts):
+            if self._length(text, word_start, end) > self.chunk_overlap:
+                break
+            tail = text[word_start:end]
+        return tail
+
+    def _length(self, text: str, start: int, end: int) -> int:
+        if self.length_function is None:
+            return end - start
+        return self.length_function(text[start:end])
+
+    def _split(self, text: str, start: int, end: int, separators: Sequence[str]) -> List[Tuple[int, int]]:
+        if self.length_function is None and end - start < self.chunk_size:
+            # Every piece would be shorter than a chunk and all of them would be merged into a single chunk
+            chunk = _strip(text, start, end)
+            return [chunk] if chunk is not None else []
+
+        separator, remaining_separators = self._select_separator(text, start, end, separators)
+
+        chunks = []
+        good_pieces: List[_Piece] = []
+        for piece_start, piece_end in _split_offsets(text, start, end, separator):
+            length = self._length(text, piece_start, piece_end)
+            if length < self.chunk_size:
+                good_pieces.append((piece_start, piece_end, length))
+                continue
+            if good_pieces:
+                chunks.extend(self._merge(text, good_pieces))
+                good_pieces = []
+            if remaining_separators:
+                chunks.extend(self._split(text, piece_start, piece_end, remaining_separators))
+            else:
+                chunks.append((piece_start, piece_end))
+        if good_pieces:
+            chunks.extend(self._merge(text, good_pieces))
+        return chunks
+
+    @staticmethod
+    def _select_separator(
+        text: str, start: int, end: int, separators: Sequence[str]
+    ) -> Tuple[str, Sequence[str]]:
+        """Return the first separator found in the text and the separators that come after it."""
+        for i, separator in enumerate(separators):
+            if separator == "":
+                return separator, []
+            if text.find(separator, start, end) != -1:
+                return separator, separators[i + 1:]
+        return separators[-1], []
+
+    def _merge(self, text: str, pieces: List[_Piece]) -> List[Tuple[int, int]]:
+        """Combine consecutive pieces into chunks of up to `chunk_size`, overlapping by up to `chunk_overlap`."""
+        chunks = []
+        current: "deque[_Piece]" = deque()
+        total = 0
+        for piece in pieces:
+            length = piece[2]
+            if total + length > self.chunk_size and current:
+                chunk = _strip(text, current[0][0], current[-1][1])
+                if chunk is not None:
+                    chunks.append(chunk)
+                while total > self.chunk_overlap or (total + length > self.chunk_size and total > 0):
+                    total -= current.popleft()[2]
+            current.append(piece)
+            total += length
+        if current:
+            chunk = _strip(text, current[0][0], current[-1][1])
+            if chunk is not None:
+                chunks.append(chunk)
+        return chunks
+
+
+def _split_offsets(text: str, start: int, end: int, separator: str) -> List[Tuple[int, int]]:
+    """Split text[start:end] before every occurrence of the separator, keeping the separator in the pieces."""
+    if separator == "":
+        return [(i, i + 1) for i in range(start, end)]
+
+    pieces = []
+    piece_start = start
+    position = text.find(separator, start, end)
+    while position != -1:
+        if position > piece_start:
+            pieces.append((piece_start, position))
+        piece_start = position
+        position = text.find(separator, position + len(separator), end)
+    if end > piece_start:
+        pieces.append((piece_start, end))
+    return pieces
+
+
+def _strip(text: str, start: int, end: int) -> Optional[Tuple[int, int]]:
+    """Return the offsets of text[start:end] without leading and trailing whitespace, None if nothing is left."""
+    chunk = text[start:end]
+    stripped = chunk.lstrip()
+    if not stripped:
+        return None
+    start += len(chunk) - len(stripped)
+    return start, start + len(stripped.rstrip())
@@ -0,0 +1,136 @@
+import azure.functions as func
+import asyncio
+import os
+import logging
+import jsonschema
+from typing import List, Optional, Union
+from common.deadline import Deadline, DeadlineExceededError
+from common.schema import get_request_validator
+from common.serialization import dumps
+from Chunk import MAX_CONCURRENCY, chunk_document, remove_near_duplicate_chunks
+from VectorEmbed import embed_texts
+from VectorEmbed.encoding import EmbeddingEncoding
+
+REQUEST_SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "request_schema.json")
+
+
+async def function_chunk_embed(req: func.HttpRequest) -> func.HttpResponse:
+    """Divide documents into chunks of text and generate a vector embedding for every chunk."""
+    logging.info("Python HTTP trigger function processed a request.")
+    deadline = Deadline()
+
+    request = req.get_json()
+
+    try:
+        get_request_validator(REQUEST_SCHEMA_PATH).validate(request)
+    except jsonschema.exceptions.ValidationError as e:
+        return func.HttpResponse("Invalid request: {0}".format(e), status_code=400)
+
+    try:
+        encoding = EmbeddingEncoding.from_headers(req.headers)
+    except ValueError as e:
+        return func.HttpResponse("Invalid request: {0}".format(e), status_code=400)
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    values = await asyncio.gather(*[_chunk_record(value, semaphore, deadline) for value in request["values"]])
+
+    # Near-duplicate chunks are flagged or dropped before they are embedded
+    documents = [
+        (value["data"]["filename"], result["data"]["chunks"] if result["errors"] is None else None)
+        for value, result in zip(request["values"], values)
+    ]
+    for result, chunks in zip(values, remove_near_duplicate_chunks(documents)):
+        if chunks is not None:
+            result["data"]["chunks"] = chunks
+
+    # Embed the chunks of all the documents together to fill the embedding batches
+    chunks = [chunk for value in values for chunk in value["data"]["chunks"]]
+    embeddings = iter(
+        await embed_texts(
+            [chunk["page_content"] for chunk in chunks], deadline, [chunk.get("token_count") for chunk in chunks]
+        )
+    )
+    chunks_count = 0
+    for value in values:
+        chunks_count += _add_embeddings(value, [next(embeddings) for _ in value["data"]["chunks"]], encoding)
+
+    response_body = {"values": values}
+
+    logging.info(
+        f"Python HTTP trigger function created {chunks_count} chunks with embeddings for {len(values)} records."
+    )
+
+    response = func.HttpResponse(dumps(response_body))
+    response.headers["Content-Type"] = "application/json"
+    return response
+
+
+async def _chunk_record(value: dict, semaphore: asyncio.Semaphore, deadline: Optional[Deadline] = None) -> dict:
+    """
+    Chunk a single record of the request in a worker thread.
+
+    Failures are reported in the 'errors' field of the record instead of failing the whole request.
+
+    Args:
+        value: a record of the request containing 'recordId' and 'data' fields
+        semaphore: a semaphore limiting the number of documents chunked at the same time
+        deadline: the time budget of the request, records that cannot be chunked in time fail
+
+    Returns:
+        A record of the response in the custom skill format
+    """
+    record_id = value["recordId"]
+    filename = value["data"]["filename"]
+
+    try:
+        async with semaphore:
+            chunks = await asyncio.to_thread(chunk_document, filename, deadline)
+    except Exception as e:
+        if isinstance(e, DeadlineExceededError):
+            logging.warning(f"Skipped {filename} (record {record_id}): {e}")
+        else:
+            logging.exception(f"Failed to chunk {filename} (record {record_id}).")
+        return {
+            "recordId": record_id,
+            "data": {"chunks": []},
+            "errors": [{"message": f"Failed to chunk {filename}: {e}"}],
+            "warnings": None,
+        }
+
+    return {
+        "recordId": record_id,
+        "data": {"chunks": chunks},
+        "errors": None,
+        "warnings": None,
+    }
+
+
+def _add_embeddings(value: dict, embeddings: List[Union[List[float], Exception]], encoding: EmbeddingEncoding) -> int:
+    """
+    Add the embeddings to the chunks of a record of the response.
+
+    A record is only returned with all of its chunks embedded: if any embedding failed, the record
+    carries the error and no chunks, so the indexer retries the document instead of indexing chunks
+    without vectors.
+
+    Args:
+        value: a record of the response
+        embeddings: the embedding, or the exception that prevented it, of every chunk of the record
+        encoding: the encoding of the embeddings
+
+    Returns:
+        The number of chunks of the record with embeddings
+    """
+    failures = [embedding for embedding in embeddings if isinstance(embedding, Exception)]
+    if failures:
+        value["data"]["chunks"] = []
+        value["errors"] = [
+            {"message": f"Failed to generate the embeddings of {len(failures)} of {len(embeddings)} chunks: "
+                        f"{failures[0]}"}
+        ]
+        return 0
+
+    chunks = value["data"]["chunks"]
+    for chunk, fields in zip(chunks, encoding.encode(embeddings)):
+        chunk.update(fields)
+    return len(chunks)
@@ -1,95 +1,290 @@
 import azure.functions as func
+import asyncio
 import os
 import logging
-import json
 import jsonschema
 import openai
-from openai import AzureOpenAI
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_random_exponential,
-    retry_if_exception_type
-)
+from common.schema import get_request_validator
+from common.serialization import dumps
+from collections import Counter
+from typing import Dict, List, Optional, Union
+from common.deadline import Deadline
+from common.tokenizer import count_tokens
+from VectorEmbed.batching import make_batches
+from VectorEmbed.coalescer import EmbeddingCoalescer
+from VectorEmbed.endpoints import EndpointPool
+from VectorEmbed.embedding_cache import create_embedding_cache_from_environment, make_embedding_key
+from VectorEmbed.encoding import EmbeddingEncoding
 
 REQUEST_SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "request_schema.json")
+# Status codes of the service rejecting the input of a batch, e.g. a text longer than the context of the model
+REJECTED_STATUS_CODES = (400, 413, 422)
 
+# Shared by all invocations of the worker, so concurrent requests don't stampede the deployments
+_endpoints = EndpointPool.from_environment()
+_embedding_cache = create_embedding_cache_from_environment()
+_coalescer = EmbeddingCoalescer(lambda texts, token_counts: _embed_batch(texts, token_counts))
 
-def function_vector_embed(req: func.HttpRequest) -> func.HttpResponse:
+
+async def function_vector_embed(req: func.HttpRequest) -> func.HttpResponse:
     """Generate vector embeddings for a list of texts."""
     logging.info("Python HTTP trigger function processed a request.")
+    deadline = Deadline()
 
     request = req.get_json()
 
     try:
-        jsonschema.validate(request, schema=_get_request_schema())
+        get_request_validator(REQUEST_SCHEMA_PATH).validate(request)
     except jsonschema.exceptions.ValidationError as e:
         return func.HttpResponse("Invalid request: {0}".format(e), status_code=400)
 
+    try:
+        encoding = EmbeddingEncoding.from_headers(req.headers)
+    except ValueError as e:
+        return func.HttpResponse("Invalid request: {0}".format(e), status_code=400)
+
+    records = request["values"]
+    chunks = [value["data"]["chunk"] for value in records]
+    embeddings = await embed_texts(
+        [chunk["page_content"] for chunk in chunks], deadline, [chunk.get("token_count") for chunk in chunks]
+    )
+
+    # Records whose embedding failed carry the error, the others are returned as usual
+    succeeded = [index for index, embedding in enumerate(embeddings) if not isinstance(embedding, Exception)]
+    encoded = dict(zip(succeeded, encoding.encode([embeddings[index] for index in succeeded])))
+
     values = []
-    for value in request["values"]:
-        record_id = value["recordId"]
-
-        chunk = value["data"]["chunk"]
-        embedding = _generate_embedding(chunk["page_content"])
-
-        values.append(
-            {
-                "recordId": record_id,
-                "data": {"embedding": embedding, "page": chunk["metadata"]["page"]},
-                "errors": None,
-                "warnings": None,
-            }
-        )
+    for index, (value, chunk) in enumerate(zip(records, chunks)):
+        if index in encoded:
+            data, errors = {**encoded[index], "page": _get_page(chunk)}, None
+        else:
+            data, errors = {}, [{"message": f"Failed to generate the embedding: {embeddings[index]}"}]
+        values.append({"recordId": value["recordId"], "data": data, "errors": errors, "warnings": None})
 
     response_body = {"values": values}
 
     logging.info(
-        f"Python HTTP trigger function created {len(chunk)} vector embeddings."
+        f"Python HTTP trigger function created {len(encoded)} vector embeddings, "
+        f"{len(values) - len(encoded)} records failed."
     )
 
-    response = func.HttpResponse(
-        json.dumps(response_body, default=lambda obj: obj.__dict__)
-    )
+    response = func.HttpResponse(dumps(response_body))
     response.headers["Content-Type"] = "application/json"
     return response
 
 
-def _get_request_schema():
-    """Retrieve the request schema from path."""
-    with open(REQUEST_SCHEMA_PATH) as f:
-        schema = json.load(f)
-    return schema
+def _get_page(chunk: dict) -> Optional[int]:
+    """Return the page of a chunk, from the compact chunk format or from the metadata of legacy Document chunks."""
+    if "page" in chunk:
+        return chunk["page"]
+    return chunk.get("metadata", {}).get("page")
+
+
+async def embed_texts(
+    texts: List[str], deadline: Optional[Deadline] = None, token_counts: Optional[List[Optional[int]]] = None
+) -> List[Union[List[float], Exception]]:
+    """
+    Generate embeddings for a list of texts using as few requests as possible.
+
+    Texts that only differ in formatting (repeated headers, disclaimers, footers) are embedded once and
+    their embedding is shared by every copy. Embeddings are looked up in the cache first and only the
+    missing ones are generated.
+
+    A failed request only fails the texts of its batch: their place in the result holds the exception,
+    so callers can report them per record and return the embeddings that succeeded. When the service rejects
+    the input of a batch, only the texts it rejects fail.
+
+    Args:
+        texts: a list of blocks of text
+        deadline: the time budget of the request, batches that cannot be sent in time fail with DeadlineExceededError
+        token_counts: the number of tokens of every text when already known, e.g. the 'token_count' of the chunks,
+            None for the texts to tokenize
+
+    Returns:
+        A list of embeddings, or of the exceptions that prevented them, in the same order as the texts
+    """
+    deployment = os.environ.get("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+    api_version = os.environ.get("AZURE_OPENAI_API_VERSION")
+    keys = [make_embedding_key(text, deployment, api_version) for text in texts]
+
+    # The first text of every key is embedded on behalf of all the texts sharing it
+    unique_texts: Dict[str, str] = {}
+    known_token_counts: Dict[str, int] = {}
+    for index, (key, text) in enumerate(zip(keys, texts)):
+        if key not in unique_texts:
+            unique_texts[key] = text
+            if token_counts is not None and token_counts[index] is not None:
+                known_token_counts[key] = token_counts[index]
+
+    # The persistent level of the cache may block, keep it off the event loop
+    embeddings = await asyncio.to_thread(_embedding_cache.get_many, list(unique_texts))
+    missing = [key for key in unique_texts if key not in embeddings]
+
+    tokens_saved = 0
+    if missing:
+        # Tokenizing is CPU bound, keep it off the event loop serving the concurrent requests
+        missing_token_counts = await asyncio.to_thread(
+            lambda: [known_token_counts.get(key) or count_tokens(unique_texts[key]) for key in missing]
+        )
+        generated = await _generate_missing_embeddings(
+            [unique_texts[key] for key in missing], missing_token_counts, deadline
+        )
+        embeddings.update(zip(missing, generated))
+        succeeded = {key: embeddings[key] for key in missing if not isinstance(embeddings[key], Exception)}
+        await asyncio.to_thread(_embedding_cache.put_many, succeeded)
+
+        copies = Counter(keys)
+        tokens_saved = sum(count * (copies[key] - 1) for key, count in zip(missing, missing_token_counts))
+
+    if texts:
+        logging.info(
+            f"Embedded {len(unique_texts)} unique texts for {len(texts)} texts "
+            f"(dedup ratio {1 - len(unique_texts) / len(texts):.1%}, {tokens_saved} tokens saved)."
+        )
+    logging.info(f"Embedding cache statistics: {_embedding_cache.get_stats()}")
+    return [embeddings[key] for key in keys]
+
+
+async def _generate_missing_embeddings(
+    texts: List[str], token_counts: List[int], deadline: Optional[Deadline] = None
+) -> List[Union[List[float], Exception]]:
+    """
+    Generate embeddings for texts that are not in the cache.
+
+    Batches are sent concurrently, within the limits enforced by the scheduler. When coalescing is enabled,
+    the texts are batched together with the texts of the concurrent requests of the worker instead.
+
+    Args:
+        texts: a list of blocks of text
+        token_counts: the number of tokens of every text
+        deadline: the time budget of the request
 
+    Returns:
+        A list of embeddings, or of the exceptions that prevented them, in the same order as the texts
+    """
+    if _coalescer.enabled:
+        return await _coalesce_missing_embeddings(texts, token_counts, deadline)
+
+    embeddings = [None] * len(texts)
+    batches = make_batches(token_counts)
+    batches_embeddings = await asyncio.gather(
+        *[
+            _generate_embeddings_before(
+                deadline, [texts[index] for index in batch], [token_counts[index] for index in batch]
+            )
+            for batch in batches
+        ],
+        return_exceptions=True,
+    )
+    for batch, batch_embeddings in zip(batches, batches_embeddings):
+        if isinstance(batch_embeddings, BaseException):
+            if not isinstance(batch_embeddings, Exception):
+                raise batch_embeddings
+            logging.error(f"Failed to embed a batch of {len(batch)} texts: {batch_embeddings!r}")
+            batch_embeddings = [batch_embeddings] * len(batch)
+        for index, embedding in zip(batch, batch_embeddings):
+            embeddings[index] = embedding
+    failed = sum(isinstance(embedding, Exception) for embedding in embeddings)
 
-def _log_attempt_number(retry_state):
-    """Log retry attempt."""
-    row = retry_state.args[0]
-    print(f"Rate Limit Exceeded! Retry Attempt #: {retry_state.attempt_number} | Chunk: {row}")
+    logging.info(f"Generated {len(texts) - failed} embeddings with {len(batches)} requests, {failed} failed.")
+    logging.info(f"Embedding endpoint statistics: {_endpoints.get_stats()}")
+    return embeddings
 
 
-@retry(retry=retry_if_exception_type(openai.RateLimitError),
-       wait=wait_random_exponential(min=1, max=60),
-       stop=stop_after_attempt(10), after=_log_attempt_number)
-def _generate_embedding(text):
+async def _coalesce_missing_embeddings(
+    texts: List[str], token_counts: List[int], deadline: Optional[Deadline] = None
+) -> List[Union[List[float], Exception]]:
+    """Generate embeddings through the queue shared by the concurrent requests of the worker."""
+    if deadline is not None and deadline.expired():
+        return [deadline.exceeded("the embedding request was sent")] * len(texts)
+
+    embeddings = await _coalescer.embed(texts, token_counts, deadline.remaining() if deadline is not None else None)
+    embeddings = [
+        deadline.exceeded("the embeddings were generated") if isinstance(embedding, asyncio.TimeoutError) else embedding
+        for embedding in embeddings
+    ]
+    failed = sum(isinstance(embedding, Exception) for embedding in embeddings)
+    logging.info(f"Generated {len(texts) - failed} embeddings with coalesced requests, {failed} failed.")
+    logging.info(f"Embedding coalescer statistics: {_coalescer.get_stats()}")
+    logging.info(f"Embedding endpoint statistics: {_endpoints.get_stats()}")
+    return embeddings
+
+
+async def _generate_embeddings_before(
+    deadline: Optional[Deadline], texts: List[str], token_counts: List[int]
+) -> List[Union[List[float], Exception]]:
     """
-    Generate embeddings for text.
+    Generate embeddings for a batch of texts, giving up when the deadline passes.
+
+    A batch still waiting for quota or for a response at the deadline is cancelled, so the skill
+    answers before the indexer times out instead of losing the embeddings that succeeded.
+
+    Raises:
+        DeadlineExceededError: if the deadline passes before the embeddings are generated
+    """
+    if deadline is None:
+        return await _embed_batch(texts, token_counts)
+
+    deadline.check("the embedding request was sent")
+    try:
+        return await asyncio.wait_for(_embed_batch(texts, token_counts), deadline.remaining())
+    except asyncio.TimeoutError:
+        raise deadline.exceeded("the embeddings were generated")
+
+
+async def _embed_batch(texts: List[str], token_counts: List[int]) -> List[Union[List[float], Exception]]:
+    """
+    Generate embeddings for a batch of texts, isolating the texts rejected by the service.
+
+    When the service rejects the input of the batch (400, 413 or 422), the batch is split in halves that are
+    sent again, down to single texts, so only the offending texts get the error. Other errors fail the batch.
 
     Args:
-        text: a block of text
+        texts: a list of blocks of text
+        token_counts: the number of tokens of every text
 
     Returns:
-        An object containing an 'contentVector' field
+        A list of embeddings, or of the exceptions of the rejected texts, in the same order as the texts
     """
-    openai_client = AzureOpenAI(
-        api_key=os.environ.get("AZURE_OPENAI_API_KEY"),
-        api_version=os.environ.get("AZURE_OPENAI_API_VERSION"),
-        azure_endpoint=os.environ.get("AZURE_OPENAI_ENDPOINT"),
+    try:
+        return await _generate_embeddings(texts, sum(token_counts))
+    except openai.APIStatusError as e:
+        if len(texts) == 1 or e.status_code not in REJECTED_STATUS_CODES:
+            raise
+        logging.warning(f"The embedding service rejected a batch of {len(texts)} texts ({e!r}), splitting it.")
+
+    middle = len(texts) // 2
+    halves = [(texts[:middle], token_counts[:middle]), (texts[middle:], token_counts[middle:])]
+    halves_embeddings = await asyncio.gather(
+        *[_embed_batch(half_texts, half_token_counts) for half_texts, half_token_counts in halves],
+        return_exceptions=True,
     )
-    embedding_model_deployment = os.environ.get("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+    embeddings = []
+    for (half_texts, _), half_embeddings in zip(halves, halves_embeddings):
+        if isinstance(half_embeddings, BaseException):
+            if not isinstance(half_embeddings, Exception):
+                raise half_embeddings
+            half_embeddings = [half_embeddings] * len(half_texts)
+        embeddings.extend(half_embeddings)
+    return embeddings
 
-    embedding_response = openai_client.embeddings.create(
-        input=text, model=embedding_model_deployment
+
+async def _generate_embeddings(texts: List[str], token_count: int) -> List[List[float]]:
+    """
+    Generate embeddings for a batch of texts with a single request to one of the embedding endpoints.
+
+    Args:
+        texts: a list of blocks of text
+        token_count: the number of tokens of the texts
+
+    Returns:
+        A list of embeddings in the same order as the texts
+    """
+    embedding_response = await _endpoints.run(
+        lambda client, deployment: client.embeddings.with_raw_response.create(input=texts, model=deployment),
+        token_count,
     )
 
-    return embedding_response.data[0].embedding
+    # The service does not guarantee the order of the results, so rely on their indexes
+    data = sorted(embedding_response.data, key=lambda item: item.index)
+    return [item.embedding for item in data]
@@ -0,0 +1,41 @@
+"""Group texts into embedding requests capped by item count and token budget."""
+import os
+from typing import List, Sequence
+
+# Maximum number of texts sent in a single embeddings request, Azure OpenAI API versions before 2023-09-01-preview
+# accept at most 16 inputs per request
+MAX_BATCH_ITEMS = int(os.environ.get("EMBEDDING_BATCH_MAX_ITEMS", 16))
+# Maximum number of tokens sent in a single embeddings request
+MAX_BATCH_TOKENS = int(os.environ.get("EMBEDDING_BATCH_MAX_TOKENS", 32000))
+
+
+def make_batches(
+    token_counts: Sequence[int], max_items: int = MAX_BATCH_ITEMS, max_tokens: int = MAX_BATCH_TOKENS
+) -> List[List[int]]:
+    """
+    Pack texts into batches, keeping the original order.
+
+    A new batch is started whenever adding the next text would exceed either limit.
+    A text that exceeds the token budget on its own is sent in a batch of its own.
+
+    Args:
+        token_counts: the number of tokens of every text
+        max_items: the maximum number of texts per batch
+        max_tokens: the maximum number of tokens per batch
+
+    Returns:
+        A list of batches, each batch being a list of indexes into `token_counts`
+    """
+    batches = []
+    batch = []
+    batch_tokens = 0
+    for index, tokens in enumerate(token_counts):
+        if batch and (len(batch) >= max_items or batch_tokens + tokens > max_tokens):
+            batches.append(batch)
+            batch = []
+            batch_tokens = 0
+        batch.append(index)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
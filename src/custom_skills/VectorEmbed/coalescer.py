@@ -0,0 +1,181 @@
+"""Combine the texts of concurrent requests of a worker into shared embedding batches."""
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Union
+
+from VectorEmbed.batching import MAX_BATCH_ITEMS, MAX_BATCH_TOKENS, make_batches
+
+# Maximum time a text waits for other texts to fill its batch, 0 to send the batches of every request on their own
+MAX_WAIT_MS = float(os.environ.get("EMBEDDING_COALESCE_MAX_WAIT_MS", 0))
+
+
+@dataclass
+class _PendingText:
+    """A text waiting in the queue and the future receiving its embedding."""
+
+    text: str
+    token_count: int
+    future: asyncio.Future
+    submitted: float
+
+
+class EmbeddingCoalescer:
+    """
+    Queue of texts to embed, shared by the concurrent invocations of a worker.
+
+    Invocations submit their texts and wait for their embeddings. A background flusher sends a batch as soon
+    as the queue holds a full one (by item count or tokens), and sends what is left once the oldest text has
+    waited `max_wait` seconds, so no text is delayed by more than `max_wait` by the coalescing. Embeddings and
+    errors are routed back to the futures of the texts, so a failed batch only fails the texts it contains.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[List[str], List[int]], Awaitable[List[Union[List[float], Exception]]]],
+        max_wait: float = MAX_WAIT_MS / 1000,
+        max_items: int = MAX_BATCH_ITEMS,
+        max_tokens: int = MAX_BATCH_TOKENS,
+    ):
+        """
+        Create the queue.
+
+        Args:
+            send: a coroutine function embedding a batch of texts, given the texts and their number of tokens, and
+                returning their embeddings or the exceptions of the texts that failed
+            max_wait: the maximum number of seconds a text waits for other texts, 0 to disable the coalescing
+            max_items: the maximum number of texts per batch
+            max_tokens: the maximum number of tokens per batch
+        """
+        self.send = send
+        self.max_wait = max_wait
+        self.max_items = max_items
+        self.max_tokens = max_tokens
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[_PendingText] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._sending: Set[asyncio.Task] = set()
+        self._stats = {"batches": 0, "texts": 0, "tokens": 0, "submissions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether texts wait for the texts of other requests."""
+        return self.max_wait > 0
+
+    async def embed(
+        self, texts: List[str], token_counts: List[int], timeout: Optional[float] = None
+    ) -> List[Union[List[float], Exception]]:
+        """
+        Embed texts together with the texts submitted by concurrent requests.
+
+        Args:
+            texts: a list of blocks of text
+            token_counts: the number of tokens of every text
+            timeout: the maximum number of seconds to wait for the embeddings
+
+        Returns:
+            A list of embeddings, or of the exceptions that prevented them, in the same order as the texts;
+            texts still waiting at the timeout get an asyncio.TimeoutError and are withdrawn from the queue
+        """
+        if not texts:
+            return []
+        futures = self._submit(texts, token_counts)
+        try:
+            _, waiting = await asyncio.wait(futures, timeout=timeout)
+        except asyncio.CancelledError:
+            for future in futures:
+                future.cancel()
+            raise
+        for future in waiting:
+            future.cancel()
+        return [
+            asyncio.TimeoutError() if future in waiting else future.exception() or future.result()
+            for future in futures
+        ]
+
+    def get_stats(self) -> Dict[str, float]:
+        """Return the number of batches, texts, tokens and submissions, and the average tokens per batch."""
+        stats = dict(self._stats)
+        stats["tokens_per_batch"] = stats["tokens"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def _submit(self, texts: List[str], token_counts: List[int]) -> List[asyncio.Future]:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Texts queued on another event loop can't be awaited any more
+            self._loop, self._pending, self._wakeup, self._flusher = loop, [], asyncio.Event(), None
+
+        now = loop.time()
+        pending = [_PendingText(text, count, loop.create_future(), now) for text, count in zip(texts, token_counts)]
+        self._pending.extend(pending)
+        self._stats["submissions"] += 1
+        self._wakeup.set()
+        if self._flusher is None:
+            self._flusher = loop.create_task(self._flush_loop())
+        return [item.future for item in pending]
+
+    async def _flush_loop(self) -> None:
+        """Send batches until the queue is empty."""
+        try:
+            while self._pending:
+                waited_enough = self._loop.time() >= self._pending[0].submitted + self.max_wait
+                if self._is_full() or waited_enough:
+                    self._flush(everything=waited_enough)
+                    continue
+                self._wakeup.clear()
+                try:
+                    timeout = self._pending[0].submitted + self.max_wait - self._loop.time()
+                    await asyncio.wait_for(self._wakeup.wait(), max(0.0, timeout))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._flusher = None
+
+    def _is_full(self) -> bool:
+        return (
+            len(self._pending) >= self.max_items
+            or sum(item.token_count for item in self._pending) >= self.max_tokens
+        )
+
+    def _flush(self, everything: bool) -> None:
+        """Send the full batches of the queue, and the last partial batch too if `everything` is set."""
+        # Texts whose request gave up are not sent
+        queue = [item for item in self._pending if not item.future.done()]
+        batches = [[queue[index] for index in batch] for batch in make_batches(
+            [item.token_count for item in queue], self.max_items, self.max_tokens
+        )]
+        self._pending = []
+        if batches and not everything:
+            last = batches[-1]
+            if len(last) < self.max_items and sum(item.token_count for item in last) < self.max_tokens:
+                self._pending = batches.pop()
+
+        for batch in batches:
+            task = self._loop.create_task(self._send_batch(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send_batch(self, batch: List[_PendingText]) -> None:
+        """Embed a batch and hand every embedding, or the error, to the future of its text."""
+        token_count = sum(item.token_count for item in batch)
+        self._stats["batches"] += 1
+        self._stats["texts"] += len(batch)
+        self._stats["tokens"] += token_count
+        try:
+            embeddings = await self.send([item.text for item in batch], [item.token_count for item in batch])
+        except Exception as e:
+            logging.error(f"Failed to embed a coalesced batch of {len(batch)} texts: {e!r}")
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        for item, embedding in zip(batch, embeddings):
+            if item.future.done():
+                continue
+            if isinstance(embedding, Exception):
+                item.future.set_exception(embedding)
+            else:
+                item.future.set_result(embedding)
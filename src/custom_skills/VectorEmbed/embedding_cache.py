@@ -0,0 +1,129 @@
+"""Cache of embeddings keyed by normalized text and embedding model deployment."""
+import hashlib
+import logging
+import os
+import re
+import threading
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List
+
+from common.cache_backends import BlobContainerBackend, SqliteBackend
+from common.lru_cache import SizedLruCache
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize unicode and whitespace, so texts that differ only in formatting share an embedding."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def make_embedding_key(text: str, deployment: str, api_version: str) -> str:
+    """
+    Build the cache key of the embedding of a text.
+
+    Args:
+        text: a block of text
+        deployment: the name of the embedding model deployment
+        api_version: the Azure OpenAI API version
+
+    Returns:
+        A hex digest identifying the embedding
+    """
+    raw_key = "\x00".join([deployment or "", api_version or "", normalize_text(text)])
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+
+def encode_vector(vector: List[float]) -> bytes:
+    """Pack an embedding into a float32 byte string."""
+    return array("f", vector).tobytes()
+
+
+def decode_vector(value: bytes) -> List[float]:
+    """Unpack an embedding packed by `encode_vector`."""
+    vector = array("f")
+    vector.frombytes(value)
+    return vector.tolist()
+
+
+class EmbeddingCache:
+    """
+    Two-level cache of embeddings stored as float32 arrays.
+
+    The first level is an in-process LRU capped by the total size of the vectors.
+    The second level is an optional persistent backend (a local SQLite file or a Blob Storage container).
+    """
+
+    def __init__(self, max_bytes: int, backend=None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: the maximum total size of the vectors kept in memory
+            backend: an optional persistent backend with `get_many` and `put_many` methods
+        """
+        self.backend = backend
+        self._memory = SizedLruCache(max_bytes)
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "backend_hits": 0, "misses": 0}
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """Return the cached embeddings of the keys that were found."""
+        found = {}
+        missing = []
+        for key in set(keys):
+            value = self._memory.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        memory_hits = len(found)
+
+        if missing and self.backend is not None:
+            try:
+                from_backend = self.backend.get_many(missing)
+            except Exception:
+                logging.exception("Failed to read embeddings from the persistent cache.")
+                from_backend = {}
+            for key, value in from_backend.items():
+                self._memory.put(key, value)
+            found.update(from_backend)
+
+        with self._lock:
+            self._stats["memory_hits"] += memory_hits
+            self._stats["backend_hits"] += len(found) - memory_hits
+            self._stats["misses"] += len(missing) - (len(found) - memory_hits)
+        return {key: decode_vector(value) for key, value in found.items()}
+
+    def put_many(self, embeddings: Dict[str, List[float]]) -> None:
+        """Store the embeddings in both levels of the cache."""
+        values = {key: encode_vector(vector) for key, vector in embeddings.items()}
+        for key, value in values.items():
+            self._memory.put(key, value)
+        if self.backend is not None and values:
+            try:
+                self.backend.put_many(values)
+            except Exception:
+                logging.exception("Failed to store embeddings in the persistent cache.")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return the hit and miss counts of the cache."""
+        with self._lock:
+            return dict(self._stats)
+
+
+def create_embedding_cache_from_environment() -> EmbeddingCache:
+    """
+    Create the embedding cache configured by the app settings.
+
+    EMBEDDING_CACHE_MAX_BYTES caps the in-memory level, EMBEDDING_CACHE_SQLITE_PATH enables the SQLite backend
+    and EMBEDDING_CACHE_CONTAINER enables the Blob Storage backend.
+    """
+    max_bytes = int(os.environ.get("EMBEDDING_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    backend = None
+    if os.environ.get("EMBEDDING_CACHE_SQLITE_PATH"):
+        backend = SqliteBackend(os.environ["EMBEDDING_CACHE_SQLITE_PATH"])
+    elif os.environ.get("EMBEDDING_CACHE_CONTAINER"):
+        backend = BlobContainerBackend(os.environ["EMBEDDING_CACHE_CONTAINER"])
+    return EmbeddingCache(max_bytes=max_bytes, backend=backend)
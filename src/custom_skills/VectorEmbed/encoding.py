@@ -0,0 +1,100 @@
+"""Compact encodings of the embeddings returned by the skills."""
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Mapping
+
+import numpy as np
+
+# Request headers selecting the encoding, set with the 'httpHeaders' of the skill definition
+ENCODING_HEADER = "Embedding-Encoding"
+PRECISION_HEADER = "Embedding-Precision"
+
+# float32: values as returned by Azure OpenAI
+# rounded: values rounded to `precision` decimal places
+# float16: values rounded to the nearest half precision float, for Collection(Edm.Half) fields
+# int8: values scaled to [-127, 127] with one scale per vector, for Collection(Edm.SByte) fields
+ENCODINGS = ("float32", "rounded", "float16", "int8")
+
+DEFAULT_ENCODING = os.environ.get("EMBEDDING_ENCODING", "float32")
+DEFAULT_PRECISION = int(os.environ.get("EMBEDDING_PRECISION", 5))
+
+
+@dataclass(frozen=True)
+class EmbeddingEncoding:
+    """The encoding of the embeddings of a response."""
+
+    name: str = DEFAULT_ENCODING
+    precision: int = DEFAULT_PRECISION
+
+    def __post_init__(self):
+        """Validate the encoding."""
+        if self.name not in ENCODINGS:
+            raise ValueError(f"Unknown embedding encoding '{self.name}', expected one of {', '.join(ENCODINGS)}")
+        if not 0 <= self.precision <= 10:
+            raise ValueError(f"Embedding precision must be between 0 and 10, got {self.precision}")
+
+    @classmethod
+    def from_headers(cls, headers: Mapping[str, str]) -> "EmbeddingEncoding":
+        """
+        Read the encoding requested by the headers of a skill request.
+
+        Args:
+            headers: the headers of the request
+
+        Returns:
+            The requested encoding, or the default encoding of the app
+
+        Raises:
+            ValueError: if the encoding or the precision is invalid
+        """
+        name = (headers.get(ENCODING_HEADER) or DEFAULT_ENCODING).strip().lower()
+        precision = headers.get(PRECISION_HEADER)
+        try:
+            precision = int(precision) if precision else DEFAULT_PRECISION
+        except ValueError:
+            raise ValueError(f"Embedding precision must be an integer, got '{precision}'")
+        return cls(name=name, precision=precision)
+
+    @property
+    def is_default(self) -> bool:
+        """Whether the embeddings are returned unchanged."""
+        return self.name == "float32"
+
+    def encode(self, embeddings: List[List[float]]) -> List[Dict]:
+        """
+        Encode the embeddings.
+
+        Args:
+            embeddings: the embeddings as returned by Azure OpenAI
+
+        Returns:
+            The fields to add to the data of every record: the encoded 'embedding', the 'embedding_encoding'
+            unless the embeddings are unchanged, and the 'embedding_scale' of int8 vectors
+        """
+        if self.is_default or not embeddings:
+            return [{"embedding": embedding} for embedding in embeddings]
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if self.name == "rounded":
+            values = np.round(vectors.astype(np.float64), self.precision).tolist()
+            return [{"embedding": value, "embedding_encoding": self.name} for value in values]
+        if self.name == "float16":
+            # The shortest decimal representation of every half precision value
+            values = vectors.astype(np.float16).astype(str).astype(np.float64).tolist()
+            return [{"embedding": value, "embedding_encoding": self.name} for value in values]
+
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        values = np.rint(vectors / scales[:, None]).astype(np.int8).tolist()
+        return [
+            {"embedding": value, "embedding_encoding": self.name, "embedding_scale": float(scale)}
+            for value, scale in zip(values, scales.tolist())
+        ]
+
+
+def decode_embedding(data: Dict) -> List[float]:
+    """Return the approximate float values of an embedding encoded by `EmbeddingEncoding.encode`."""
+    scale = data.get("embedding_scale")
+    if scale is None:
+        return [float(value) for value in data["embedding"]]
+    return [value * scale for value in data["embedding"]]
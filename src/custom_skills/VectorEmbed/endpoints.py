@@ -0,0 +1,213 @@
+"""Spread embedding requests over several Azure OpenAI endpoints and deployments of the same model."""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import openai
+
+from common.clients import get_async_openai_client
+from VectorEmbed.scheduler import (
+    MAX_ATTEMPTS,
+    MAX_IN_FLIGHT,
+    REQUESTS_PER_MINUTE,
+    TOKENS_PER_MINUTE,
+    EmbeddingScheduler,
+    backoff,
+    is_transient_error,
+)
+
+
+@dataclass(frozen=True)
+class EmbeddingEndpoint:
+    """An Azure OpenAI deployment of the embedding model and its quota."""
+
+    endpoint: str
+    deployment: str
+    api_key: Optional[str] = None
+    api_version: Optional[str] = None
+    weight: float = 1.0
+    tokens_per_minute: int = TOKENS_PER_MINUTE
+    requests_per_minute: int = REQUESTS_PER_MINUTE
+
+    @property
+    def name(self) -> str:
+        """Return a readable identifier of the deployment."""
+        return f"{(self.endpoint or '').rstrip('/')}/{self.deployment}"
+
+
+def load_endpoints_from_environment() -> List[EmbeddingEndpoint]:
+    """
+    Read the embedding endpoints configured by the app settings.
+
+    AZURE_OPENAI_EMBEDDING_ENDPOINTS is a JSON list of objects with an 'endpoint' and a 'deployment', and
+    optionally an 'api_key', an 'api_version', a 'weight', a 'tpm' and an 'rpm' quota. Missing keys default
+    to the single endpoint settings (AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_EMBEDDING_DEPLOYMENT, ...),
+    which are used alone when the list is not set.
+    """
+    default = {
+        "endpoint": os.environ.get("AZURE_OPENAI_ENDPOINT"),
+        "deployment": os.environ.get("AZURE_OPENAI_EMBEDDING_DEPLOYMENT"),
+        "api_key": os.environ.get("AZURE_OPENAI_API_KEY"),
+        "api_version": os.environ.get("AZURE_OPENAI_API_VERSION"),
+        "weight": 1.0,
+        "tpm": TOKENS_PER_MINUTE,
+        "rpm": REQUESTS_PER_MINUTE,
+    }
+    configured = os.environ.get("AZURE_OPENAI_EMBEDDING_ENDPOINTS")
+    entries = json.loads(configured) if configured else [{}]
+
+    endpoints = []
+    for entry in entries:
+        settings = {**default, **entry}
+        endpoints.append(
+            EmbeddingEndpoint(
+                endpoint=settings["endpoint"],
+                deployment=settings["deployment"],
+                api_key=settings["api_key"],
+                api_version=settings["api_version"],
+                weight=float(settings["weight"]),
+                tokens_per_minute=int(settings["tpm"]),
+                requests_per_minute=int(settings["rpm"]),
+            )
+        )
+    return endpoints
+
+
+class _EndpointState:
+    """The scheduler and the health statistics of an endpoint."""
+
+    def __init__(self, endpoint: EmbeddingEndpoint, max_in_flight: int):
+        self.endpoint = endpoint
+        # Throttled requests are retried by the pool, possibly on another endpoint
+        self.scheduler = EmbeddingScheduler(
+            endpoint.tokens_per_minute, endpoint.requests_per_minute, max_in_flight, max_attempts=1
+        )
+        self.down_until = 0.0
+        self.stats = {"requests": 0, "errors": 0, "throttled": 0, "latency_ms": 0.0}
+
+    def down_for(self) -> float:
+        return max(0.0, self.down_until - time.monotonic())
+
+    def is_available(self) -> bool:
+        return self.scheduler.paused_for() == 0 and self.down_for() == 0
+
+    def score(self) -> float:
+        return self.endpoint.weight * self.scheduler.headroom()
+
+
+class EndpointPool:
+    """
+    Send embedding requests to the endpoint with the most remaining quota, relative to its weight.
+
+    Every endpoint has its own scheduler enforcing its quota. Throttled requests move to another endpoint
+    while the throttled one waits for its retry hint, and endpoints that fail with transient errors (connection,
+    timeout or server errors) are skipped for a cooldown period growing with the attempts of the request. When
+    no other endpoint is available, the request waits for the retry hint or the cooldown and is sent to the same
+    endpoint again. Latency and error counts are tracked per endpoint.
+    """
+
+    def __init__(
+        self, endpoints: List[EmbeddingEndpoint], max_in_flight: int = MAX_IN_FLIGHT, max_attempts: int = MAX_ATTEMPTS
+    ):
+        """
+        Create the pool.
+
+        Args:
+            endpoints: the deployments of the embedding model
+            max_in_flight: the maximum number of requests waiting for a response per endpoint
+            max_attempts: the maximum number of attempts of a request over all endpoints
+        """
+        if not endpoints:
+            raise ValueError("At least one embedding endpoint is required")
+        self.max_attempts = max_attempts
+        self._states = [_EndpointState(endpoint, max_in_flight) for endpoint in endpoints]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls) -> "EndpointPool":
+        """Create the pool of the endpoints configured by the app settings."""
+        return cls(load_endpoints_from_environment())
+
+    async def run(self, call: Callable[[Any, str], Awaitable[Any]], token_count: int) -> Any:
+        """
+        Send a request to the best endpoint, failing over to the others when it is throttled or down.
+
+        Args:
+            call: a coroutine function taking an Azure OpenAI client and a deployment name, sending the request
+                and returning the raw OpenAI response
+            token_count: the estimated number of tokens of the request
+
+        Returns:
+            The parsed response
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            state = self._choose()
+            endpoint = state.endpoint
+            client = get_async_openai_client(endpoint.endpoint, endpoint.api_key, endpoint.api_version)
+            # The scheduler waits for the retry hint of a throttled endpoint, the cooldown is waited for here
+            await asyncio.sleep(state.down_for())
+
+            async def timed_call():
+                start = time.monotonic()
+                try:
+                    return await call(client, endpoint.deployment)
+                finally:
+                    self._record_latency(state, time.monotonic() - start)
+
+            try:
+                response = await state.scheduler.run(timed_call, token_count, first_attempt=attempt)
+            except openai.RateLimitError:
+                self._record(state, "throttled")
+                if attempt == self.max_attempts:
+                    raise
+                logging.warning(f"Embedding endpoint {endpoint.name} is throttling, attempt {attempt}.")
+                continue
+            except openai.APIError as e:
+                if not is_transient_error(e):
+                    raise
+                self._record_failure(state, attempt)
+                if attempt == self.max_attempts:
+                    raise
+                action = "failing over" if self._has_alternative(state) else f"retrying in {state.down_for():.1f}s"
+                logging.warning(f"Embedding endpoint {endpoint.name} failed ({e!r}), {action}, attempt {attempt}.")
+                continue
+
+            return response
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return the requests, errors, throttled requests, average latency and tokens of every endpoint."""
+        with self._lock:
+            return {
+                state.endpoint.name: {**state.stats, "tokens": state.scheduler.get_stats()["tokens"]}
+                for state in self._states
+            }
+
+    def _choose(self) -> _EndpointState:
+        """Pick the available endpoint with the highest weighted headroom, or the one available the soonest."""
+        available = [state for state in self._states if state.is_available()]
+        if available:
+            return max(available, key=_EndpointState.score)
+        return min(self._states, key=lambda state: max(state.scheduler.paused_for(), state.down_for()))
+
+    def _has_alternative(self, failed: _EndpointState) -> bool:
+        return any(state is not failed and state.is_available() for state in self._states)
+
+    def _record(self, state: _EndpointState, stat: str) -> None:
+        with self._lock:
+            state.stats[stat] += 1
+
+    def _record_latency(self, state: _EndpointState, seconds: float) -> None:
+        with self._lock:
+            state.stats["requests"] += 1
+            # Running average over all requests of the endpoint
+            state.stats["latency_ms"] += (seconds * 1000 - state.stats["latency_ms"]) / state.stats["requests"]
+
+    def _record_failure(self, state: _EndpointState, attempt: int) -> None:
+        with self._lock:
+            state.stats["errors"] += 1
+            state.down_until = max(state.down_until, time.monotonic() + backoff(attempt))
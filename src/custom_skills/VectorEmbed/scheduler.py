@@ -0,0 +1,203 @@
+"""Rate-limit-aware scheduler for embedding requests to an Azure OpenAI deployment."""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import openai
+
+# Quota of the embedding deployment
+TOKENS_PER_MINUTE = int(os.environ.get("AZURE_OPENAI_EMBEDDING_TPM", 120000))
+REQUESTS_PER_MINUTE = int(os.environ.get("AZURE_OPENAI_EMBEDDING_RPM", 720))
+# Maximum number of embedding requests waiting for a response at the same time
+MAX_IN_FLIGHT = int(os.environ.get("EMBEDDING_MAX_IN_FLIGHT", 8))
+MAX_ATTEMPTS = 10
+# Upper bound of the exponential backoff when the service gives no retry hint, in seconds
+MAX_BACKOFF = 60
+# Status codes of errors that may succeed when the request is sent again, besides throttling and server errors
+TRANSIENT_STATUS_CODES = (408, 409)
+
+
+class TokenBucket:
+    """
+    A bucket that refills continuously up to its capacity over one minute.
+
+    Amounts are reserved immediately, and the level may go below zero. The caller is told how long
+    to wait before the reservation is covered, so large requests are never starved by small ones.
+    """
+
+    def __init__(self, capacity_per_minute: int):
+        """Initialize a full bucket."""
+        self.capacity = capacity_per_minute
+        self.rate = capacity_per_minute / 60
+        self.level = float(capacity_per_minute)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take the amount out of the bucket.
+
+        Args:
+            amount: the amount to reserve
+
+        Returns:
+            The number of seconds to wait before the reservation can be used
+        """
+        with self._lock:
+            self._refill()
+            self.level -= amount
+            return max(0.0, -self.level / self.rate)
+
+    def limit_to(self, remaining: float) -> None:
+        """Align the bucket with the remaining quota reported by the service."""
+        with self._lock:
+            self._refill()
+            self.level = min(self.level, remaining)
+
+    def available(self) -> float:
+        """Return the amount currently available in the bucket."""
+        with self._lock:
+            self._refill()
+            return self.level
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Return whether a failed request may succeed when it is sent again, other than after throttling."""
+    # APITimeoutError is an APIConnectionError, InternalServerError covers the 5xx responses
+    if isinstance(error, (openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in TRANSIENT_STATUS_CODES
+
+
+def backoff(attempt: int) -> float:
+    """Return a random exponential backoff for the given attempt, in seconds."""
+    return random.uniform(1, min(MAX_BACKOFF, 2 ** attempt))
+
+
+def _get_retry_after(error: openai.APIStatusError) -> Optional[float]:
+    """Read the retry hint of a throttled response, in seconds."""
+    headers = error.response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+class EmbeddingScheduler:
+    """
+    Schedule embedding requests so that throughput stays close to the deployment quota.
+
+    Every request is charged to a tokens-per-minute and a requests-per-minute bucket before it is sent,
+    a bounded number of requests is kept in flight, and throttled requests are retried after the delay
+    suggested by the service. A retry hint pauses all requests of the scheduler, not only the throttled one.
+    Connection errors, timeouts, server errors and 408/409 responses are retried with an exponential backoff.
+    """
+
+    def __init__(
+        self,
+        tokens_per_minute: int = TOKENS_PER_MINUTE,
+        requests_per_minute: int = REQUESTS_PER_MINUTE,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        max_attempts: int = MAX_ATTEMPTS,
+    ):
+        """Initialize the scheduler for a deployment with the given quota."""
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.requests = TokenBucket(requests_per_minute)
+        self.max_in_flight = max_in_flight
+        self.max_attempts = max_attempts
+        self._paused_until = 0.0
+        # Semaphores are bound to their event loop, and dropped with it
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._stats = {"requests": 0, "throttled": 0, "retried": 0, "tokens": 0}
+
+    async def run(self, call: Callable[[], Awaitable[Any]], token_count: int, first_attempt: int = 1) -> Any:
+        """
+        Send a request once the quota allows it, retrying when it is throttled.
+
+        Args:
+            call: a coroutine function sending the request and returning the raw OpenAI response
+            token_count: the estimated number of tokens of the request
+            first_attempt: the number of the first attempt, so the backoff keeps growing when the caller
+                retries the request itself
+
+        Returns:
+            The parsed response
+        """
+        last_attempt = first_attempt + self.max_attempts - 1
+        for attempt in range(first_attempt, last_attempt + 1):
+            await self._wait_for_quota(token_count)
+            try:
+                async with self._get_semaphore():
+                    raw_response = await call()
+            except openai.RateLimitError as e:
+                self._stats["throttled"] += 1
+                delay = _get_retry_after(e)
+                if delay is None:
+                    delay = backoff(attempt)
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                if attempt == last_attempt:
+                    raise
+                logging.warning(f"Rate Limit Exceeded! Retry Attempt #: {attempt} | Retry in {delay:.1f}s")
+                continue
+            except openai.APIError as e:
+                if not is_transient_error(e) or attempt == last_attempt:
+                    raise
+                self._stats["retried"] += 1
+                delay = backoff(attempt)
+                logging.warning(f"Embedding request failed ({e!r})! Retry Attempt #: {attempt} | Retry in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            self._observe(raw_response.headers, token_count)
+            return raw_response.parse()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return the number of sent, throttled and retried requests and the number of tokens sent."""
+        return dict(self._stats)
+
+    def paused_for(self) -> float:
+        """Return the number of seconds left before requests are sent again after a retry hint."""
+        return max(0.0, self._paused_until - time.monotonic())
+
+    def headroom(self) -> float:
+        """Return the fraction of the quota currently available, negative when requests are already waiting."""
+        return min(self.tokens.available() / self.tokens.capacity, self.requests.available() / self.requests.capacity)
+
+    async def _wait_for_quota(self, token_count: int) -> None:
+        delay = max(
+            self.tokens.reserve(token_count),
+            self.requests.reserve(1),
+            self._paused_until - time.monotonic(),
+        )
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphores[loop]
+
+    def _observe(self, headers, token_count: int) -> None:
+        self._stats["requests"] += 1
+        self._stats["tokens"] += token_count
+        if "x-ratelimit-remaining-tokens" in headers:
+            self.tokens.limit_to(float(headers["x-ratelimit-remaining-tokens"]))
+        if "x-ratelimit-remaining-requests" in headers:
+            self.requests.limit_to(float(headers["x-ratelimit-remaining-requests"]))
@@ -0,0 +1,132 @@
+"""
+Compare the payload size and serialization time of the skill responses before and after the compact chunk format.
+
+The legacy responses contain langchain Documents serialized with `json.dumps(..., default=lambda obj: obj.__dict__)`.
+The compact responses contain `ChunkRecord`s serialized with `common.serialization.dumps`.
+
+Run from the `src/custom_skills` folder:
+`python -m benchmarks.serialization_benchmark --data_folder ../../data`
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import time
+
+from Chunk.chunk_record import ChunkRecord
+from Chunk.pdf_loader import parse_pdf_pages
+from Chunk.text_splitter import RecursiveTextSplitter
+from common.serialization import dumps
+from common.tokenizer import count_tokens
+
+
+def _legacy_dumps(obj) -> str:
+    return json.dumps(obj, default=lambda obj: obj.__dict__)
+
+
+def _chunk_documents(data_folder: str, splitter: RecursiveTextSplitter) -> list:
+    documents = []
+    for file_path in sorted(glob.glob(os.path.join(data_folder, "*.pdf"))):
+        with open(file_path, "rb") as f:
+            # Documents used to be loaded from a temporary file, so the source was a long local path
+            pages = parse_pdf_pages(f, os.path.join("/tmp/tmp1_bu5os8/toydataset", os.path.basename(file_path)))
+        documents.append(list(splitter.iter_document_chunks(pages)))
+    return documents
+
+
+def _chunk_responses(documents: list) -> dict:
+    legacy = {
+        "values": [
+            {
+                "recordId": str(i),
+                "data": {
+                    "chunks": [
+                        page.__class__(page_content=chunk, metadata=dict(page.metadata))
+                        for page, chunk, _, _ in chunks
+                    ]
+                },
+                "errors": None,
+                "warnings": None,
+            }
+            for i, chunks in enumerate(documents)
+        ]
+    }
+    compact = {
+        "values": [
+            {
+                "recordId": str(i),
+                "data": {
+                    "chunks": [
+                        ChunkRecord(chunk, page.metadata["page"], start, end, count_tokens(chunk)).to_dict()
+                        for page, chunk, start, end in chunks
+                    ]
+                },
+                "errors": None,
+                "warnings": None,
+            }
+            for i, chunks in enumerate(documents)
+        ]
+    }
+    return {"legacy": (_legacy_dumps, legacy), "compact": (dumps, compact)}
+
+
+def _embedding_responses(count: int, dimensions: int) -> dict:
+    rng = random.Random(0)
+    body = {
+        "values": [
+            {
+                "recordId": str(i),
+                "data": {"embedding": [rng.uniform(-0.1, 0.1) for _ in range(dimensions)], "page": 0},
+                "errors": None,
+                "warnings": None,
+            }
+            for i in range(count)
+        ]
+    }
+    return {"legacy": (_legacy_dumps, body), "compact": (dumps, body)}
+
+
+def _measure(serialize, body, repeat: int) -> tuple:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = serialize(body)
+        best = min(best, time.perf_counter() - start)
+    return best, len(payload.encode("utf-8"))
+
+
+def _report(title: str, responses: dict, repeat: int):
+    print(title)
+    results = {name: _measure(serialize, body, repeat) for name, (serialize, body) in responses.items()}
+    for name, (seconds, size) in results.items():
+        print(f"{name:>10}: {size / 1024:.1f} KiB in {seconds * 1000:.2f}ms")
+    print(f"{'ratio':>10}: {results['compact'][1] / results['legacy'][1]:.2f}x size, "
+          f"{results['legacy'][0] / results['compact'][0]:.2f}x faster")
+
+
+def main():
+    """Run the benchmark and print the payload size and serialization time of both formats."""
+    parser = argparse.ArgumentParser("serialization_benchmark")
+    parser.add_argument("--data_folder", type=str, default="../../data", help="folder with the PDF files")
+    parser.add_argument("--chunk_size", type=int, default=1000)
+    parser.add_argument("--chunk_overlap", type=int, default=100)
+    parser.add_argument("--embeddings", type=int, default=64, help="number of records of a Vector_Embed response")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    splitter = RecursiveTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+    documents = _chunk_documents(args.data_folder, splitter)
+    chunks = sum(len(chunks) for chunks in documents)
+
+    _report(f"Chunk response: {len(documents)} records, {chunks} chunks", _chunk_responses(documents), args.repeat)
+    _report(
+        f"Vector_Embed response: {args.embeddings} records of {args.dimensions} dimensions",
+        _embedding_responses(args.embeddings, args.dimensions),
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compare the throughput of the built-in text splitter with langchain's RecursiveCharacterTextSplitter.
+
+Run from the `src/custom_skills` folder:
+`python -m benchmarks.splitter_benchmark --data_folder ../../data`
+"""
+import argparse
+import glob
+import os
+import time
+
+from Chunk.pdf_loader import parse_pdf_pages
+from Chunk.text_splitter import RecursiveTextSplitter
+
+
+def _load_pages(data_folder: str) -> list:
+    pages = []
+    for file_path in sorted(glob.glob(os.path.join(data_folder, "*.pdf"))):
+        with open(file_path, "rb") as f:
+            pages.extend(parse_pdf_pages(f, os.path.basename(file_path)))
+    return pages
+
+
+def _measure(splitter, texts: list, repeat: int) -> tuple:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = [chunk for text in texts for chunk in splitter.split_text(text)]
+        best = min(best, time.perf_counter() - start)
+    return best, chunks
+
+
+def main():
+    """Run the benchmark and print the throughput of both splitters."""
+    parser = argparse.ArgumentParser("splitter_benchmark")
+    parser.add_argument("--data_folder", type=str, default="../../data", help="folder with the PDF files")
+    parser.add_argument("--chunk_size", type=int, default=1000)
+    parser.add_argument("--chunk_overlap", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    texts = [page.page_content for page in _load_pages(args.data_folder)]
+    characters = sum(len(text) for text in texts)
+    print(f"{len(texts)} pages, {characters} characters")
+
+    splitters = {
+        "langchain": RecursiveCharacterTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap),
+        "builtin": RecursiveTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap),
+    }
+    results = {name: _measure(splitter, texts, args.repeat) for name, splitter in splitters.items()}
+
+    for name, (seconds, chunks) in results.items():
+        print(f"{name:>10}: {len(chunks)} chunks in {seconds * 1000:.1f}ms, {characters / seconds / 1e6:.2f}M chars/s")
+    print(f"Same output: {results['langchain'][1] == results['builtin'][1]}")
+    print(f"Speedup: {results['langchain'][0] / results['builtin'][0]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Persistent backends for the caches of the custom skills, storing byte strings by key."""
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional
+
+from azure.core.exceptions import ResourceNotFoundError
+from common.clients import get_container_client
+
+
+class LocalDirectoryBackend:
+    """Persistent cache backend storing one file per key in a local directory."""
+
+    def __init__(self, directory: str):
+        """Initialize the backend and create the directory if needed."""
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached value or None."""
+        try:
+            with open(os.path.join(self.directory, key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """Return the cached values of the keys that were found."""
+        values = {key: self.get(key) for key in keys}
+        return {key: value for key, value in values.items() if value is not None}
+
+    def put(self, key: str, value: bytes) -> None:
+        """Store the value, replacing the file atomically."""
+        path = os.path.join(self.directory, key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+
+    def put_many(self, values: Dict[str, bytes]) -> None:
+        """Store several values."""
+        for key, value in values.items():
+            self.put(key, value)
+
+
+class BlobContainerBackend:
+    """Persistent cache backend storing one blob per key in a Blob Storage container."""
+
+    def __init__(self, container: str):
+        """Initialize the backend for the given container."""
+        self.container = container
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached value or None."""
+        try:
+            return get_container_client(self.container).download_blob(key).readall()
+        except ResourceNotFoundError:
+            return None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """Return the cached values of the keys that were found."""
+        values = {key: self.get(key) for key in keys}
+        return {key: value for key, value in values.items() if value is not None}
+
+    def put(self, key: str, value: bytes) -> None:
+        """Store the value."""
+        get_container_client(self.container).upload_blob(key, value, overwrite=True)
+
+    def put_many(self, values: Dict[str, bytes]) -> None:
+        """Store several values."""
+        for key, value in values.items():
+            self.put(key, value)
+
+
+class SqliteBackend:
+    """Persistent cache backend storing values in a single local SQLite file."""
+
+    # SQLite limits the number of parameters of a single statement
+    _MAX_PARAMETERS = 500
+
+    def __init__(self, path: str):
+        """Initialize the backend and create the database if needed."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached value or None."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """Return the cached values of the keys that were found."""
+        keys = list(keys)
+        values = {}
+        with self._lock:
+            for start in range(0, len(keys), self._MAX_PARAMETERS):
+                batch = keys[start:start + self._MAX_PARAMETERS]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT key, value FROM cache WHERE key IN ({placeholders})", batch
+                )
+                values.update(rows.fetchall())
+        return values
+
+    def put(self, key: str, value: bytes) -> None:
+        """Store the value."""
+        self.put_many({key: value})
+
+    def put_many(self, values: Dict[str, bytes]) -> None:
+        """Store several values in a single transaction."""
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)", values.items())
@@ -0,0 +1,174 @@
+"""Process-wide registry of the Azure clients shared by the custom skills."""
+import asyncio
+import os
+import threading
+import weakref
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Optional
+
+# The SDKs are imported by the functions creating their clients, so a route only pays for the SDKs it uses
+if TYPE_CHECKING:
+    from azure.identity import DefaultAzureCredential
+    from azure.storage.blob import BlobServiceClient, ContainerClient
+    from openai import AsyncAzureOpenAI
+
+
+class ClientRegistry:
+    """
+    Lazily create clients once per process and hand out the same instance afterwards.
+
+    The registry is safe to use from several threads at the same time. Reusing clients keeps
+    their HTTP connection pools warm, and the shared credential caches access tokens and
+    refreshes them when they expire.
+    """
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._lock = threading.RLock()
+        self._clients: Dict[Hashable, Any] = {}
+        # Clients bound to an event loop are dropped with their loop
+        self._loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, Any]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"created": 0, "reused": 0})
+
+    def get_or_create(self, kind: str, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Return the client registered under the key, creating it with the factory if needed.
+
+        Args:
+            kind: the type of the client, used for statistics
+            key: a key that uniquely identifies the client configuration
+            factory: a callable that creates a new client
+
+        Returns:
+            The shared client
+        """
+        with self._lock:
+            client = self._clients.get((kind, key))
+            if client is not None:
+                self._stats[kind]["reused"] += 1
+                return client
+
+            client = factory()
+            self._clients[(kind, key)] = client
+            self._stats[kind]["created"] += 1
+            return client
+
+    def get_or_create_for_loop(self, kind: str, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Return the client of the running event loop registered under the key, creating it with the factory if needed.
+
+        Clients are held by a weak reference to their loop, so a closed loop that is garbage collected takes
+        its clients with it, and a new loop never receives the client of an old one.
+
+        Args:
+            kind: the type of the client, used for statistics
+            key: a key that uniquely identifies the client configuration
+            factory: a callable that creates a new client
+
+        Returns:
+            The client shared by the running event loop
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._loop_clients.setdefault(loop, {})
+            client = clients.get((kind, key))
+            if client is not None:
+                self._stats[kind]["reused"] += 1
+                return client
+
+            client = factory()
+            clients[(kind, key)] = client
+            self._stats[kind]["created"] += 1
+            return client
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Return how many clients of each kind were created and reused."""
+        with self._lock:
+            return {kind: dict(counts) for kind, counts in self._stats.items()}
+
+
+_registry = ClientRegistry()
+
+
+def get_credential() -> "DefaultAzureCredential":
+    """Return the shared credential of the function app."""
+    from azure.identity import DefaultAzureCredential
+
+    managed_identity_client_id = os.environ.get("MANAGED_IDENTITY_CLIENT_ID")
+    return _registry.get_or_create(
+        "credential",
+        managed_identity_client_id,
+        lambda: DefaultAzureCredential(managed_identity_client_id=managed_identity_client_id),
+    )
+
+
+def get_blob_service_client() -> "BlobServiceClient":
+    """Return the shared Blob Storage client for the configured storage account."""
+    from azure.storage.blob import BlobServiceClient
+
+    account_url = f"https://{os.environ.get('AZURE_STORAGE_ACCOUNT_NAME')}.blob.core.windows.net"
+    return _registry.get_or_create(
+        "blob_service",
+        account_url,
+        lambda: BlobServiceClient(account_url=account_url, credential=get_credential()),
+    )
+
+
+def get_container_client(container: str = None) -> "ContainerClient":
+    """
+    Return the shared client of a Blob Storage container.
+
+    Args:
+        container: the name of the container, defaults to AZURE_STORAGE_CONTAINER_NAME
+
+    Returns:
+        ContainerClient object
+    """
+    if container is None:
+        container = os.environ.get("AZURE_STORAGE_CONTAINER_NAME")
+    return _registry.get_or_create(
+        "container",
+        container,
+        lambda: get_blob_service_client().get_container_client(container),
+    )
+
+
+def get_async_openai_client(
+    endpoint: Optional[str] = None, api_key: Optional[str] = None, api_version: Optional[str] = None
+) -> "AsyncAzureOpenAI":
+    """
+    Return the shared asynchronous Azure OpenAI client of an endpoint for the running event loop.
+
+    The client does not retry on its own, retries are left to the caller.
+
+    Args:
+        endpoint: the Azure OpenAI endpoint, defaults to AZURE_OPENAI_ENDPOINT
+        api_key: the API key of the endpoint, defaults to AZURE_OPENAI_API_KEY
+        api_version: the API version, defaults to AZURE_OPENAI_API_VERSION
+
+    Returns:
+        AsyncAzureOpenAI object
+    """
+    from openai import AsyncAzureOpenAI
+
+    endpoint = endpoint or os.environ.get("AZURE_OPENAI_ENDPOINT")
+    api_key = api_key or os.environ.get("AZURE_OPENAI_API_KEY")
+    api_version = api_version or os.environ.get("AZURE_OPENAI_API_VERSION")
+    # Connections of an asynchronous client can't be shared between event loops
+    return _registry.get_or_create_for_loop(
+        "async_openai",
+        (endpoint, api_key, api_version),
+        lambda: AsyncAzureOpenAI(
+            api_key=api_key,
+            api_version=api_version,
+            azure_endpoint=endpoint,
+            max_retries=0,
+        ),
+    )
+
+
+def get_client_stats() -> Dict[str, Dict[str, int]]:
+    """Return how many clients of each kind were created and reused in this process."""
+    return _registry.get_stats()
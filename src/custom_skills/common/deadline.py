@@ -0,0 +1,44 @@
+"""Time budget of a skill request, ending before the indexer gives up on the call."""
+import os
+import time
+
+# The skills are called with a PT3M50S (230 seconds) timeout, leave time to serialize and send the response
+SKILL_DEADLINE_SECONDS = float(os.environ.get("SKILL_DEADLINE_SECONDS", 200))
+
+
+class DeadlineExceededError(Exception):
+    """Raised when the time budget of a request is spent before a piece of work could be done."""
+
+
+class Deadline:
+    """A point in time after which no new work is started for a request."""
+
+    def __init__(self, seconds: float = SKILL_DEADLINE_SECONDS):
+        """Start a budget of the given number of seconds."""
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Return the number of seconds left, 0 once the deadline has passed."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """Return whether the deadline has passed."""
+        return self.remaining() == 0
+
+    def check(self, work: str) -> None:
+        """
+        Make sure there is time left before starting a piece of work.
+
+        Args:
+            work: a description of the work, used in the error message
+
+        Raises:
+            DeadlineExceededError: if the deadline has passed
+        """
+        if self.expired():
+            raise self.exceeded(work)
+
+    def exceeded(self, work: str) -> DeadlineExceededError:
+        """Return the error reporting that the time budget was spent before a piece of work was done."""
+        return DeadlineExceededError(f"The {self.seconds:.0f}s time budget of the request was spent before {work}")
@@ -0,0 +1,70 @@
+"""Import the handlers of the function app on first use and measure their start-up cost."""
+import asyncio
+import importlib
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import azure.functions as func
+
+
+class LazyHandler:
+    """
+    A route handler that imports its module the first time it is needed.
+
+    The time spent importing the module and the latency of the first request are recorded,
+    so the cold start cost of every route can be reported.
+    """
+
+    def __init__(self, route: str, module_name: str, handler_name: str):
+        """
+        Initialize the lazy handler.
+
+        Args:
+            route: the name of the route, used for reporting
+            module_name: the module containing the handler
+            handler_name: the name of the handler function in the module
+        """
+        self.route = route
+        self.module_name = module_name
+        self.handler_name = handler_name
+        self.import_seconds: Optional[float] = None
+        self.first_request_seconds: Optional[float] = None
+        self._handler: Optional[Callable] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> Callable:
+        """Import the module of the handler if it was not imported yet and return the handler."""
+        with self._lock:
+            if self._handler is None:
+                start = time.perf_counter()
+                module = importlib.import_module(self.module_name)
+                self._handler = getattr(module, self.handler_name)
+                self.import_seconds = time.perf_counter() - start
+                logging.info(f"Route {self.route}: imported {self.module_name} in {self.import_seconds:.3f}s.")
+            return self._handler
+
+    def __call__(self, req: func.HttpRequest) -> func.HttpResponse:
+        """Call a synchronous handler."""
+        start = time.perf_counter()
+        response = self.load()(req)
+        self._record_first_request(start)
+        return response
+
+    async def call_async(self, req: func.HttpRequest) -> func.HttpResponse:
+        """Call an asynchronous handler, importing its module outside of the event loop."""
+        start = time.perf_counter()
+        handler = self._handler or await asyncio.to_thread(self.load)
+        response = await handler(req)
+        self._record_first_request(start)
+        return response
+
+    def get_stats(self) -> Dict[str, Optional[float]]:
+        """Return the import time and the first request latency in seconds (None if not happened yet)."""
+        return {"import_seconds": self.import_seconds, "first_request_seconds": self.first_request_seconds}
+
+    def _record_first_request(self, start: float) -> None:
+        if self.first_request_seconds is None:
+            self.first_request_seconds = time.perf_counter() - start
+            logging.info(f"Route {self.route}: first request served in {self.first_request_seconds:.3f}s.")
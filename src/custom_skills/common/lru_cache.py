@@ -0,0 +1,47 @@
+"""Thread-safe in-memory LRU cache bounded by the total size of its values."""
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+class SizedLruCache:
+    """LRU cache of byte strings that evicts the least recently used entries above `max_bytes`."""
+
+    def __init__(self, max_bytes: int):
+        """Initialize an empty cache."""
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the value and mark it as recently used, or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: bytes) -> None:
+        """Store the value, evicting the least recently used entries if needed."""
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self) -> None:
+        """Remove all the entries."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self) -> int:
+        """Return the number of entries."""
+        return len(self._entries)
@@ -0,0 +1,35 @@
+"""Measure the memory used while processing a single document."""
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+def start_memory_tracing() -> None:
+    """Start tracing Python memory allocations, if it is not already running."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+@contextmanager
+def trace_peak_memory() -> Iterator[Dict[str, int]]:
+    """
+    Measure the peak of the traced memory allocated while the block runs.
+
+    The result is only filled in when tracing was started with `start_memory_tracing`.
+    Tracing is process-wide, so blocks that run concurrently in other threads are included in the peak.
+
+    Yields:
+        A dictionary that receives 'peak_bytes' when the block exits
+    """
+    usage: Dict[str, int] = {}
+    if not tracemalloc.is_tracing():
+        yield usage
+        return
+
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    try:
+        yield usage
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        usage["peak_bytes"] = max(0, peak - baseline)
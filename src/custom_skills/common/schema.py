@@ -0,0 +1,23 @@
+"""Cached request validators of the custom skills."""
+import json
+from functools import lru_cache
+
+import jsonschema
+
+
+@lru_cache(maxsize=None)
+def get_request_validator(schema_path: str) -> jsonschema.protocols.Validator:
+    """
+    Load a request schema once and return a validator compiled for it.
+
+    Args:
+        schema_path: the path to the json schema of the request
+
+    Returns:
+        A validator whose `validate` method raises `jsonschema.exceptions.ValidationError`
+    """
+    with open(schema_path) as f:
+        schema = json.load(f)
+    validator_class = jsonschema.validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
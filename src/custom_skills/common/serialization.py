@@ -0,0 +1,12 @@
+"""Fast JSON serialization of skill responses."""
+import json
+from typing import Any
+
+# Responses are plain trees of dicts, lists and scalars: skip the circular reference check and use
+# compact separators. The whole tree is serialized by the C encoder.
+_encoder = json.JSONEncoder(check_circular=False, separators=(",", ":"))
+
+
+def dumps(obj: Any) -> str:
+    """Serialize plain JSON data (dicts, lists, strings, numbers, booleans and None) to compact JSON."""
+    return _encoder.encode(obj)
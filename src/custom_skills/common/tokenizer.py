@@ -0,0 +1,23 @@
+"""Tokenizer of the embedding model, loaded once per process."""
+import os
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import tiktoken
+
+# The encoding used by text-embedding-ada-002 and text-embedding-3-* models
+TOKENIZER_ENCODING = os.environ.get("EMBEDDING_TOKENIZER_ENCODING", "cl100k_base")
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(encoding_name: str = TOKENIZER_ENCODING) -> "tiktoken.Encoding":
+    """Return the cached tokenizer for the given encoding, importing tiktoken on first use."""
+    import tiktoken
+
+    return tiktoken.get_encoding(encoding_name)
+
+
+def count_tokens(text: str) -> int:
+    """Return the number of tokens of the text for the embedding model."""
+    return len(get_tokenizer().encode(text, disallowed_special=()))
@@ -1,11 +1,19 @@
 """Azure Function App for custom skills."""
 import azure.functions as func
+import asyncio
+import json
 import logging
-from Chunk import function_chunk
-from VectorEmbed import function_vector_embed
+import os
+from common.lazy_loading import LazyHandler
 
 app = func.FunctionApp()
 
+# Skill modules pull in heavy dependencies, so they are imported by the first request that needs them
+_chunk_handler = LazyHandler("Chunk", "Chunk", "function_chunk")
+_vector_embed_handler = LazyHandler("Vector_Embed", "VectorEmbed", "function_vector_embed")
+_chunk_embed_handler = LazyHandler("Chunk_Embed", "ChunkEmbed", "function_chunk_embed")
+_handlers = [_chunk_handler, _vector_embed_handler, _chunk_embed_handler]
+
 
 @app.route("Health", auth_level=func.AuthLevel.ANONYMOUS)
 def health_check(req: func.HttpRequest) -> func.HttpResponse:
@@ -15,13 +23,50 @@ def health_check(req: func.HttpRequest) -> func.HttpResponse:
     return func.HttpResponse(f"This function executed successfully with version {version}.", status_code=200)
 
 
+@app.route("Warmup", auth_level=func.AuthLevel.ANONYMOUS)
+async def warmup(req: func.HttpRequest) -> func.HttpResponse:
+    """Preload skill modules, request schemas, tokenizer and clients, and report the start-up cost of every route."""
+    for handler in _handlers:
+        await asyncio.to_thread(handler.load)
+    await asyncio.to_thread(_preload_dependencies)
+
+    from common.clients import get_async_openai_client, get_client_stats
+    get_async_openai_client()
+
+    response_body = {
+        "routes": {handler.route: handler.get_stats() for handler in _handlers},
+        "clients": get_client_stats(),
+    }
+    logging.info(f"Warmup completed: {response_body}")
+    return func.HttpResponse(json.dumps(response_body), mimetype="application/json", status_code=200)
+
+
 @app.route("Chunk", auth_level=func.AuthLevel.ANONYMOUS)
 def chunk(req: func.HttpRequest) -> func.HttpResponse:
     """Divide document into chunks of text."""
-    return function_chunk(req)
+    return _chunk_handler(req)
 
 
 @app.route("Vector_Embed", auth_level=func.AuthLevel.ANONYMOUS)
-def vector_embed(req: func.HttpRequest) -> func.HttpResponse:
+async def vector_embed(req: func.HttpRequest) -> func.HttpResponse:
     """Convert text to vector embedding."""
-    return function_vector_embed(req)
+    return await _vector_embed_handler.call_async(req)
+
+
+@app.route("Chunk_Embed", auth_level=func.AuthLevel.ANONYMOUS)
+async def chunk_embed(req: func.HttpRequest) -> func.HttpResponse:
+    """Divide document into chunks of text and convert every chunk to vector embedding."""
+    return await _chunk_embed_handler.call_async(req)
+
+
+def _preload_dependencies():
+    """Compile the request validators, load the tokenizer and create the storage clients."""
+    from common.clients import get_container_client
+    from common.schema import get_request_validator
+    from common.tokenizer import get_tokenizer
+
+    app_root = os.path.dirname(__file__)
+    for skill in ["Chunk", "VectorEmbed", "ChunkEmbed"]:
+        get_request_validator(os.path.join(app_root, skill, "request_schema.json"))
+    get_tokenizer()
+    get_container_client()
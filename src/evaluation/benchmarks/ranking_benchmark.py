@@ -0,0 +1,93 @@
+"""
+Measure how the search metrics scale with the depth of the search results and the size of the ground truth.
+
+The list-based implementations that the evaluators used before the ranking engine are reproduced here as the
+baseline: list membership for every result and an average precision summing a new slice at every rank.
+
+Run from the root of the repo:
+`python -m src.evaluation.benchmarks.ranking_benchmark`
+"""
+import argparse
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+
+from src.evaluation.evaluators.search.ranking import RankingProfile, _normalize, _row_key, evaluate_batch
+
+
+def _legacy_metrics(search_result: List[Dict], ground_truth: List[Dict], ks: Tuple[int, ...]) -> None:
+    ground_truth = [(gt["filename"].lower(), str(gt["page_number"])) for gt in ground_truth]
+    search_results = [(sr["filename"].lower(), str(sr["page_number"])) for sr in search_result]
+    for k in ks:
+        top_k = search_results[:k]
+        _ = len([sr for sr in top_k if sr in ground_truth]) / len(top_k)
+        _ = len(set(top_k) & set(ground_truth)) / len(set(ground_truth))
+
+    correct_results = [sr in ground_truth for sr in search_results]
+    precision_sum = 0
+    for i in range(len(search_results)):
+        precision_sum += sum(correct_results[:i + 1]) / (i + 1) * correct_results[i]
+    for sr in search_results:
+        if sr in ground_truth:
+            break
+
+
+def _engine_metrics(search_result: List[Dict], ground_truth: List[Dict], ks: Tuple[int, ...]) -> None:
+    profile = RankingProfile(_normalize(_row_key(search_result)), _normalize(_row_key(ground_truth)))
+    for k in ks:
+        profile.precision_at(k)
+        profile.recall_at(k)
+
+
+def _make_rows(count: int, depth: int, ground_truth_size: int, seed: int = 0) -> List[Tuple[List[Dict], List[Dict]]]:
+    rng = random.Random(seed)
+    pages = max(4 * depth, 4 * ground_truth_size)
+
+    def documents(size: int) -> List[Dict]:
+        return [{"filename": f"doc{rng.randrange(8)}.pdf", "page_number": rng.randrange(pages)} for _ in range(size)]
+
+    return [(documents(depth), documents(ground_truth_size)) for _ in range(count)]
+
+
+def _measure(evaluate: Callable, rows: List, ks: Tuple[int, ...], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for search_result, ground_truth in rows:
+            evaluate(search_result, ground_truth, ks)
+        best = min(best, time.perf_counter() - start)
+    return best / len(rows)
+
+
+def _measure_batch(rows: List, ks: Tuple[int, ...], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        evaluate_batch(rows, ks)
+        best = min(best, time.perf_counter() - start)
+    return best / len(rows)
+
+
+def main():
+    """Run the benchmark and print the time per row of every implementation."""
+    parser = argparse.ArgumentParser("ranking_benchmark")
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--depths", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--ground_truth_sizes", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    ks = (3, 5, 10)
+
+    print(f"{'depth':>6} {'gt':>5} {'legacy us/row':>14} {'engine us/row':>14} {'batch us/row':>13} {'speedup':>8}")
+    for depth in args.depths:
+        for ground_truth_size in args.ground_truth_sizes:
+            rows = _make_rows(args.rows, depth, ground_truth_size)
+            legacy = _measure(_legacy_metrics, rows, ks, args.repeat)
+            engine = _measure(_engine_metrics, rows, ks, args.repeat)
+            batch = _measure_batch(rows, ks, args.repeat)
+            print(f"{depth:>6} {ground_truth_size:>5} {legacy * 1e6:>14.1f} {engine * 1e6:>14.1f} "
+                  f"{batch * 1e6:>13.1f} {legacy / engine:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
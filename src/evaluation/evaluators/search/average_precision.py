@@ -3,7 +3,7 @@
 from typing import Dict, List
 
 from src.evaluation.evaluators.search.evaluator import Evaluator
-from src.evaluation.evaluators.search.preprocessing import _preprocess_data
+from src.evaluation.evaluators.search.ranking import rank
 
 
 class AveragePrecisionEvaluator(Evaluator):
@@ -47,25 +47,4 @@ class AveragePrecisionEvaluator(Evaluator):
         Returns:
             float: Average Precision @ K
         """
-        # Preprocess data
-        ground_truth, search_results = _preprocess_data(search_result, ground_truth)
-
-        # If no ground truth provided or search results are empty
-        if len(ground_truth) == 0 or len(search_results) == 0:
-            return 0
-
-        # Calculate flags of correct results in the search results
-        correct_results = [sr in ground_truth for sr in search_results]
-
-        precision_sum = 0
-
-        for i in range(0, len(search_results)):
-            div = min(i, len(search_results)) + 1
-            correct_results_at_i = correct_results[:div]
-            precision_at_i = sum(correct_results_at_i) / div
-            precision_sum += precision_at_i * correct_results[i]
-
-        # Calculate average precision
-        result = precision_sum / len(ground_truth)
-
-        return result
+        return rank(search_result, ground_truth).average_precision
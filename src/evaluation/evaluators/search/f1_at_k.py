@@ -3,8 +3,7 @@
 from typing import Dict, List
 
 from src.evaluation.evaluators.search.evaluator import Evaluator
-from src.evaluation.evaluators.search.precision_at_k import PrecisionAtKEvaluator
-from src.evaluation.evaluators.search.recall_at_k import RecallAtKEvaluator
+from src.evaluation.evaluators.search.ranking import rank
 
 
 class F1AtKEvaluator(Evaluator):
@@ -44,18 +43,4 @@ class F1AtKEvaluator(Evaluator):
         Returns:
             float: F1 score @ K
         """
-        # Calculate precision
-        precision_evaluator = PrecisionAtKEvaluator(k=self.k)
-        precision = precision_evaluator.evaluate(search_result, ground_truth)
-
-        # Calculate recall
-        recall_evaluator = RecallAtKEvaluator(k=self.k)
-        recall = recall_evaluator.evaluate(search_result, ground_truth)
-
-        # Avoid division by zero
-        div = precision + recall
-
-        # Calculate f1 score @ K
-        result = 2 * (precision * recall) / div if div > 0 else 0
-
-        return result
+        return rank(search_result, ground_truth).f1_at(self.k)
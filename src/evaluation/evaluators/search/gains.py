@@ -0,0 +1,53 @@
+"""Gain functions giving graded credit to a search result for a ground truth document."""
+
+from dataclasses import dataclass
+from typing import Tuple
+
+
+@dataclass(frozen=True)
+class BinaryGain:
+    """Full credit for the exact (filename, page number) of a ground truth document, none otherwise."""
+
+    def __call__(self, result: Tuple[str, str], document: Tuple[str, str]) -> float:
+        """
+        Calculate the gain of a search result for a ground truth document of the same file.
+
+        Args:
+            result (Tuple[str, str]): normalized (filename, page number) of the search result
+            document (Tuple[str, str]): normalized (filename, page number) of the ground truth document
+
+        Returns:
+            float: the gain, between 0 and 1
+        """
+        return 1.0 if result == document else 0.0
+
+
+@dataclass(frozen=True)
+class NeighborPageGain:
+    """
+    Full credit for the exact page of a ground truth document, and partial credit for a nearby page of the same file.
+
+    The answer to a question often spans a page break, so a chunk of the previous or next page is still useful.
+    """
+
+    partial: float = 0.5
+    max_distance: int = 1
+
+    def __call__(self, result: Tuple[str, str], document: Tuple[str, str]) -> float:
+        """
+        Calculate the gain of a search result for a ground truth document of the same file.
+
+        Args:
+            result (Tuple[str, str]): normalized (filename, page number) of the search result
+            document (Tuple[str, str]): normalized (filename, page number) of the ground truth document
+
+        Returns:
+            float: 1 for the same page, `partial` for a page at most `max_distance` pages away, 0 otherwise
+        """
+        if result == document:
+            return 1.0
+        try:
+            distance = abs(int(result[1]) - int(document[1]))
+        except ValueError:
+            return 0.0
+        return self.partial if result[0] == document[0] and distance <= self.max_distance else 0.0
@@ -0,0 +1,154 @@
+"""Compute graded-relevance metrics (NDCG @ K, MAP @ K) with configurable gain functions."""
+
+from collections import defaultdict
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.evaluation.evaluators.search.gains import BinaryGain
+from src.evaluation.evaluators.search.ranking import _normalize, _row_key
+
+# A gain function: the credit (0 to 1) of a normalized search result for a normalized ground truth document
+GainFunction = Callable[[Tuple[str, str], Tuple[str, str]], float]
+
+_discounts = np.zeros(0)
+_ideal_dcg = np.zeros(1)
+
+
+def discounts(k: int) -> np.ndarray:
+    """
+    Return the log discounts 1 / log2(rank + 1) of the ranks 1 to K.
+
+    The table is computed once and grown by doubling when a larger K is requested.
+    """
+    global _discounts, _ideal_dcg
+    if k > len(_discounts):
+        size = max(k, 2 * len(_discounts), 16)
+        table = 1 / np.log2(np.arange(2, size + 2))
+        # _ideal_dcg[n]: DCG of n relevant documents at the top of the ranking, grown before the discounts
+        _ideal_dcg = np.concatenate([[0.0], np.cumsum(table)])
+        _discounts = table
+    return _discounts[:k]
+
+
+def ideal_dcg(relevant: Union[int, np.ndarray]) -> Union[float, np.ndarray]:
+    """Return the DCG of an ideal ranking of `relevant` documents, read from the precomputed table."""
+    discounts(int(np.max(relevant, initial=0)))
+    return _ideal_dcg[relevant]
+
+
+def graded_gains(
+    search_results: List[Tuple[str, str]], ground_truth: List[Tuple[str, str]], k: int, gain: GainFunction
+) -> List[float]:
+    """
+    Give every result of the top K the credit of a ground truth document.
+
+    Every ground truth document is credited at most once, so duplicated or nearby results can't score more
+    than an ideal ranking. Exact matches claim their document first, then the remaining results claim, in rank
+    order, the unclaimed document of their file that gives them the largest gain.
+
+    Args:
+        search_results (List[Tuple[str, str]]): normalized search results
+        ground_truth (List[Tuple[str, str]]): normalized ground truth
+        k (int): the number of results to evaluate
+        gain (GainFunction): the gain function
+
+    Returns:
+        List[float]: the gain of every result of the top K
+    """
+    top_k = search_results[:k]
+    documents = set(ground_truth)
+    gains = [0.0] * len(top_k)
+    claimed = set()
+    for i, result in enumerate(top_k):
+        if result in documents and result not in claimed:
+            claimed.add(result)
+            gains[i] = gain(result, result)
+
+    by_file = defaultdict(list)
+    for document in documents - claimed:
+        by_file[document[0]].append(document)
+    for i, result in enumerate(top_k):
+        if gains[i] or result[0] not in by_file:
+            continue
+        candidates = [(gain(result, document), document) for document in by_file[result[0]] if document not in claimed]
+        best_gain, best = max(candidates, default=(0.0, None))
+        if best_gain > 0:
+            claimed.add(best)
+            gains[i] = best_gain
+    return gains
+
+
+def _metrics_at_k(gains: List[float], ground_truth_unique: int, k: int) -> Tuple[float, float]:
+    """Return the NDCG and the average precision of the gains of the top K results."""
+    if ground_truth_unique == 0 or not gains:
+        return 0, 0
+    values = np.asarray(gains)
+    ndcg = float(values @ discounts(len(values)) / ideal_dcg(min(k, ground_truth_unique)))
+    ranks = np.arange(1, len(values) + 1)
+    average_precision = float(np.sum(np.cumsum(values) / ranks * values)) / min(k, ground_truth_unique)
+    return ndcg, average_precision
+
+
+@lru_cache(maxsize=4096)
+def _cached_metrics(search_key: Tuple, ground_truth_key: Tuple, k: int, gain: GainFunction) -> Tuple[float, float]:
+    search_results, ground_truth = _normalize(search_key), _normalize(ground_truth_key)
+    return _metrics_at_k(graded_gains(search_results, ground_truth, k, gain), len(set(ground_truth)), k)
+
+
+def graded_metrics_at_k(
+    search_result: List[Dict], ground_truth: List[Dict], k: int, gain: GainFunction = BinaryGain()
+) -> Tuple[float, float]:
+    """
+    Calculate NDCG @ K and average precision @ K of a row, memoized for the evaluators of the row.
+
+    Args:
+        search_result (List[Dict]): an array of search results
+        ground_truth (List[Dict]): an array of ground truth
+        k (int): the number of results to evaluate
+        gain (GainFunction): the gain function, hashable so the results can be memoized
+
+    Returns:
+        Tuple[float, float]: NDCG @ K and average precision @ K
+    """
+    return _cached_metrics(_row_key(search_result), _row_key(ground_truth), k, gain)
+
+
+def evaluate_graded_batch(
+    rows: Iterable[Tuple[List[Dict], List[Dict]]], ks: Sequence[int] = (3, 5, 10), gain: GainFunction = BinaryGain()
+) -> Dict[str, np.ndarray]:
+    """
+    Calculate NDCG @ K and MAP @ K for many rows at once.
+
+    The gains of every row are computed once per K, and the discounted sums of all the rows are computed
+    together with matrix operations and the precomputed discount tables.
+
+    Args:
+        rows (Iterable[Tuple[List[Dict], List[Dict]]]): the search results and the ground truth of every row
+        ks (Sequence[int]): the values of K
+        gain (GainFunction): the gain function
+
+    Returns:
+        Dict[str, np.ndarray]: the `ndcg_at_<k>` and `map_at_<k>` values of every row; the mean of `map_at_<k>`
+            over the rows is the MAP @ K
+    """
+    normalized = [(_normalize(_row_key(search_result)), _normalize(_row_key(ground_truth)))
+                  for search_result, ground_truth in rows]
+    ground_truth_unique = np.array([len(set(ground_truth)) for _, ground_truth in normalized], dtype=np.int64)
+
+    metrics = {}
+    for k in ks:
+        gains = np.zeros((len(normalized), k))
+        for i, (search_results, ground_truth) in enumerate(normalized):
+            row_gains = graded_gains(search_results, ground_truth, k, gain)
+            gains[i, :len(row_gains)] = row_gains
+
+        # Rows without ground truth have no gains, divide them by 1 to keep them at 0
+        relevant = np.minimum(k, ground_truth_unique)
+        evaluated = relevant > 0
+        ideal = np.where(evaluated, ideal_dcg(relevant), 1.0)
+        metrics[f"ndcg_at_{k}"] = gains @ discounts(k) / ideal
+        precision = np.cumsum(gains, axis=1) / np.arange(1, k + 1)
+        metrics[f"map_at_{k}"] = np.sum(precision * gains, axis=1) / np.where(evaluated, relevant, 1)
+    return metrics
@@ -0,0 +1,57 @@
+"""Calculate MAP @ K metric for search evaluation."""
+
+from typing import Dict, List
+
+from src.evaluation.evaluators.search.evaluator import Evaluator
+from src.evaluation.evaluators.search.gains import BinaryGain
+from src.evaluation.evaluators.search.graded_ranking import GainFunction, graded_metrics_at_k
+
+
+class MAPAtKEvaluator(Evaluator):
+    """
+    An evaluator to calculate the average precision within the top K results, averaged over the queries into MAP @ K.
+
+    AP @ K = sum of (precision @ i * gain of result i) for i <= K / min(K, number of ground truth documents)
+    """
+
+    def __init__(self, k: int = 10, gain: GainFunction = BinaryGain()):
+        """
+        Initialize the object of the class.
+
+        Args:
+            k (int): the number of results to evaluate
+            gain (GainFunction): the gain function, binary by default
+        """
+        self.k = k
+        self.gain = gain
+
+    def __call__(self, *, search_result, ground_truth):
+        """
+        Private method, that should be used exclusively for evaluation framework purposes.
+
+        Args:
+            search_result (List[Dict]): an array of search results
+            ground_truth (List[Dict]): an array of ground truth
+
+        Returns:
+            Dict: Result of evaluation in the following format: `{map_at_k: <value>}`
+        """
+        # Checking if we have an error in the results
+        if len(search_result) == 0:
+            return {f"map_at_{self.k}": 0}
+
+        return {f"map_at_{self.k}": self.evaluate(search_result, ground_truth)}
+
+    def evaluate(self, search_result: List[Dict], ground_truth: List[Dict]) -> float:
+        """
+        Calculate the average precision @ K of the search response, the mean over all queries is MAP @ K.
+
+        Args:
+            search_result (List[Dict]): an array of search results
+            ground_truth (List[Dict]): an array of ground truth
+
+        Returns:
+            float: Average precision @ K
+        """
+        _, average_precision = graded_metrics_at_k(search_result, ground_truth, self.k, self.gain)
+        return average_precision
@@ -0,0 +1,59 @@
+"""Calculate NDCG @ K metric for search evaluation."""
+
+from typing import Dict, List
+
+from src.evaluation.evaluators.search.evaluator import Evaluator
+from src.evaluation.evaluators.search.gains import BinaryGain
+from src.evaluation.evaluators.search.graded_ranking import GainFunction, graded_metrics_at_k
+
+
+class NDCGAtKEvaluator(Evaluator):
+    """
+    An evaluator to calculate the normalized discounted cumulative gain within the top K results.
+
+    NDCG @ K rewards relevant documents ranked near the top, with graded credit given by a gain function,
+    e.g. partial credit for a neighboring page of a ground truth document.
+    NDCG = DCG of the search results / DCG of an ideal ranking of the ground truth documents
+    """
+
+    def __init__(self, k: int = 10, gain: GainFunction = BinaryGain()):
+        """
+        Initialize the object of the class.
+
+        Args:
+            k (int): the number of results to evaluate
+            gain (GainFunction): the gain function, e.g. `NeighborPageGain(partial=0.5)`
+        """
+        self.k = k
+        self.gain = gain
+
+    def __call__(self, *, search_result, ground_truth):
+        """
+        Private method, that should be used exclusively for evaluation framework purposes.
+
+        Args:
+            search_result (List[Dict]): an array of search results
+            ground_truth (List[Dict]): an array of ground truth
+
+        Returns:
+            Dict: Result of evaluation in the following format: `{ndcg_at_k: <value>}`
+        """
+        # Checking if we have an error in the results
+        if len(search_result) == 0:
+            return {f"ndcg_at_{self.k}": 0}
+
+        return {f"ndcg_at_{self.k}": self.evaluate(search_result, ground_truth)}
+
+    def evaluate(self, search_result: List[Dict], ground_truth: List[Dict]) -> float:
+        """
+        Calculate NDCG @ K.
+
+        Args:
+            search_result (List[Dict]): an array of search results
+            ground_truth (List[Dict]): an array of ground truth
+
+        Returns:
+            float: NDCG @ K
+        """
+        ndcg, _ = graded_metrics_at_k(search_result, ground_truth, self.k, self.gain)
+        return ndcg
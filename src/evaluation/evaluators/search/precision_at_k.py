@@ -3,7 +3,7 @@
 from typing import Dict, List
 
 from src.evaluation.evaluators.search.evaluator import Evaluator
-from src.evaluation.evaluators.search.preprocessing import _preprocess_data
+from src.evaluation.evaluators.search.ranking import rank
 
 
 class PrecisionAtKEvaluator(Evaluator):
@@ -48,19 +48,4 @@ class PrecisionAtKEvaluator(Evaluator):
         Returns:
             float: Precision @ K
         """
-        # Preprocess data
-        ground_truth, top_k_search_results = _preprocess_data(
-            search_result, ground_truth, self.k
-        )
-
-        # If no ground truth provided or search results are empty
-        if len(ground_truth) == 0 or len(top_k_search_results) == 0:
-            return 0
-
-        # Calculate number of correct results in the search results
-        correct_results = [sr for sr in top_k_search_results if sr in ground_truth]
-
-        # Calculate precision @ K
-        result = len(correct_results) / len(top_k_search_results)
-
-        return result
+        return rank(search_result, ground_truth).precision_at(self.k)
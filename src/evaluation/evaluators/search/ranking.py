@@ -0,0 +1,243 @@
+"""
+Compute all the ranking metrics of a search response from a single pass over its results.
+
+Single rows are profiled with running counts in plain Python, which is the fastest for the usual result depths;
+`evaluate_batch` profiles many rows at once: documents are numbered once, and the relevance matrix, its cumulative
+sums and the metrics are computed with NumPy.
+"""
+
+from functools import lru_cache
+from itertools import accumulate
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+# Number of rows evaluated together by `evaluate_batch`, bounding the size of the relevance matrices
+BATCH_ROWS = 4096
+
+
+def _row_key(documents: Iterable[Dict]) -> Tuple[Tuple[Hashable, Hashable], ...]:
+    """Return the (filename, page number) pairs of documents."""
+    return tuple((document["filename"], document["page_number"]) for document in documents)
+
+
+def _normalize(pairs: Iterable[Tuple[str, Hashable]]) -> List[Tuple[str, str]]:
+    """Lowercase the filenames and convert the page numbers to strings, so equal documents compare equal."""
+    return [(filename.lower(), str(page)) for filename, page in pairs]
+
+
+def _relevance(search_results: List[Tuple], ground_truth: List[Tuple]) -> Tuple[List[bool], List[bool]]:
+    """
+    Flag the relevant search results, with one hashed lookup per result.
+
+    Args:
+        search_results (List[Tuple]): normalized search results
+        ground_truth (List[Tuple]): normalized ground truth
+
+    Returns:
+        Tuple[List[bool], List[bool]]: whether every result is in the ground truth, and whether it is the first
+        occurrence of a ground truth document in the results
+    """
+    ground_truth = set(ground_truth)
+    relevant = [sr in ground_truth for sr in search_results]
+    first = [False] * len(search_results)
+    seen = set()
+    for i, is_relevant in enumerate(relevant):
+        if is_relevant and search_results[i] not in seen:
+            seen.add(search_results[i])
+            first[i] = True
+    return relevant, first
+
+
+class RankingProfile:
+    """
+    Running counts of the relevant results of a search response, from which every metric is read at any K.
+
+    The metrics keep the semantics of the original evaluators: precision counts duplicated relevant results,
+    recall counts distinct ground truth documents, average precision is normalized by the number of ground
+    truth entries, and every metric is 0 when the search results or the ground truth are empty.
+    Building the profile is linear in the number of results, and reading a metric takes constant time.
+    """
+
+    __slots__ = (
+        "hits", "unique_hits", "ground_truth_count", "ground_truth_unique", "average_precision", "reciprocal_rank"
+    )
+
+    def __init__(self, search_results: List[Tuple], ground_truth: List[Tuple]):
+        """
+        Compute the running counts.
+
+        Args:
+            search_results (List[Tuple]): normalized search results
+            ground_truth (List[Tuple]): normalized ground truth
+        """
+        relevant, first = _relevance(search_results, ground_truth)
+        # hits[i]: relevant results in the top i + 1, unique_hits[i]: ground truth documents found in the top i + 1
+        self.hits = list(accumulate(relevant))
+        self.unique_hits = list(accumulate(first))
+        self.ground_truth_count = len(ground_truth)
+        self.ground_truth_unique = len(set(ground_truth))
+
+        ranks = [i for i, is_relevant in enumerate(relevant) if is_relevant]
+        if self.ground_truth_count == 0 or not ranks:
+            self.average_precision = 0
+            self.reciprocal_rank = 0
+            return
+
+        # Precision at the rank of every relevant result, from the running count of relevant results
+        self.average_precision = sum(self.hits[i] / (i + 1) for i in ranks) / self.ground_truth_count
+        self.reciprocal_rank = 1 / (ranks[0] + 1)
+
+    def _top(self, k: int = None) -> int:
+        """Return the number of results in the top K, 0 when there is nothing to evaluate."""
+        if self.ground_truth_count == 0:
+            return 0
+        return len(self.hits) if k is None else min(k, len(self.hits))
+
+    def precision_at(self, k: int = None) -> float:
+        """Return the share of the top K results that are in the ground truth."""
+        top = self._top(k)
+        return self.hits[top - 1] / top if top > 0 else 0
+
+    def recall_at(self, k: int = None) -> float:
+        """Return the share of the distinct ground truth documents found in the top K results."""
+        top = self._top(k)
+        return self.unique_hits[top - 1] / self.ground_truth_unique if top > 0 else 0
+
+    def f1_at(self, k: int = None) -> float:
+        """Return the harmonic mean of precision and recall at K."""
+        precision = self.precision_at(k)
+        recall = self.recall_at(k)
+        div = precision + recall
+        return 2 * (precision * recall) / div if div > 0 else 0
+
+
+@lru_cache(maxsize=1024)
+def _cached_profile(search_key: Tuple, ground_truth_key: Tuple) -> RankingProfile:
+    return RankingProfile(_normalize(search_key), _normalize(ground_truth_key))
+
+
+def rank(search_result: List[Dict], ground_truth: List[Dict]) -> RankingProfile:
+    """
+    Return the ranking profile of a row, computed once for all the evaluators of the row.
+
+    The evaluation framework calls every evaluator with the same row, so profiles are memoized by the
+    filenames and page numbers of the row.
+
+    Args:
+        search_result (List[Dict]): an array of search results
+        ground_truth (List[Dict]): an array of ground truth
+
+    Returns:
+        RankingProfile: the running counts of the relevant results of the row
+    """
+    return _cached_profile(_row_key(search_result), _row_key(ground_truth))
+
+
+def evaluate_batch(
+    rows: Iterable[Tuple[List[Dict], List[Dict]]], ks: Sequence[int] = (3, 5, 10)
+) -> Dict[str, np.ndarray]:
+    """
+    Evaluate many rows at once with matrix cumulative sums.
+
+    Args:
+        rows (Iterable[Tuple[List[Dict], List[Dict]]]): the search results and the ground truth of every row
+        ks (Sequence[int]): the values of K of the metrics at K
+
+    Returns:
+        Dict[str, np.ndarray]: one array of values per metric, named like the outputs of the evaluators
+            (`recall_at_<k>`, `precision_at_<k>`, `f1_score_at_<k>`, `average_precision`, `reciprocal_rank`)
+    """
+    ids = _DocumentIds()
+    numbered = [(ids.number(search_result), ids.number(ground_truth)) for search_result, ground_truth in rows]
+    parts = [
+        _evaluate_numbered(numbered[start:start + BATCH_ROWS], len(ids), ks)
+        for start in range(0, len(numbered), BATCH_ROWS)
+    ]
+    if not parts:
+        return {name: np.zeros(0) for name in _metric_names(ks)}
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+class _DocumentIds:
+    """Number the documents of a batch, so equal documents after normalization get the same number."""
+
+    def __init__(self):
+        self._raw: Dict[Tuple[Hashable, Hashable], int] = {}
+        self._normalized: Dict[Tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._normalized)
+
+    def number(self, documents: List[Dict]) -> List[int]:
+        numbers = []
+        for document in documents:
+            raw = (document["filename"], document["page_number"])
+            number = self._raw.get(raw)
+            if number is None:
+                (normalized,) = _normalize([raw])
+                number = self._raw[raw] = self._normalized.setdefault(normalized, len(self._normalized))
+            numbers.append(number)
+        return numbers
+
+
+def _metric_names(ks: Sequence[int]) -> List[str]:
+    names = []
+    for k in ks:
+        names += [f"recall_at_{k}", f"precision_at_{k}", f"f1_score_at_{k}"]
+    return names + ["average_precision", "reciprocal_rank"]
+
+
+def _pad(lists: List[List[int]], fill: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Stack lists of numbers into a matrix padded with `fill`, and return it with the length of every list."""
+    lengths = np.array([len(numbers) for numbers in lists], dtype=np.int64)
+    matrix = np.full((len(lists), max(1, int(lengths.max()))), fill, dtype=np.int64)
+    matrix[np.arange(matrix.shape[1]) < lengths[:, None]] = [number for numbers in lists for number in numbers]
+    return matrix, lengths
+
+
+def _evaluate_numbered(
+    rows: List[Tuple[List[int], List[int]]], id_count: int, ks: Sequence[int]
+) -> Dict[str, np.ndarray]:
+    """Evaluate a block of rows of numbered documents."""
+    results, lengths = _pad([search_results for search_results, _ in rows], fill=-1)
+    ground_truth, gt_lengths = _pad([ground_truth for _, ground_truth in rows], fill=-1)
+    gt_count = gt_lengths.astype(np.float64)
+    width = results.shape[1]
+
+    # Documents are compared within their row through keys combining the row and the document number
+    row_offsets = np.arange(len(rows), dtype=np.int64)[:, None] * (id_count + 1)
+    result_keys = np.where(results >= 0, row_offsets + results, -1)
+    gt_keys = np.unique(np.where(ground_truth >= 0, row_offsets + ground_truth, -1))
+    gt_keys = gt_keys[gt_keys >= 0]
+    gt_unique = np.bincount(gt_keys // (id_count + 1), minlength=len(rows)).astype(np.float64)
+
+    relevant = np.isin(result_keys, gt_keys)
+    # np.unique returns the first position of every key in the row-major order, i.e. its first occurrence in the row
+    first = np.zeros(relevant.size, dtype=bool)
+    first[np.unique(result_keys, return_index=True)[1]] = True
+    first = first.reshape(relevant.shape) & relevant
+
+    hits = np.cumsum(relevant, axis=1)
+    unique_hits = np.cumsum(first, axis=1)
+    valid = (gt_count > 0) & (lengths > 0)
+    index = np.arange(len(rows))
+
+    metrics = {}
+    for k in ks:
+        top = np.minimum(k, lengths)
+        at_k = np.maximum(top - 1, 0)
+        evaluated = valid & (top > 0)
+        precision = np.where(evaluated, hits[index, at_k] / np.maximum(top, 1), 0.0)
+        recall = np.where(evaluated, unique_hits[index, at_k] / np.maximum(gt_unique, 1), 0.0)
+        div = precision + recall
+        metrics[f"recall_at_{k}"] = recall
+        metrics[f"precision_at_{k}"] = precision
+        metrics[f"f1_score_at_{k}"] = np.where(div > 0, 2 * precision * recall / np.where(div > 0, div, 1), 0.0)
+
+    ranks = np.arange(1, width + 1)
+    precision_sum = np.sum(np.where(relevant, hits / ranks, 0.0), axis=1)
+    metrics["average_precision"] = np.where(valid, precision_sum / np.maximum(gt_count, 1), 0.0)
+    found = relevant.any(axis=1)
+    metrics["reciprocal_rank"] = np.where(valid & found, 1 / (np.argmax(relevant, axis=1) + 1), 0.0)
+    return metrics
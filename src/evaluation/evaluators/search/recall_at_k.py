@@ -3,7 +3,7 @@
 from typing import Dict, List
 
 from src.evaluation.evaluators.search.evaluator import Evaluator
-from src.evaluation.evaluators.search.preprocessing import _preprocess_data
+from src.evaluation.evaluators.search.ranking import rank
 
 
 class RecallAtKEvaluator(Evaluator):
@@ -51,21 +51,4 @@ class RecallAtKEvaluator(Evaluator):
         Returns:
             float: Recall @ K
         """
-        # Preprocess data
-        ground_truth, top_k_search_results = _preprocess_data(
-            search_result, ground_truth, self.k
-        )
-
-        # If no ground truth provided or search results are empty
-        if len(ground_truth) == 0 or len(top_k_search_results) == 0:
-            return 0
-
-        # Calculate intersection
-        set_top_k_search_results = set(top_k_search_results)
-        set_ground_truth = set(ground_truth)
-        intersection = set_top_k_search_results & set_ground_truth
-
-        # Calculate recall @ K
-        result = len(intersection) / len(set_ground_truth)
-
-        return result
+        return rank(search_result, ground_truth).recall_at(self.k)
@@ -3,7 +3,7 @@
 from typing import Dict, List
 
 from src.evaluation.evaluators.search.evaluator import Evaluator
-from src.evaluation.evaluators.search.preprocessing import _preprocess_data
+from src.evaluation.evaluators.search.ranking import rank
 
 
 class ReciprocalRankEvaluator(Evaluator):
@@ -47,18 +47,4 @@ class ReciprocalRankEvaluator(Evaluator):
         Returns:
             float: Reciprocal rank
         """
-        # Preprocess data
-        ground_truth, top_k_search_results = _preprocess_data(
-            search_result, ground_truth
-        )
-
-        # If no ground truth provided or search results are empty
-        if len(ground_truth) == 0 or len(top_k_search_results) == 0:
-            return 0
-
-        # Calculating rank of the first document
-        for i, sr in enumerate(top_k_search_results):
-            if sr in ground_truth:
-                return 1 / (i + 1)
-
-        return 0
+        return rank(search_result, ground_truth).reciprocal_rank
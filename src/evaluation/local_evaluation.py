@@ -0,0 +1,286 @@
+"""Run evaluations locally, with the `evaluators` and `column_mapping` semantics of `azure.ai.evaluation.evaluate`."""
+
+import inspect
+import json
+import logging
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from src.evaluation.targets.evaluation_target import EvaluationTarget
+
+# `${data.<column>}` or `${target.<output>}`, with optional nested keys
+_MAPPING = re.compile(r"^\$\{(data|target)\.([^}]+)\}$")
+
+# Evaluators of the worker processes, set once by the pool initializer
+_worker_evaluators: Dict[str, Callable] = {}
+_worker_config: Dict[str, Dict] = {}
+
+
+def load_jsonl(path: str) -> Iterator[Dict]:
+    """
+    Stream the rows of a JSON Lines file.
+
+    Args:
+        path (str): path to the file
+
+    Yields:
+        Dict: the rows of the file, skipping blank lines
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _lookup(values: Dict, path: str) -> Any:
+    """Read a value at a dotted path of nested dictionaries."""
+    for key in path.split("."):
+        values = values[key]
+    return values
+
+
+def _evaluator_parameters(evaluator: Callable) -> Dict[str, bool]:
+    """Return the names of the keyword parameters of an evaluator, and whether each of them is required."""
+    parameters = inspect.signature(evaluator).parameters.values()
+    return {
+        parameter.name: parameter.default is parameter.empty
+        for parameter in parameters
+        if parameter.kind in (parameter.POSITIONAL_OR_KEYWORD, parameter.KEYWORD_ONLY)
+    }
+
+
+def _resolve_inputs(
+    alias: str, column_mapping: Dict[str, str], parameters: Dict[str, bool], row: Dict, target_output: Dict
+) -> Dict[str, Any]:
+    """
+    Build the arguments of an evaluator from its column mapping.
+
+    Like the hosted evaluation, parameters missing from the column mapping take the target output or the data
+    column of the same name, the target output first.
+
+    Args:
+        alias (str): the alias of the evaluator, for error messages
+        column_mapping (Dict[str, str]): argument name to `${data.<column>}`, `${target.<output>}` or a literal value
+        parameters (Dict[str, bool]): the parameters of the evaluator, and whether each of them is required
+        row (Dict): the row of the data
+        target_output (Dict): the output of the target for the row
+
+    Returns:
+        Dict[str, Any]: the arguments of the evaluator
+
+    Raises:
+        ValueError: if a mapped column or a required parameter of the evaluator is missing from the row
+    """
+    inputs = {}
+    for name, reference in column_mapping.items():
+        match = _MAPPING.match(reference) if isinstance(reference, str) else None
+        if match is None:
+            inputs[name] = reference
+            continue
+        source, path = match.groups()
+        try:
+            inputs[name] = _lookup(row if source == "data" else target_output, path)
+        except (KeyError, TypeError):
+            raise ValueError(f"Input '{name}' of evaluator {alias} is mapped to {reference}, which is missing")
+
+    for name, required in parameters.items():
+        if name in inputs:
+            continue
+        if name in target_output:
+            inputs[name] = target_output[name]
+        elif name in row:
+            inputs[name] = row[name]
+        elif required:
+            raise ValueError(
+                f"Input '{name}' of evaluator {alias} is not mapped and is neither a target output nor a data column"
+            )
+    return inputs
+
+
+def _target_parameters(target: Callable) -> Optional[List[str]]:
+    """Return the names of the parameters of the target, None if it accepts any keyword argument."""
+    parameters = inspect.signature(target).parameters.values()
+    if any(parameter.kind == parameter.VAR_KEYWORD for parameter in parameters):
+        return None
+    return [parameter.name for parameter in parameters if parameter.kind != parameter.VAR_POSITIONAL]
+
+
+def _target_inputs(parameters: Optional[List[str]], row: Dict) -> Dict:
+    """Select the columns of the row matching the parameters of the target."""
+    if parameters is None:
+        return row
+    return {name: row[name] for name in parameters if name in row}
+
+
+def _call_target(target: Callable, parameters: Optional[List[str]], shard: List[Dict]) -> List[Dict]:
+    """Call the target for every row of a shard, with the batch API of evaluation targets."""
+    inputs = [_target_inputs(parameters, row) for row in shard]
+    if isinstance(target, EvaluationTarget):
+        return target.batch(inputs)
+    return [target(**kwargs) for kwargs in inputs]
+
+
+def _init_worker(evaluators: Dict[str, Callable], evaluator_config: Dict[str, Dict]) -> None:
+    global _worker_evaluators, _worker_config
+    _worker_evaluators, _worker_config = evaluators, evaluator_config
+
+
+def _evaluate_shard(shard: List[Dict]) -> List[Dict]:
+    """Evaluate a shard of rows with the evaluators of the worker."""
+    return evaluate_rows(shard, _worker_evaluators, _worker_config)
+
+
+def evaluate_rows(rows: List[Dict], evaluators: Dict[str, Callable], evaluator_config: Dict[str, Dict]) -> List[Dict]:
+    """
+    Run every evaluator on rows whose target has already been called.
+
+    Args:
+        rows (List[Dict]): the `data` row and the `target` output of every row
+        evaluators (Dict[str, Callable]): the evaluators by alias
+        evaluator_config (Dict[str, Dict]): the `column_mapping` of every alias, or of all of them with `default`
+
+    Returns:
+        List[Dict]: the result rows, with the `inputs.<column>`, the `outputs.<output>` of the target and the
+            `outputs.<alias>.<metric>` of the evaluators
+
+    Raises:
+        ValueError: if an input of an evaluator is missing from a row
+    """
+    default_mapping = evaluator_config.get("default", {}).get("column_mapping", {})
+    column_mappings = {
+        alias: evaluator_config.get(alias, {}).get("column_mapping", default_mapping) for alias in evaluators
+    }
+    parameters = {alias: _evaluator_parameters(evaluator) for alias, evaluator in evaluators.items()}
+    results = []
+    for row in rows:
+        data, target_output = row["data"], row["target"]
+        result = {f"inputs.{name}": value for name, value in data.items()}
+        result.update({f"outputs.{name}": value for name, value in target_output.items()})
+        for alias, evaluator in evaluators.items():
+            # Missing inputs are configuration errors and stop the evaluation, failures of an evaluator don't
+            inputs = _resolve_inputs(alias, column_mappings[alias], parameters[alias], data, target_output)
+            try:
+                outputs = evaluator(**inputs)
+            except Exception as e:
+                logging.warning(f"Evaluator {alias} failed: {e!r}")
+                continue
+            result.update({f"outputs.{alias}.{metric}": value for metric, value in outputs.items()})
+        results.append(result)
+    return results
+
+
+def _shards(rows: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    rows = iter(rows)
+    while True:
+        shard = list(islice(rows, size))
+        if not shard:
+            return
+        yield shard
+
+
+class _MetricAggregator:
+    """Running means of the numeric evaluator outputs, named `<alias>.<metric>` like the hosted evaluation."""
+
+    def __init__(self, aliases: Iterable[str]):
+        self.prefixes = tuple(f"outputs.{alias}." for alias in aliases)
+        self.sums: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, result: Dict) -> None:
+        for column, value in result.items():
+            if column.startswith(self.prefixes) and isinstance(value, (int, float)) and not isinstance(value, bool):
+                name = column[len("outputs."):]
+                self.sums[name] = self.sums.get(name, 0.0) + value
+                self.counts[name] = self.counts.get(name, 0) + 1
+
+    def metrics(self) -> Dict[str, float]:
+        return {name: self.sums[name] / self.counts[name] for name in self.sums}
+
+
+def evaluate_locally(
+    data: str,
+    evaluators: Dict[str, Callable],
+    evaluator_config: Optional[Dict[str, Dict]] = None,
+    target: Optional[Callable] = None,
+    output_path: str = "evaluation_results",
+    shard_size: int = 200,
+    max_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Evaluate a JSON Lines dataset locally and write the per-row and aggregate results to files.
+
+    Rows are streamed from the dataset in shards. The target is called for every row of a shard, through the
+    batch API of an `EvaluationTarget` so the rows of the shard can be served concurrently, then the shard is
+    evaluated by a pool of processes while the next shards are read, so evaluating a large dataset does not
+    need it all in memory. Results are written in the order of the dataset.
+
+    Args:
+        data (str): path to the JSON Lines dataset
+        evaluators (Dict[str, Callable]): the evaluators by alias, as given to `azure.ai.evaluation.evaluate`
+        evaluator_config (Dict[str, Dict], optional): the `column_mapping` of every alias or of the `default` alias
+        target (Callable, optional): called with the columns of every row matching its parameters, returns a dict;
+            the `batch` method of an `EvaluationTarget` is called once per shard
+        output_path (str): folder receiving `rows.jsonl` and `metrics.json`
+        shard_size (int): the number of rows evaluated together by a worker
+        max_workers (int, optional): the number of worker processes, 0 to evaluate in the current process
+
+    Returns:
+        Dict[str, Any]: the aggregate `metrics`, the number of `rows` and the paths of the result files
+    """
+    evaluator_config = evaluator_config or {}
+    parameters = _target_parameters(target) if target is not None else None
+    aggregator = _MetricAggregator(evaluators)
+    os.makedirs(output_path, exist_ok=True)
+    rows_path = os.path.join(output_path, "rows.jsonl")
+    metrics_path = os.path.join(output_path, "metrics.json")
+
+    def with_target_outputs(shard: List[Dict]) -> List[Dict]:
+        if target is None:
+            return [{"data": row, "target": {}} for row in shard]
+        return [{"data": row, "target": output} for row, output in zip(shard, _call_target(target, parameters, shard))]
+
+    row_count = 0
+    with open(rows_path, "w", encoding="utf-8") as rows_file:
+        def write(results: List[Dict]) -> None:
+            nonlocal row_count
+            for result in results:
+                aggregator.add(result)
+                rows_file.write(json.dumps(result) + "\n")
+            row_count += len(results)
+
+        shards = (with_target_outputs(shard) for shard in _shards(load_jsonl(data), shard_size))
+        if max_workers == 0:
+            for shard in shards:
+                write(evaluate_rows(shard, evaluators, evaluator_config))
+        else:
+            _evaluate_in_pool(shards, evaluators, evaluator_config, max_workers or os.cpu_count() or 1, write)
+
+    metrics = aggregator.metrics()
+    with open(metrics_path, "w", encoding="utf-8") as metrics_file:
+        json.dump({"metrics": metrics, "rows": row_count}, metrics_file, indent=2)
+    return {"metrics": metrics, "rows": row_count, "rows_path": rows_path, "metrics_path": metrics_path}
+
+
+def _evaluate_in_pool(
+    shards: Iterable[List[Dict]],
+    evaluators: Dict[str, Callable],
+    evaluator_config: Dict[str, Dict],
+    max_workers: int,
+    write: Callable[[List[Dict]], None],
+) -> None:
+    """Evaluate shards in worker processes and write their results in order."""
+    with ProcessPoolExecutor(
+        max_workers=max_workers, initializer=_init_worker, initargs=(evaluators, evaluator_config)
+    ) as executor:
+        # A few shards per worker are in flight, so the dataset is streamed instead of read at once
+        in_flight: deque = deque()
+        for shard in shards:
+            in_flight.append(executor.submit(_evaluate_shard, shard))
+            if len(in_flight) >= 2 * max_workers:
+                write(in_flight.popleft().result())
+        while in_flight:
+            write(in_flight.popleft().result())
@@ -0,0 +1,136 @@
+"""Concurrency limiter that backs off when a service throttles its requests."""
+
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+
+from azure.core.exceptions import HttpResponseError
+from azure.core.pipeline.policies import RetryPolicy
+
+# Status codes of a service asking its clients to slow down
+THROTTLED_STATUS_CODES = (429, 503)
+MAX_ATTEMPTS = 8
+# Upper bound of the exponential backoff when the service gives no retry hint, in seconds
+MAX_BACKOFF = 30
+
+T = TypeVar("T")
+
+
+def _get_retry_after(error: HttpResponseError) -> Optional[float]:
+    """Read the retry hint of a throttled response, in seconds."""
+    headers = error.response.headers if error.response is not None else {}
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+class UnthrottledRetryPolicy(RetryPolicy):
+    """
+    The retry policy of azure-core, without the retries of throttled responses.
+
+    Connection errors and the other transient status codes (408, 500, 502, 504) are still retried by the client,
+    while throttled responses are raised to the `AdaptiveConcurrencyLimiter`, which slows all the threads down.
+    """
+
+    def __init__(self, **kwargs):
+        """Create the policy with the settings of `RetryPolicy`."""
+        super().__init__(**kwargs)
+        self._retry_on_status_codes -= set(THROTTLED_STATUS_CODES)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Bound the number of concurrent requests to a service, and adapt it to the throttling of the service.
+
+    Requests are sent by any number of threads, but at most `limit` of them are in flight at once. The limit
+    starts at `max_concurrency`, is halved when the service starts throttling, and grows back by about one request
+    per round trip of successful requests. A throttled request pauses all the threads for the delay suggested by
+    the service, or an exponential backoff with jitter, before it is retried.
+    """
+
+    def __init__(self, max_concurrency: int, max_attempts: int = MAX_ATTEMPTS):
+        """Initialize the limiter at its maximum concurrency."""
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_attempts = max_attempts
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+        self._stats = {"requests": 0, "throttled": 0}
+
+    def run(self, call: Callable[[], T]) -> T:
+        """
+        Send a request once the limit allows it, retrying it when it is throttled.
+
+        Args:
+            call: sends the request and returns its result, raises `HttpResponseError` on an error response
+
+        Returns:
+            The result of the call
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            self._acquire()
+            try:
+                result = call()
+            except HttpResponseError as e:
+                if e.status_code not in THROTTLED_STATUS_CODES or attempt == self.max_attempts:
+                    raise
+                delay = _get_retry_after(e)
+                if delay is None:
+                    delay = random.uniform(0.5, min(MAX_BACKOFF, 2 ** attempt))
+                self._throttled(delay)
+                logging.warning(
+                    f"Search throttled ({e.status_code})! Retry Attempt #: {attempt} | Retry in {delay:.1f}s"
+                    f" | Concurrency limit {int(self.limit)}"
+                )
+                continue
+            finally:
+                self._release()
+            self._succeeded()
+            return result
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return the number of successful and throttled requests and the current concurrency limit."""
+        with self._condition:
+            return {**self._stats, "limit": int(self.limit)}
+
+    def _acquire(self) -> None:
+        with self._condition:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    self._condition.wait(pause)
+                elif self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                else:
+                    self._condition.wait()
+
+    def _release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def _throttled(self, delay: float) -> None:
+        with self._condition:
+            self._stats["throttled"] += 1
+            now = time.monotonic()
+            # Requests in flight when the service started throttling only halve the limit once
+            if now >= self._paused_until:
+                self.limit = max(1.0, self.limit / 2)
+            self._paused_until = max(self._paused_until, now + delay)
+
+    def _succeeded(self) -> None:
+        with self._condition:
+            self._stats["requests"] += 1
+            if self.limit < self.max_concurrency:
+                # Additive increase: about one more request in flight per round trip at the current limit
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                self._condition.notify_all()
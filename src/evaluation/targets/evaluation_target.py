@@ -1,6 +1,7 @@
 """Implement base Evaluation Target class."""
 
 from abc import ABC, abstractmethod
+from typing import Dict, List
 
 
 class EvaluationTarget(ABC):
@@ -10,3 +11,17 @@ class EvaluationTarget(ABC):
     def __call__(self, **kwargs):
         """Implement the main function to be called by the Evaluation SDK."""
         pass
+
+    def batch(self, inputs: List[Dict]) -> List[Dict]:
+        """
+        Call the target for many rows, in the order of the rows.
+
+        Targets that can serve several rows concurrently override this method.
+
+        Args:
+            inputs (List[Dict]): the keyword arguments of every call
+
+        Returns:
+            List[Dict]: the output of every call
+        """
+        return [self(**kwargs) for kwargs in inputs]
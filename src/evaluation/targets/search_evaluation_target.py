@@ -1,8 +1,13 @@
 """Implement Evaluation Target for Azure AI Search."""
 
+import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
 
+import requests
+from requests.adapters import HTTPAdapter
 from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import RequestsTransport
 from azure.search.documents import SearchClient
 from azure.search.documents.models import (
     QueryType,
@@ -10,8 +15,12 @@ from azure.search.documents.models import (
     QueryAnswerType,
     VectorizableTextQuery,
 )
+from src.evaluation.targets.adaptive_limiter import AdaptiveConcurrencyLimiter, UnthrottledRetryPolicy
 from src.evaluation.targets.evaluation_target import EvaluationTarget
 
+# Maximum number of search requests in flight at the same time
+SEARCH_MAX_CONCURRENCY = int(os.environ.get("SEARCH_MAX_CONCURRENCY", 8))
+
 
 class SearchEvaluationTarget(EvaluationTarget):
     """Implementation of `EvaluationTarget` class for Search."""
@@ -20,20 +29,60 @@ class SearchEvaluationTarget(EvaluationTarget):
     fields_to_select: List[str] = ["filename", "page_number"]
 
     def __init__(
-        self, index_name: str, semantic_config: str, endpoint: str, key: str
+        self,
+        index_name: str,
+        semantic_config: str,
+        endpoint: str,
+        key: str,
+        max_concurrency: int = SEARCH_MAX_CONCURRENCY,
     ) -> None:
         """
         Instantiate a `SearchEvaluationTarget` object.
 
+        All the queries share one search client and one pool of HTTP connections, sized for the concurrency cap.
+        Throttled queries are retried by the limiter of the target instead of the retry policy of the client, so
+        the concurrency of all the threads is reduced when the service throttles any of them. The client still
+        retries connection errors and the other transient errors itself.
+
         Args:
             index_name (str): name of the Azure AI Search index
             semantic_config (str): the name of the semantic configuration
             endpoint (str): Azure AI Search endpoint
             key (str): Azure AI Search key
+            max_concurrency (int, optional): maximum number of queries in flight at the same time
         """
-        credential = AzureKeyCredential(key)
-        self.search_client = SearchClient(endpoint, index_name, credential=credential)
+        self.index_name = index_name
         self.semantic_config = semantic_config
+        self.endpoint = endpoint
+        self.key = key
+        self.max_concurrency = max_concurrency
+        self._connect()
+
+    def _connect(self) -> None:
+        """Create the search client, its pool of HTTP connections and the concurrency limiter."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        self.search_client = SearchClient(
+            self.endpoint,
+            self.index_name,
+            credential=AzureKeyCredential(self.key),
+            transport=RequestsTransport(session=session, session_owner=False),
+            retry_policy=UnthrottledRetryPolicy(),
+        )
+        self.limiter = AdaptiveConcurrencyLimiter(self.max_concurrency)
+
+    def __getstate__(self) -> Dict:
+        """Return the configuration of the target, without its connections and locks, so it can be pickled."""
+        state = dict(self.__dict__)
+        del state["search_client"], state["limiter"]
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        """Restore the configuration of a pickled target and create new connections."""
+        self.__dict__.update(state)
+        self._connect()
 
     def __select_fields(self, dictionary: Dict, fields: List[str] = None) -> Dict:
         """
@@ -51,6 +100,32 @@ class SearchEvaluationTarget(EvaluationTarget):
         fields = [field for field in fields if field in dictionary.keys()]
         return {key: dictionary[key] for key in fields}
 
+    def _search(self, query: str, top: int) -> List[Dict]:
+        """
+        Run a search query and select the fields of its results.
+
+        Args:
+            query (str): search query
+            top (int): number of top results to fetch
+
+        Returns:
+            List[Dict]: the selected fields of the results
+        """
+        query_vector = VectorizableTextQuery(
+            text=query, k_nearest_neighbors=1, fields="content_vector", exhaustive=True
+        )
+
+        search_results = self.search_client.search(
+            search_text=query,
+            vector_queries=[query_vector],
+            query_type=QueryType.SEMANTIC,
+            semantic_configuration_name=self.semantic_config,
+            query_caption=QueryCaptionType.EXTRACTIVE,
+            query_answer=QueryAnswerType.EXTRACTIVE,
+            top=top,
+        )
+        return [self.__select_fields(res) for res in search_results]
+
     def __call__(self, query: str, top: int = 10):
         """
         Implement search call, will be used by the evaluation framework only.
@@ -60,22 +135,21 @@ class SearchEvaluationTarget(EvaluationTarget):
             top (int, optional): number of top results to fetch. Defaults to 3
         """
         try:
-            query_vector = VectorizableTextQuery(
-                text=query, k_nearest_neighbors=1, fields="content_vector", exhaustive=True
-            )
-
-            search_results = self.search_client.search(
-                search_text=query,
-                vector_queries=[query_vector],
-                query_type=QueryType.SEMANTIC,
-                semantic_configuration_name=self.semantic_config,
-                query_caption=QueryCaptionType.EXTRACTIVE,
-                query_answer=QueryAnswerType.EXTRACTIVE,
-                top=top,
-            )
-            result = list(search_results)
-            result_selected_fields = [self.__select_fields(res) for res in result]
+            result_selected_fields = self.limiter.run(lambda: self._search(query, top))
             res = {"error": "", "search_result": result_selected_fields}
         except Exception as ex:
             res = {"error": str(ex), "search_result": []}
         return res
+
+    def batch(self, inputs: List[Dict]) -> List[Dict]:
+        """
+        Run many search queries concurrently, at most `max_concurrency` at a time.
+
+        Args:
+            inputs (List[Dict]): the `query` and optional `top` of every call
+
+        Returns:
+            List[Dict]: the `error` and `search_result` of every query, in the order of the inputs
+        """
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            return list(executor.map(lambda kwargs: self(**kwargs), inputs))
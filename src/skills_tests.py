@@ -100,3 +100,45 @@ def test_embedder(url: str, headers: dict, chunker_response=None):
     print("Embed Request failed with status code:", response.status_code)
     print("Response:", response.text)
     raise SystemExit("Embed test failed")
+
+
+def test_chunk_embedder(url: str, headers: dict):
+    """
+    Test the fused chunk and embed function.
+
+    Args:
+        url: The url of the function
+        headers: The headers
+
+    Returns:
+        The response body if successful, raise SystemExit exception otherwise
+    """
+    retry = 3
+    status_code = -1
+
+    while status_code != 200 and retry > 0:
+        request_file_path = "src/requests/toChunker.json"
+        request_body = read_json_from_file(request_file_path)
+        response = requests.post(url=url, headers=headers, json=request_body)
+        status_code = response.status_code
+
+        retry = retry - 1
+
+        if status_code == 200:
+            # verify some things
+            response_body = response.json()
+            chunks = response_body["values"][0]["data"]["chunks"]
+            if len(chunks) == 6 and all(len(chunk["embedding"]) == 1536 for chunk in chunks):
+                print("Chunk and embed test passed")
+                return response_body
+            else:
+                print("Chunk and embed test failed")
+                print("Response:", response.text)
+                raise SystemExit("Chunk and embed test failed")
+        else:
+            print(f"The request failed, and it will be resubmitted for {retry} times.")
+            time.sleep(5)
+
+    print("Chunk and embed Request failed with status code:", response.status_code)
+    print("Response:", response.text)
+    raise SystemExit("Chunk and embed test failed")
@@ -0,0 +1,104 @@
+"""Unit tests for the chunk cache of the Chunk skill."""
+
+import unittest
+from unittest.mock import patch
+
+import Chunk
+from Chunk.chunk_cache import make_cache_key
+from common.deadline import DeadlineExceededError
+from tests.test_chunk_document import FakeBlobClient, patch_blob
+
+
+class ExpiringDeadline:
+    """A deadline that passes after a given number of checks."""
+
+    def __init__(self, checks):
+        """Allow the given number of checks."""
+        self.checks = checks
+
+    def check(self, work):
+        """Raise DeadlineExceededError once the allowed checks are used."""
+        self.checks -= 1
+        if self.checks < 0:
+            raise DeadlineExceededError(f"The deadline passed before {work}")
+
+
+class TestMakeCacheKey(unittest.TestCase):
+    """Validate the fields of the cache key."""
+
+    def test_every_field_changes_the_key(self):
+        """The key changes with the blob version and with every chunking parameter."""
+        key = make_cache_key("a.pdf", "etag", b"md5", chunk_size=256, encoding="cl100k_base")
+        self.assertEqual(key, make_cache_key("a.pdf", "etag", b"md5", encoding="cl100k_base", chunk_size=256))
+        others = [
+            make_cache_key("b.pdf", "etag", b"md5", chunk_size=256, encoding="cl100k_base"),
+            make_cache_key("a.pdf", "etag2", b"md5", chunk_size=256, encoding="cl100k_base"),
+            make_cache_key("a.pdf", "etag", b"md6", chunk_size=256, encoding="cl100k_base"),
+            make_cache_key("a.pdf", "etag", None, chunk_size=256, encoding="cl100k_base"),
+            make_cache_key("a.pdf", "etag", b"md5", chunk_size=512, encoding="cl100k_base"),
+            make_cache_key("a.pdf", "etag", b"md5", chunk_size=256, encoding="o200k_base"),
+        ]
+        self.assertNotIn(key, others)
+        self.assertEqual(len(set(others)), len(others))
+
+
+class TestChunkCache(unittest.TestCase):
+    """Validate when the chunks of a document are served from the cache."""
+
+    def setUp(self):
+        """Serve PerksPlus.pdf from a fake container, with an empty chunk cache."""
+        self.blob_client = FakeBlobClient("PerksPlus.pdf")
+        patcher = patch_blob(self.blob_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hit_skips_download(self):
+        """Chunking an unchanged document again returns the cached chunks without downloading it."""
+        chunks = Chunk._chunk_pdf_file_from_azure2("PerksPlus.pdf")
+        self.assertEqual(Chunk._chunk_pdf_file_from_azure2("PerksPlus.pdf"), chunks)
+        self.assertEqual(self.blob_client.downloads, 1)
+        self.assertEqual(Chunk._chunk_cache.get_stats()["memory_hits"], 1)
+
+    def test_changes_miss(self):
+        """A new ETag, a new MD5 or other chunking parameters download the document again."""
+        Chunk._chunk_pdf_file_from_azure2("PerksPlus.pdf")
+        self.blob_client.properties.etag = "etag-2"
+        Chunk._chunk_pdf_file_from_azure2("PerksPlus.pdf")
+        self.blob_client.properties.content_settings.content_md5 = b"md5-2"
+        Chunk._chunk_pdf_file_from_azure2("PerksPlus.pdf")
+        Chunk._chunk_pdf_file_from_azure2("PerksPlus.pdf", chunk_size=500)
+        self.assertEqual(self.blob_client.downloads, 4)
+        self.assertEqual(Chunk._chunk_cache.get_stats(), {"memory_hits": 0, "backend_hits": 0, "misses": 4})
+
+    def test_tokenizer_encoding_misses(self):
+        """Chunks sized in tokens are not served to a different tokenizer encoding."""
+        def count_words(text):
+            return len(text.split())
+
+        with patch("common.tokenizer.count_tokens", side_effect=count_words), \
+                patch.object(Chunk, "count_tokens", side_effect=count_words):
+            Chunk._chunk_pdf_file_from_azure2("PerksPlus.pdf", 100, 10, size_unit="tokens")
+            with patch.object(Chunk, "TOKENIZER_ENCODING", "o200k_base"):
+                Chunk._chunk_pdf_file_from_azure2("PerksPlus.pdf", 100, 10, size_unit="tokens")
+        self.assertEqual(self.blob_client.downloads, 2)
+
+    def test_partial_results_are_not_stored(self):
+        """Documents that run out of time or fail while they are parsed are not cached."""
+        with self.assertRaises(DeadlineExceededError):
+            Chunk._chunk_pdf_file_from_azure2("PerksPlus.pdf", deadline=ExpiringDeadline(checks=2))
+
+        stream_pdf_pages = Chunk.stream_pdf_pages
+
+        def fail_after_first_page(*args, **kwargs):
+            pages = stream_pdf_pages(*args, **kwargs)
+            yield next(pages)
+            raise OSError("connection reset")
+
+        with patch.object(Chunk, "stream_pdf_pages", side_effect=fail_after_first_page):
+            with self.assertRaises(OSError):
+                Chunk._chunk_pdf_file_from_azure2("PerksPlus.pdf")
+
+        self.assertEqual(self.blob_client.downloads, 2)
+        Chunk._chunk_pdf_file_from_azure2("PerksPlus.pdf")
+        self.assertEqual(self.blob_client.downloads, 3)
+        self.assertEqual(Chunk._chunk_cache.get_stats()["memory_hits"], 0)
@@ -0,0 +1,71 @@
+"""Unit tests for the chunking of the PDF files of a blob container."""
+
+import json
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import Chunk
+from Chunk.chunk_cache import ChunkCache
+
+DATA_FOLDER = os.path.join(os.path.dirname(__file__), "..", "data")
+
+
+class FakeBlobClient:
+    """Serve a PDF file of the data folder like a BlobClient, counting the downloads."""
+
+    def __init__(self, file_name, etag="etag-1", content_md5=b"md5-1"):
+        """Point the client to a file of the data folder."""
+        self.path = os.path.join(DATA_FOLDER, file_name)
+        self.properties = SimpleNamespace(etag=etag, content_settings=SimpleNamespace(content_md5=content_md5))
+        self.downloads = 0
+
+    def get_blob_properties(self):
+        """Return the ETag and MD5 of the blob."""
+        return self.properties
+
+    def download_blob(self, **kwargs):
+        """Return a downloader writing the content of the file to a buffer."""
+        self.downloads += 1
+        with open(self.path, "rb") as f:
+            data = f.read()
+        return SimpleNamespace(readinto=lambda buffer: buffer.write(data))
+
+
+def patch_blob(blob_client):
+    """Serve every blob of the container with the given client, and start from an empty chunk cache."""
+    container_client = SimpleNamespace(get_blob_client=lambda blob: blob_client)
+    return patch.multiple(Chunk, get_container_client=lambda: container_client, _chunk_cache=ChunkCache(1 << 24))
+
+
+class TestChunkDocument(unittest.TestCase):
+    """Validate the chunks of a document in both size units."""
+
+    def test_characters_by_default(self):
+        """Chunks are sized in characters by default, without tokenizing them."""
+        with patch_blob(FakeBlobClient("PerksPlus.pdf")), \
+                patch.object(Chunk, "count_tokens", side_effect=AssertionError("tokenized")):
+            chunks = Chunk.chunk_document("PerksPlus.pdf")
+
+        # The deployment smoke tests of skills_tests.py expect 6 chunks for this file
+        self.assertEqual(Chunk.CHUNK_SIZE_UNIT, "characters")
+        self.assertEqual(len(chunks), 6)
+        self.assertTrue(all(len(chunk["page_content"]) <= 1000 for chunk in chunks))
+        self.assertTrue(all("token_count" not in chunk for chunk in chunks))
+
+    def test_tokens(self):
+        """Chunks sized in tokens are at most the chunk size, and return their token count."""
+        def count_words(text):
+            return len(text.split())
+
+        with patch_blob(FakeBlobClient("PerksPlus.pdf")), \
+                patch("common.tokenizer.count_tokens", side_effect=count_words), \
+                patch.object(Chunk, "count_tokens", side_effect=count_words):
+            chunks = Chunk._chunk_pdf_file_from_azure2("PerksPlus.pdf", 100, 10, size_unit="tokens")
+
+        chunks = json.loads(chunks)
+        self.assertGreater(len(chunks), 6)
+        self.assertEqual([chunk["token_count"] for chunk in chunks],
+                         [count_words(chunk["page_content"]) for chunk in chunks])
+        self.assertLessEqual(max(chunk["token_count"] for chunk in chunks), 100)
@@ -0,0 +1,42 @@
+"""Unit tests for the shared client registry."""
+
+import asyncio
+import gc
+import unittest
+
+from common.clients import ClientRegistry, get_async_openai_client
+
+
+class TestClientRegistry(unittest.TestCase):
+    """Validate the clients bound to an event loop."""
+
+    def test_clients_per_loop(self):
+        """A loop reuses its client, another loop gets its own, and closed loops release their clients."""
+        registry = ClientRegistry()
+
+        async def get_client():
+            return registry.get_or_create_for_loop("async", "key", object)
+
+        async def get_client_twice():
+            return await get_client(), await get_client()
+
+        first, again = asyncio.run(get_client_twice())
+        self.assertIs(first, again)
+        self.assertIsNot(asyncio.run(get_client()), first)
+        self.assertEqual(registry.get_stats(), {"async": {"created": 2, "reused": 1}})
+
+        gc.collect()
+        self.assertEqual(len(registry._loop_clients), 0)
+
+    def test_async_openai_client(self):
+        """The asynchronous OpenAI client is shared within a loop for the same endpoint."""
+        async def get_clients():
+            return (
+                get_async_openai_client("https://a.openai.azure.com", "key", "2024-02-01"),
+                get_async_openai_client("https://a.openai.azure.com", "key", "2024-02-01"),
+                get_async_openai_client("https://b.openai.azure.com", "key", "2024-02-01"),
+            )
+
+        first, again, other = asyncio.run(get_clients())
+        self.assertIs(first, again)
+        self.assertIsNot(first, other)
@@ -0,0 +1,135 @@
+"""Unit tests for the generation of embeddings by the VectorEmbed skill."""
+
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+import azure.functions as func
+import httpx
+import openai
+
+import VectorEmbed
+from common.deadline import Deadline, DeadlineExceededError
+from VectorEmbed.coalescer import EmbeddingCoalescer
+from VectorEmbed.embedding_cache import EmbeddingCache
+
+
+class TestEmbedTexts(unittest.TestCase):
+    """Validate that every unique text is embedded once per request."""
+
+    def setUp(self):
+        """Replace Azure OpenAI and the tokenizer, and start with an empty cache."""
+        self.requested = []
+
+        async def generate_embeddings(texts, token_count):
+            if any("fail" in text for text in texts):
+                raise RuntimeError("retries exhausted")
+            self.requested.extend(texts)
+            return [[float(len(text)), 1.0] for text in texts]
+
+        patches = [
+            mock.patch.object(VectorEmbed, "_generate_embeddings", generate_embeddings),
+            mock.patch.object(VectorEmbed, "count_tokens", lambda text: len(text.split())),
+            mock.patch.object(VectorEmbed, "_embedding_cache", EmbeddingCache(max_bytes=1024 * 1024)),
+            # One batch per text, so a failure only concerns its own text
+            mock.patch.object(VectorEmbed, "make_batches", lambda counts: [[i] for i in range(len(counts))]),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_duplicates_are_embedded_once(self):
+        """Texts differing only in whitespace share one embedding, in the order of the texts."""
+        texts = ["All rights reserved", "Page one", "All  rights\nreserved", "Page two"]
+        with self.assertLogs(level="INFO") as logs:
+            embeddings = asyncio.run(VectorEmbed.embed_texts(texts))
+
+        self.assertEqual(self.requested, ["All rights reserved", "Page one", "Page two"])
+        self.assertEqual(embeddings, [[19.0, 1.0], [8.0, 1.0], [19.0, 1.0], [8.0, 1.0]])
+        self.assertTrue(any("dedup ratio 25.0%, 3 tokens saved" in line for line in logs.output))
+
+    def test_cached_duplicates_are_not_embedded(self):
+        """Texts embedded by a previous request are served from the cache."""
+        asyncio.run(VectorEmbed.embed_texts(["Legal footer"]))
+        self.requested.clear()
+        embeddings = asyncio.run(VectorEmbed.embed_texts(["Legal footer", "Legal  footer"]))
+        self.assertEqual(self.requested, [])
+        self.assertEqual(embeddings, [[12.0, 1.0], [12.0, 1.0]])
+
+    def test_known_token_counts_are_not_recounted(self):
+        """Texts with a token count, like the chunks of the Chunk skill, are not tokenized again."""
+        with mock.patch.object(VectorEmbed, "count_tokens", side_effect=lambda text: 1) as count_tokens:
+            with self.assertLogs(level="INFO"):
+                asyncio.run(VectorEmbed.embed_texts(["Page one", "Page two"], token_counts=[2, None]))
+        count_tokens.assert_called_once_with("Page two")
+
+    def test_failed_batches_only_fail_their_texts(self):
+        """The texts of a failed batch get its exception, the others their embedding, and failures are not cached."""
+        with self.assertLogs(level="INFO"):
+            embeddings = asyncio.run(VectorEmbed.embed_texts(["Page one", "fail", "Page two"]))
+        self.assertEqual(embeddings[0], [8.0, 1.0])
+        self.assertIsInstance(embeddings[1], RuntimeError)
+        self.assertEqual(embeddings[2], [8.0, 1.0])
+        self.assertEqual(len(VectorEmbed._embedding_cache.get_many(["fail"])), 0)
+
+    def test_rejected_texts_are_isolated(self):
+        """A batch rejected by the service is split, so only the texts it rejects fail."""
+        batches = []
+
+        async def generate_embeddings(texts, token_count):
+            batches.append(len(texts))
+            if "too long" in texts:
+                response = httpx.Response(400, request=httpx.Request("POST", "https://localhost"))
+                raise openai.BadRequestError("Invalid input", response=response, body=None)
+            return [[float(len(text)), 1.0] for text in texts]
+
+        texts = ["Page one", "Page two", "too long", "Page four", "Page five"]
+        with mock.patch.object(VectorEmbed, "_generate_embeddings", generate_embeddings), \
+                mock.patch.object(VectorEmbed, "make_batches", lambda counts: [list(range(len(counts)))]), \
+                self.assertLogs(level="INFO"):
+            embeddings = asyncio.run(VectorEmbed.embed_texts(texts))
+
+        self.assertIsInstance(embeddings[2], openai.BadRequestError)
+        self.assertEqual([embedding for index, embedding in enumerate(embeddings) if index != 2],
+                         [[8.0, 1.0], [8.0, 1.0], [9.0, 1.0], [9.0, 1.0]])
+        # The batch of 5, its halves of 2 and 3, then the halves of 1 and 2 of the rejected half
+        self.assertEqual(sorted(batches), [1, 2, 2, 3, 5])
+
+    def test_spent_deadline_stops_new_requests(self):
+        """No request is sent once the time budget of the request is spent."""
+        embeddings = asyncio.run(VectorEmbed.embed_texts(["Page one", "Page two"], Deadline(0)))
+        self.assertEqual(self.requested, [])
+        self.assertTrue(all(isinstance(embedding, DeadlineExceededError) for embedding in embeddings))
+
+    def test_concurrent_requests_are_coalesced(self):
+        """With coalescing enabled, the texts of concurrent requests are embedded in a single batch."""
+        coalescer = EmbeddingCoalescer(lambda texts, token_counts: VectorEmbed._embed_batch(texts, token_counts),
+                                       max_wait=0.05)
+
+        async def run():
+            return await asyncio.gather(VectorEmbed.embed_texts(["Page one"]), VectorEmbed.embed_texts(["Page two"]))
+
+        with mock.patch.object(VectorEmbed, "_coalescer", coalescer), self.assertLogs(level="INFO"):
+            embeddings = asyncio.run(run())
+        self.assertEqual(embeddings, [[[8.0, 1.0]], [[8.0, 1.0]]])
+        self.assertEqual(coalescer.get_stats()["batches"], 1)
+
+    def test_failed_records_carry_errors(self):
+        """The skill returns the records that were embedded and reports the others in their errors."""
+        body = {
+            "values": [
+                {"recordId": "1", "data": {"chunk": {"page_content": "Page one", "page": 1}}},
+                {"recordId": "2", "data": {"chunk": {"page_content": "fail", "page": 2}}},
+            ]
+        }
+        request = func.HttpRequest("POST", "/api/embed", body=json.dumps(body).encode())
+        with self.assertLogs(level="INFO"):
+            response = asyncio.run(VectorEmbed.function_vector_embed(request))
+
+        self.assertEqual(response.status_code, 200)
+        first, second = json.loads(response.get_body())["values"]
+        self.assertEqual(first, {"recordId": "1", "data": {"embedding": [8.0, 1.0], "page": 1}, "errors": None,
+                                 "warnings": None})
+        self.assertEqual(second["data"], {})
+        self.assertIn("retries exhausted", second["errors"][0]["message"])
@@ -0,0 +1,28 @@
+"""Unit tests for packing texts into embedding requests."""
+
+import unittest
+
+from VectorEmbed.batching import make_batches
+
+
+class TestMakeBatches(unittest.TestCase):
+    """Validate that batches respect the item and token limits and keep the order."""
+
+    def test_respects_item_limit(self):
+        """Batches never contain more than `max_items` texts."""
+        batches = make_batches([1] * 10, max_items=4, max_tokens=100)
+        self.assertEqual(batches, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+
+    def test_respects_token_limit(self):
+        """A new batch is started before the token budget is exceeded."""
+        batches = make_batches([5, 5, 5, 2, 9], max_items=10, max_tokens=10)
+        self.assertEqual(batches, [[0, 1], [2, 3], [4]])
+
+    def test_oversized_text_gets_own_batch(self):
+        """A text larger than the budget is still sent, on its own."""
+        batches = make_batches([3, 50, 3], max_items=10, max_tokens=10)
+        self.assertEqual(batches, [[0], [1], [2]])
+
+    def test_empty_input(self):
+        """No texts produce no batches."""
+        self.assertEqual(make_batches([]), [])
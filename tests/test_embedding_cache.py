@@ -0,0 +1,44 @@
+"""Unit tests for the embedding cache."""
+
+import os
+import tempfile
+import unittest
+
+from common.cache_backends import SqliteBackend
+from VectorEmbed.embedding_cache import EmbeddingCache, encode_vector, make_embedding_key
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    """Validate keys, eviction and the persistent level of the embedding cache."""
+
+    def test_key_ignores_formatting_but_not_deployment(self):
+        """Whitespace differences share a key, different deployments don't."""
+        key = make_embedding_key("Health  plan\n benefits", "ada", "2023-07-01-preview")
+        self.assertEqual(key, make_embedding_key(" Health plan benefits ", "ada", "2023-07-01-preview"))
+        self.assertNotEqual(key, make_embedding_key("Health plan benefits", "ada-3", "2023-07-01-preview"))
+
+    def test_roundtrip_is_float32(self):
+        """Vectors are stored as float32 values."""
+        cache = EmbeddingCache(max_bytes=1024)
+        cache.put_many({"a": [0.5, -0.25]})
+        self.assertEqual(cache.get_many(["a", "b"]), {"a": [0.5, -0.25]})
+        self.assertEqual(cache.get_stats(), {"memory_hits": 1, "backend_hits": 0, "misses": 1})
+
+    def test_lru_eviction(self):
+        """The least recently used vector is evicted when the memory level is full."""
+        cache = EmbeddingCache(max_bytes=2 * len(encode_vector([0.0, 0.0])))
+        cache.put_many({"a": [1.0, 1.0], "b": [2.0, 2.0]})
+        cache.get_many(["a"])
+        cache.put_many({"c": [3.0, 3.0]})
+        self.assertEqual(set(cache.get_many(["a", "b", "c"])), {"a", "c"})
+
+    def test_persistent_backend(self):
+        """Vectors evicted from memory are found in the SQLite backend."""
+        with tempfile.TemporaryDirectory() as directory:
+            backend = SqliteBackend(os.path.join(directory, "embeddings.db"))
+            cache = EmbeddingCache(max_bytes=1024, backend=backend)
+            cache.put_many({"a": [1.0, 2.0]})
+
+            cache = EmbeddingCache(max_bytes=1024, backend=backend)
+            self.assertEqual(cache.get_many(["a"]), {"a": [1.0, 2.0]})
+            self.assertEqual(cache.get_stats()["backend_hits"], 1)
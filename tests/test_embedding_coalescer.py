@@ -0,0 +1,72 @@
+"""Unit tests for the coalescing of the embedding requests of concurrent invocations."""
+
+import asyncio
+import time
+import unittest
+
+from VectorEmbed.coalescer import EmbeddingCoalescer
+
+
+class TestEmbeddingCoalescer(unittest.TestCase):
+    """Validate that concurrent texts share batches and get their own embeddings back."""
+
+    def setUp(self):
+        """Record the batches sent to a fake embedding endpoint."""
+        self.batches = []
+
+    async def send(self, texts, token_counts):
+        """Embed every text as its length, failing the batches containing "fail"."""
+        self.batches.append((list(texts), sum(token_counts)))
+        await asyncio.sleep(0)
+        if any("fail" in text for text in texts):
+            raise RuntimeError("retries exhausted")
+        return [[float(len(text))] for text in texts]
+
+    def test_concurrent_requests_share_a_batch(self):
+        """Texts submitted within the wait are sent together and routed back to their request."""
+        coalescer = EmbeddingCoalescer(self.send, max_wait=0.05)
+
+        async def run():
+            return await asyncio.gather(
+                coalescer.embed(["a", "bb"], [1, 2]), coalescer.embed(["ccc"], [3]), coalescer.embed([], [])
+            )
+
+        first, second, empty = asyncio.run(run())
+        self.assertEqual(self.batches, [(["a", "bb", "ccc"], 6)])
+        self.assertEqual((first, second, empty), ([[1.0], [2.0]], [[3.0]], []))
+        self.assertEqual(coalescer.get_stats()["tokens_per_batch"], 6)
+
+    def test_full_batches_do_not_wait(self):
+        """A full batch is sent right away, the rest once the oldest text has waited long enough."""
+        coalescer = EmbeddingCoalescer(self.send, max_wait=0.2, max_items=2)
+
+        async def run():
+            full = asyncio.ensure_future(coalescer.embed(["a", "b", "c"], [1, 1, 1]))
+            await asyncio.sleep(0.05)
+            self.assertEqual(self.batches, [(["a", "b"], 2)])
+            return await full
+
+        start = time.monotonic()
+        self.assertEqual(asyncio.run(run()), [[1.0], [1.0], [1.0]])
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertEqual(self.batches, [(["a", "b"], 2), (["c"], 1)])
+
+    def test_failed_batch_only_fails_its_texts(self):
+        """Texts of a failed batch get its error, the texts of other batches their embedding."""
+        coalescer = EmbeddingCoalescer(self.send, max_wait=0.01, max_items=1)
+        embeddings = asyncio.run(coalescer.embed(["ok", "fail"], [1, 1]))
+        self.assertEqual(embeddings[0], [2.0])
+        self.assertIsInstance(embeddings[1], RuntimeError)
+
+    def test_timed_out_texts_are_withdrawn(self):
+        """Texts still queued at the timeout are reported and never sent."""
+        coalescer = EmbeddingCoalescer(self.send, max_wait=0.5)
+
+        async def run():
+            embeddings = await coalescer.embed(["late"], [1], timeout=0.01)
+            await asyncio.sleep(0.6)
+            return embeddings
+
+        (embedding,) = asyncio.run(run())
+        self.assertIsInstance(embedding, asyncio.TimeoutError)
+        self.assertEqual(self.batches, [])
@@ -0,0 +1,67 @@
+"""Unit tests for the compact encodings of embeddings."""
+
+import json
+import math
+import random
+import unittest
+
+from VectorEmbed.encoding import EmbeddingEncoding, decode_embedding
+
+
+def _cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    return dot / math.sqrt(sum(x * x for x in a) * sum(y * y for y in b))
+
+
+class TestEmbeddingEncoding(unittest.TestCase):
+    """Validate that encoded embeddings stay within bounded error of the float32 reference."""
+
+    def setUp(self):
+        """Create random unit vectors shaped like text-embedding-ada-002 embeddings."""
+        rng = random.Random(42)
+        self.embeddings = []
+        for _ in range(8):
+            vector = [rng.gauss(0, 1) for _ in range(1536)]
+            norm = math.sqrt(sum(x * x for x in vector))
+            self.embeddings.append([x / norm for x in vector])
+
+    def assert_bounded_error(self, encoding, max_error):
+        """Every value is within max_error of the reference and the payload is smaller."""
+        for reference, data in zip(self.embeddings, encoding.encode(self.embeddings)):
+            decoded = decode_embedding(data)
+            self.assertEqual(len(decoded), len(reference))
+            self.assertLessEqual(max(abs(x - y) for x, y in zip(decoded, reference)), max_error(data))
+            self.assertGreater(_cosine(decoded, reference), 0.999)
+            self.assertLess(len(json.dumps(data["embedding"])), len(json.dumps(reference)))
+            self.assertEqual(data["embedding_encoding"], encoding.name)
+
+    def test_float32_is_unchanged(self):
+        """The default encoding returns the embeddings as they are."""
+        encoded = EmbeddingEncoding("float32").encode(self.embeddings)
+        self.assertEqual(encoded, [{"embedding": embedding} for embedding in self.embeddings])
+
+    def test_rounded(self):
+        """Rounded values are within half a unit of the last decimal place."""
+        for precision in [3, 5]:
+            encoding = EmbeddingEncoding("rounded", precision)
+            self.assert_bounded_error(encoding, lambda data: 0.5 * 10 ** -precision + 1e-12)
+
+    def test_float16(self):
+        """Half precision values, written with their shortest decimal representation, are within one float16 step."""
+        encoding = EmbeddingEncoding("float16")
+        self.assert_bounded_error(encoding, lambda data: 2 ** -10 * max(map(abs, data["embedding"])))
+
+    def test_int8(self):
+        """Quantized values are within half a quantization step."""
+        encoding = EmbeddingEncoding("int8")
+        self.assert_bounded_error(encoding, lambda data: data["embedding_scale"] / 2 + 1e-7)
+        for data in encoding.encode(self.embeddings):
+            self.assertTrue(all(isinstance(value, int) and -127 <= value <= 127 for value in data["embedding"]))
+
+    def test_from_headers(self):
+        """The encoding is read from the request headers and invalid values are rejected."""
+        encoding = EmbeddingEncoding.from_headers({"Embedding-Encoding": "Rounded", "Embedding-Precision": "4"})
+        self.assertEqual(encoding, EmbeddingEncoding("rounded", 4))
+        for headers in [{"Embedding-Encoding": "bfloat16"}, {"Embedding-Precision": "high"}]:
+            with self.assertRaises(ValueError):
+                EmbeddingEncoding.from_headers(headers)
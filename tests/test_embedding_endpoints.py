@@ -0,0 +1,131 @@
+"""Unit tests for the pool of embedding endpoints."""
+
+import asyncio
+import json
+import os
+import unittest
+from unittest import mock
+from unittest.mock import MagicMock
+
+import httpx
+import openai
+
+from VectorEmbed import endpoints
+from VectorEmbed.endpoints import EmbeddingEndpoint, EndpointPool, load_endpoints_from_environment
+
+_REQUEST = httpx.Request("POST", "https://localhost")
+
+
+def _raw_response(deployment):
+    raw_response = MagicMock(headers={})
+    raw_response.parse.return_value = deployment
+    return raw_response
+
+
+class TestEndpointPool(unittest.TestCase):
+    """Validate how requests are spread over the endpoints and moved away from failing ones."""
+
+    def setUp(self):
+        """Replace the Azure OpenAI clients by the name of their endpoint."""
+        patch = mock.patch.object(endpoints, "get_async_openai_client", lambda endpoint, api_key, api_version: endpoint)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.pool = EndpointPool(
+            [
+                EmbeddingEndpoint("https://a", "ada", tokens_per_minute=3000, requests_per_minute=100),
+                EmbeddingEndpoint("https://b", "ada", tokens_per_minute=1000, requests_per_minute=100),
+            ]
+        )
+
+    def run_requests(self, send, count, token_count=100):
+        """Send requests one after the other and return the deployments that served them."""
+        async def run_all():
+            return [await self.pool.run(send, token_count) for _ in range(count)]
+
+        return asyncio.run(run_all())
+
+    def test_spread_by_remaining_quota(self):
+        """Requests go to the endpoint with the most remaining quota, so the larger one serves more."""
+        served = []
+
+        async def send(client, deployment):
+            served.append(client)
+            return _raw_response(deployment)
+
+        self.run_requests(send, 8)
+        self.assertEqual(served.count("https://a"), 6)
+        self.assertEqual(served.count("https://b"), 2)
+        self.assertEqual(self.pool.get_stats()["https://a/ada"]["requests"], 6)
+
+    def test_fail_over_when_throttled(self):
+        """A throttled request is sent to the other endpoint without waiting."""
+        async def send(client, deployment):
+            if client == "https://a":
+                response = httpx.Response(429, headers={"retry-after": "30"}, request=_REQUEST)
+                raise openai.RateLimitError("Rate limit exceeded", response=response, body=None)
+            return _raw_response(client)
+
+        self.assertEqual(self.run_requests(send, 2), ["https://b", "https://b"])
+        self.assertEqual(self.pool.get_stats()["https://a/ada"]["throttled"], 1)
+
+    def test_fail_over_when_down(self):
+        """An endpoint that can't be reached is skipped while another one is available."""
+        async def send(client, deployment):
+            if client == "https://a":
+                raise openai.APIConnectionError(request=_REQUEST)
+            return _raw_response(client)
+
+        self.assertEqual(self.run_requests(send, 2), ["https://b", "https://b"])
+        self.assertEqual(self.pool.get_stats()["https://a/ada"]["errors"], 1)
+
+    def test_single_endpoint_retried_after_cooldown(self):
+        """Without another endpoint, a failed request is sent again after a cooldown growing with the attempts."""
+        failures = iter([openai.APIConnectionError(request=_REQUEST), openai.APITimeoutError(request=_REQUEST)])
+
+        async def send(client, deployment):
+            error = next(failures, None)
+            if error:
+                raise error
+            return _raw_response(client)
+
+        async def fail(client, deployment):
+            raise openai.APIConnectionError(request=_REQUEST)
+
+        cooldowns = []
+
+        def uniform(low, high):
+            cooldowns.append(high)
+            return high / 1000
+
+        single = EndpointPool([EmbeddingEndpoint("https://a", "ada")])
+        with mock.patch("VectorEmbed.scheduler.random.uniform", side_effect=uniform):
+            self.assertEqual(asyncio.run(single.run(send, 10)), "https://a")
+            self.assertEqual(cooldowns, [2, 4])
+            self.assertEqual(single.get_stats()["https://a/ada"]["errors"], 2)
+
+            with self.assertRaises(openai.APIConnectionError):
+                asyncio.run(EndpointPool([EmbeddingEndpoint("https://a", "ada")], max_attempts=3).run(fail, 10))
+
+
+class TestLoadEndpoints(unittest.TestCase):
+    """Validate the configuration of the endpoints by the app settings."""
+
+    def test_single_endpoint_by_default(self):
+        """Without a list, the single endpoint settings are used."""
+        settings = {"AZURE_OPENAI_ENDPOINT": "https://a", "AZURE_OPENAI_EMBEDDING_DEPLOYMENT": "ada"}
+        with mock.patch.dict(os.environ, settings):
+            os.environ.pop("AZURE_OPENAI_EMBEDDING_ENDPOINTS", None)
+            self.assertEqual([endpoint.name for endpoint in load_endpoints_from_environment()], ["https://a/ada"])
+
+    def test_list_of_endpoints(self):
+        """Entries of the list inherit the settings they don't override."""
+        configured = [{"endpoint": "https://b", "weight": 2, "tpm": 240000}, {"deployment": "ada-2"}]
+        settings = {
+            "AZURE_OPENAI_ENDPOINT": "https://a",
+            "AZURE_OPENAI_EMBEDDING_DEPLOYMENT": "ada",
+            "AZURE_OPENAI_EMBEDDING_ENDPOINTS": json.dumps(configured),
+        }
+        with mock.patch.dict(os.environ, settings):
+            loaded = load_endpoints_from_environment()
+        self.assertEqual([endpoint.name for endpoint in loaded], ["https://b/ada", "https://a/ada-2"])
+        self.assertEqual((loaded[0].weight, loaded[0].tokens_per_minute), (2.0, 240000))
@@ -0,0 +1,113 @@
+"""Unit tests for the rate-limit-aware embedding scheduler."""
+
+import asyncio
+import gc
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+import openai
+
+from VectorEmbed.scheduler import EmbeddingScheduler, TokenBucket, is_transient_error
+
+
+def _rate_limit_error(retry_after: str) -> openai.RateLimitError:
+    response = httpx.Response(
+        429, headers={"retry-after": retry_after}, request=httpx.Request("POST", "https://localhost")
+    )
+    return openai.RateLimitError("Rate limit exceeded", response=response, body=None)
+
+
+def _status_error(status_code: int) -> openai.APIStatusError:
+    response = httpx.Response(status_code, request=httpx.Request("POST", "https://localhost"))
+    error_class = openai.InternalServerError if status_code >= 500 else openai.APIStatusError
+    return error_class(f"Error {status_code}", response=response, body=None)
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Validate the reservations of the token bucket."""
+
+    def test_no_wait_within_capacity(self):
+        """Reservations covered by the bucket level don't wait."""
+        bucket = TokenBucket(capacity_per_minute=600)
+        self.assertEqual(bucket.reserve(600), 0)
+
+    def test_wait_proportional_to_deficit(self):
+        """Reservations beyond the level wait until the bucket refills."""
+        bucket = TokenBucket(capacity_per_minute=600)
+        bucket.reserve(600)
+        self.assertAlmostEqual(bucket.reserve(60), 6, delta=0.1)
+
+
+class TestEmbeddingScheduler(unittest.TestCase):
+    """Validate retries of throttled requests."""
+
+    def test_retries_after_server_hint(self):
+        """A throttled request is retried and the parsed response is returned."""
+        raw_response = MagicMock(headers={})
+        raw_response.parse.return_value = "parsed"
+        call = MagicMock(side_effect=[_rate_limit_error("0.01"), raw_response])
+
+        async def send():
+            return call()
+
+        scheduler = EmbeddingScheduler(tokens_per_minute=1000, requests_per_minute=100, max_in_flight=1)
+        result = asyncio.run(scheduler.run(send, token_count=10))
+
+        self.assertEqual(result, "parsed")
+        self.assertEqual(scheduler.get_stats()["throttled"], 1)
+        self.assertEqual(call.call_count, 2)
+
+    def test_gives_up_after_max_attempts(self):
+        """The last rate limit error is raised when all attempts are throttled."""
+        async def send():
+            raise _rate_limit_error("0")
+
+        scheduler = EmbeddingScheduler(max_attempts=2)
+        with self.assertRaises(openai.RateLimitError):
+            asyncio.run(scheduler.run(send, token_count=10))
+
+    def test_semaphores_released_with_their_loop(self):
+        """Every event loop gets its own semaphore, which is dropped when the loop is garbage collected."""
+        raw_response = MagicMock(headers={})
+
+        async def send():
+            return raw_response
+
+        scheduler = EmbeddingScheduler(max_in_flight=1)
+        for _ in range(3):
+            asyncio.run(scheduler.run(send, token_count=10))
+        gc.collect()
+        self.assertEqual(len(scheduler._semaphores), 0)
+        self.assertEqual(scheduler.get_stats()["requests"], 3)
+
+    def test_retries_transient_errors(self):
+        """Connection errors, timeouts, server errors and 408/409 are retried, other errors are raised at once."""
+        request = httpx.Request("POST", "https://localhost")
+        transient = [
+            openai.APIConnectionError(request=request),
+            openai.APITimeoutError(request=request),
+            _status_error(500),
+            _status_error(503),
+            _status_error(408),
+            _status_error(409),
+        ]
+        self.assertTrue(all(is_transient_error(error) for error in transient))
+        self.assertFalse(is_transient_error(_status_error(400)))
+
+        raw_response = MagicMock(headers={})
+        raw_response.parse.return_value = "parsed"
+        call = MagicMock(side_effect=transient + [raw_response])
+
+        async def send():
+            return call()
+
+        scheduler = EmbeddingScheduler()
+        with patch("VectorEmbed.scheduler.random.uniform", return_value=0):
+            self.assertEqual(asyncio.run(scheduler.run(send, token_count=10)), "parsed")
+        self.assertEqual(scheduler.get_stats()["retried"], len(transient))
+
+        call = MagicMock(side_effect=[_status_error(400), raw_response])
+        with self.assertRaises(openai.APIStatusError):
+            asyncio.run(scheduler.run(send, token_count=10))
+        self.assertEqual(call.call_count, 1)
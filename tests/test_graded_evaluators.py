@@ -0,0 +1,57 @@
+"""Unit tests for the graded-relevance search evaluators."""
+
+import math
+import unittest
+
+from src.evaluation.evaluators.search.gains import NeighborPageGain
+from src.evaluation.evaluators.search.graded_ranking import discounts, evaluate_graded_batch
+from src.evaluation.evaluators.search.map_at_k import MAPAtKEvaluator
+from src.evaluation.evaluators.search.ndcg_at_k import NDCGAtKEvaluator
+from tests.test_search_evaluators import _random_rows
+
+
+def _documents(*pages, filename="plan.pdf"):
+    """Build documents of the same file."""
+    return [{"filename": filename, "page_number": page} for page in pages]
+
+
+class TestGradedEvaluators(unittest.TestCase):
+    """Validate NDCG @ K and MAP @ K with binary and graded gains."""
+
+    def test_binary_ndcg(self):
+        """A single relevant document at rank 2 is discounted by log2(3), duplicates get no extra credit."""
+        ground_truth = _documents(3)
+        self.assertAlmostEqual(NDCGAtKEvaluator(k=3).evaluate(_documents(1, 3), ground_truth), 1 / math.log2(3))
+        self.assertAlmostEqual(NDCGAtKEvaluator(k=3).evaluate(_documents(3, 3, 3), ground_truth), 1.0)
+        self.assertEqual(NDCGAtKEvaluator(k=1)(search_result=_documents(1, 3), ground_truth=ground_truth),
+                         {"ndcg_at_1": 0.0})
+        self.assertEqual(NDCGAtKEvaluator(k=3)(search_result=[], ground_truth=ground_truth), {"ndcg_at_3": 0})
+
+    def test_neighbor_page_gain(self):
+        """A neighboring page gets partial credit, unless the exact page is ranked too."""
+        evaluator = NDCGAtKEvaluator(k=2, gain=NeighborPageGain(partial=0.5))
+        ground_truth = _documents(3)
+        self.assertAlmostEqual(evaluator.evaluate(_documents(4, 9), ground_truth), 0.5)
+        self.assertAlmostEqual(evaluator.evaluate(_documents(4, 3), ground_truth), 1 / math.log2(3))
+        self.assertAlmostEqual(evaluator.evaluate(_documents(4, filename="other.pdf"), ground_truth), 0.0)
+
+    def test_map_at_k(self):
+        """AP @ K is normalized by the number of ground truth documents that fit in the top K."""
+        ground_truth = _documents(1, 2, 3, 4)
+        # Hits at ranks 1 and 3: (1 / 1 + 2 / 3) / min(3, 4)
+        self.assertAlmostEqual(MAPAtKEvaluator(k=3).evaluate(_documents(1, 9, 2), ground_truth), (1 + 2 / 3) / 3)
+        self.assertEqual(MAPAtKEvaluator(k=3)(search_result=_documents(1), ground_truth=[]), {"map_at_3": 0})
+
+    def test_batch_matches_evaluators(self):
+        """Batch evaluation gives the values of the evaluators for every row, and the discounts grow on demand."""
+        gain = NeighborPageGain(partial=0.3)
+        rows = _random_rows(300, seed=3)
+        metrics = evaluate_graded_batch(rows, ks=(3, 10), gain=gain)
+        for i, (search_result, ground_truth) in enumerate(rows):
+            for k in (3, 10):
+                self.assertAlmostEqual(metrics[f"ndcg_at_{k}"][i],
+                                       NDCGAtKEvaluator(k, gain).evaluate(search_result, ground_truth))
+                self.assertAlmostEqual(metrics[f"map_at_{k}"][i],
+                                       MAPAtKEvaluator(k, gain).evaluate(search_result, ground_truth))
+                self.assertLessEqual(metrics[f"ndcg_at_{k}"][i], 1 + 1e-9)
+        self.assertAlmostEqual(discounts(1000)[999], 1 / math.log2(1001))
@@ -0,0 +1,139 @@
+"""Unit tests for the local evaluation runner."""
+
+import json
+import math
+import os
+import tempfile
+import unittest
+
+from src.evaluation.evaluators.search.gains import NeighborPageGain
+from src.evaluation.evaluators.search.map_at_k import MAPAtKEvaluator
+from src.evaluation.evaluators.search.ndcg_at_k import NDCGAtKEvaluator
+from src.evaluation.evaluators.search.reciprocal_rank import ReciprocalRankEvaluator
+from src.evaluation.evaluators.search.recall_at_k import RecallAtKEvaluator
+from src.evaluation.local_evaluation import evaluate_locally
+
+EVALUATORS = {"Recall@3": RecallAtKEvaluator(k=3), "MRR": ReciprocalRankEvaluator()}
+EVALUATOR_CONFIG = {
+    "default": {"column_mapping": {"search_result": "${target.search_result}", "ground_truth": "${data.sources}"}}
+}
+
+
+def search_target(question):
+    """Return one relevant result for even question numbers, in second position for multiples of 3."""
+    number = int(question.split()[-1])
+    relevant = {"filename": "doc.pdf", "page_number": number}
+    other = {"filename": "other.pdf", "page_number": 1}
+    if number % 2:
+        return {"search_result": [other], "error": None}
+    return {"search_result": [other, relevant] if number % 3 == 0 else [relevant], "error": None}
+
+
+class TestLocalEvaluation(unittest.TestCase):
+    """Validate the results written by the local evaluation runner."""
+
+    def setUp(self):
+        """Write a ground truth dataset to a temporary folder."""
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.data = os.path.join(self.folder.name, "gt.jsonl")
+        with open(self.data, "w", encoding="utf-8") as f:
+            for i in range(25):
+                row = {"question": f"question {i}", "sources": [{"filename": "DOC.pdf", "page_number": str(i)}]}
+                f.write(json.dumps(row) + "\n")
+
+    def _evaluate(self, max_workers):
+        return evaluate_locally(
+            data=self.data,
+            evaluators=EVALUATORS,
+            evaluator_config=EVALUATOR_CONFIG,
+            target=search_target,
+            output_path=os.path.join(self.folder.name, f"results_{max_workers}"),
+            shard_size=4,
+            max_workers=max_workers,
+        )
+
+    def test_rows_and_metrics(self):
+        """Every row gets the inputs, the target outputs and the metrics, and the metrics are averaged."""
+        results = self._evaluate(max_workers=0)
+        self.assertEqual(results["rows"], 25)
+        with open(results["rows_path"], encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([row["inputs.question"] for row in rows], [f"question {i}" for i in range(25)])
+        self.assertEqual(rows[1]["outputs.Recall@3.recall_at_3"], 0)
+        self.assertEqual(rows[6]["outputs.MRR.reciprocal_rank"], 0.5)
+        self.assertEqual(rows[2]["outputs.search_result"], [{"filename": "doc.pdf", "page_number": 2}])
+
+        # 13 even question numbers out of 25, 5 of them multiples of 3 (0, 6, 12, 18, 24)
+        self.assertAlmostEqual(results["metrics"]["Recall@3.recall_at_3"], 13 / 25)
+        self.assertAlmostEqual(results["metrics"]["MRR.reciprocal_rank"], (8 + 5 * 0.5) / 25)
+        with open(results["metrics_path"], encoding="utf-8") as f:
+            self.assertEqual(json.load(f), {"metrics": results["metrics"], "rows": 25})
+
+    def test_process_pool_matches_in_process(self):
+        """Sharding the rows across worker processes gives the same rows in the same order."""
+        in_process = self._evaluate(max_workers=0)
+        pooled = self._evaluate(max_workers=2)
+        self.assertEqual(pooled["metrics"], in_process["metrics"])
+        with open(in_process["rows_path"], encoding="utf-8") as f, open(pooled["rows_path"], encoding="utf-8") as g:
+            self.assertEqual(f.read(), g.read())
+
+    def test_graded_evaluators(self):
+        """NDCG and MAP with partial credit for nearby pages run with the default mapping in worker processes."""
+        results = evaluate_locally(
+            data=self.data,
+            evaluators={
+                "NDCG@10": NDCGAtKEvaluator(k=10, gain=NeighborPageGain()),
+                "MAP@10": MAPAtKEvaluator(k=10, gain=NeighborPageGain()),
+            },
+            evaluator_config=EVALUATOR_CONFIG,
+            target=search_target,
+            output_path=self.folder.name,
+            shard_size=4,
+            max_workers=2,
+        )
+        self.assertAlmostEqual(results["metrics"]["NDCG@10.ndcg_at_10"], (8 + 5 / math.log2(3)) / 25)
+        self.assertAlmostEqual(results["metrics"]["MAP@10.map_at_10"], (8 + 5 * 0.5) / 25)
+
+    def test_inputs_mapped_by_name(self):
+        """Inputs without a column mapping take the target output or the data column of the same name."""
+        def sources_found(search_result, sources, k=3):
+            return {"found": RecallAtKEvaluator(k).evaluate(search_result, sources)}
+
+        results = evaluate_locally(
+            data=self.data,
+            evaluators={"Recall@3": EVALUATORS["Recall@3"], "Found": sources_found},
+            evaluator_config={"Recall@3": EVALUATOR_CONFIG["default"]},
+            target=search_target,
+            output_path=self.folder.name,
+            max_workers=0,
+        )
+        self.assertAlmostEqual(results["metrics"]["Found.found"], results["metrics"]["Recall@3.recall_at_3"])
+
+    def test_missing_input_fails(self):
+        """An input missing from the rows stops the evaluation instead of dropping the metric."""
+        for column_mapping in [{"search_result": "${target.missing}"}, {"search_result": "${target.search_result}"}]:
+            with self.assertRaisesRegex(ValueError, "evaluator Recall@3"):
+                evaluate_locally(
+                    data=self.data,
+                    evaluators=EVALUATORS,
+                    evaluator_config={"default": {"column_mapping": column_mapping}},
+                    target=search_target,
+                    output_path=self.folder.name,
+                    max_workers=0,
+                )
+
+    def test_failing_evaluator_is_skipped(self):
+        """An evaluator failing on a row leaves the other metrics of the row."""
+        def failing(search_result, ground_truth):
+            raise RuntimeError("failed")
+
+        results = evaluate_locally(
+            data=self.data,
+            evaluators={**EVALUATORS, "Failing": failing},
+            evaluator_config=EVALUATOR_CONFIG,
+            target=search_target,
+            output_path=self.folder.name,
+            max_workers=0,
+        )
+        self.assertEqual(sorted(results["metrics"]), ["MRR.reciprocal_rank", "Recall@3.recall_at_3"])
@@ -0,0 +1,80 @@
+"""Unit tests for the near-duplicate chunk detection."""
+
+import importlib
+import os
+import random
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from Chunk import near_duplicates
+from Chunk.near_duplicates import NearDuplicateDetector, remove_near_duplicates
+
+
+def _text(seed, words=150):
+    rng = random.Random(seed)
+    return " ".join(f"word{rng.randrange(5000)}" for _ in range(words))
+
+
+class TestNearDuplicates(unittest.TestCase):
+    """Validate the detection of near-duplicate chunks and the provenance of the chunks they stand for."""
+
+    def setUp(self):
+        """Create a chunk, a near copy with one word changed and an unrelated chunk."""
+        self.original = _text(1)
+        words = self.original.split()
+        words[75] = "changed"
+        self.near_copy = " ".join(words)
+        self.unrelated = _text(2)
+
+    def documents(self):
+        """Return two documents sharing a near-duplicate chunk."""
+        return [
+            ("standard.pdf", [{"page_content": self.original, "page": 3}, {"page_content": self.unrelated, "page": 4}]),
+            ("plus.pdf", [{"page_content": self.near_copy, "page": 5}]),
+        ]
+
+    def test_detector(self):
+        """A near copy is found, an unrelated text is not."""
+        detector = NearDuplicateDetector(threshold=0.9)
+        detector.add(0, detector.signature(self.original))
+        self.assertEqual(detector.find(detector.signature(self.near_copy)), 0)
+        self.assertIsNone(detector.find(detector.signature(self.unrelated)))
+
+    def test_threshold(self):
+        """A near copy is found at its estimated similarity, and not at the next possible similarity above it."""
+        detector = NearDuplicateDetector(threshold=0.9)
+        original, near_copy = detector.signature(self.original), detector.signature(self.near_copy)
+        detector.add(0, original)
+        similarity = float(np.mean(original == near_copy))
+        self.assertTrue(0.9 < similarity < 1)
+
+        # The LSH bands of the 0.9 threshold make the near copy a candidate, so only the threshold decides
+        for threshold, expected in [(0.9, 0), (similarity, 0), (similarity + 1 / len(original), None), (1, None)]:
+            detector.threshold = threshold
+            self.assertEqual(detector.find(near_copy), expected)
+
+    def test_drop_keeps_provenance(self):
+        """Dropped chunks are listed by the chunk that stands for them."""
+        chunk_lists, stats = remove_near_duplicates(self.documents(), "drop", threshold=0.9)
+        self.assertEqual([len(chunks) for chunks in chunk_lists], [2, 0])
+        self.assertEqual(chunk_lists[0][0]["duplicates"], [{"filename": "plus.pdf", "page": 5}])
+        self.assertNotIn("duplicates", chunk_lists[0][1])
+        self.assertEqual(stats, {"chunks": 3, "near_duplicates": 1, "characters": len(self.near_copy)})
+
+    def test_flag(self):
+        """Flagged chunks are kept and point to the chunk they duplicate."""
+        documents = self.documents() + [("failed.pdf", None)]
+        chunk_lists, _ = remove_near_duplicates(documents, "flag", threshold=0.9)
+        self.assertEqual(chunk_lists[1][0]["duplicate_of"], {"filename": "standard.pdf", "page": 3})
+        self.assertIsNone(chunk_lists[2])
+
+    def test_invalid_settings_fail_at_import(self):
+        """A misspelled mode or an invalid threshold fails when the module is imported."""
+        try:
+            for setting, value in [("CHUNK_NEAR_DUPLICATES", "flg"), ("CHUNK_NEAR_DUPLICATE_THRESHOLD", "90")]:
+                with patch.dict(os.environ, {setting: value}), self.assertRaises(ValueError):
+                    importlib.reload(near_duplicates)
+        finally:
+            importlib.reload(near_duplicates)
@@ -0,0 +1,45 @@
+"""Unit tests for the extraction of PDF pages on a process pool."""
+
+import glob
+import io
+import multiprocessing
+import os
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from Chunk.parallel_extraction import MemoryViewStream
+from Chunk.pdf_loader import iter_pdf_pages
+
+DATA_FOLDER = os.path.join(os.path.dirname(__file__), "..", "data")
+
+
+class TestMemoryViewStream(unittest.TestCase):
+    """Validate the stream reading a memoryview in place."""
+
+    def test_read_and_seek(self):
+        """Reads and seeks behave like a BytesIO over the same bytes."""
+        data = bytes(range(100))
+        stream = MemoryViewStream(memoryview(data))
+        expected = io.BytesIO(data)
+        for offset, whence, size in [(0, io.SEEK_SET, 10), (5, io.SEEK_CUR, 20), (-8, io.SEEK_END, 50)]:
+            self.assertEqual(stream.seek(offset, whence), expected.seek(offset, whence))
+            self.assertEqual(stream.read(size), expected.read(size))
+            self.assertEqual(stream.tell(), expected.tell())
+        self.assertEqual(stream.read(), b"")
+
+
+class TestParallelExtraction(unittest.TestCase):
+    """Validate that pages extracted on a process pool match the sequential extraction."""
+
+    def test_same_pages_in_order(self):
+        """Page texts and page numbers are the same as in the calling thread."""
+        file_path = max(glob.glob(os.path.join(DATA_FOLDER, "*.pdf")), key=os.path.getsize)
+        with open(file_path, "rb") as f:
+            expected = [(page.page_content, page.metadata) for page in iter_pdf_pages(f, "file.pdf")]
+
+        with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as executor:
+            with open(file_path, "rb") as f:
+                actual = [(page.page_content, page.metadata) for page in iter_pdf_pages(f, "file.pdf", None, executor)]
+
+        self.assertGreaterEqual(len(expected), 32)
+        self.assertEqual(actual, expected)
@@ -0,0 +1,93 @@
+"""Unit tests for the search evaluators and the shared ranking engine."""
+
+import random
+import unittest
+
+from src.evaluation.evaluators.search.average_precision import AveragePrecisionEvaluator
+from src.evaluation.evaluators.search.f1_at_k import F1AtKEvaluator
+from src.evaluation.evaluators.search.precision_at_k import PrecisionAtKEvaluator
+from src.evaluation.evaluators.search.recall_at_k import RecallAtKEvaluator
+from src.evaluation.evaluators.search.ranking import evaluate_batch
+from src.evaluation.evaluators.search.reciprocal_rank import ReciprocalRankEvaluator
+
+
+def _reference_metrics(search_result, ground_truth, k):
+    """Compute the metrics like the original list-based evaluators did."""
+    gt = [(d["filename"].lower(), str(d["page_number"])) for d in ground_truth]
+    results = [(d["filename"].lower(), str(d["page_number"])) for d in search_result]
+    top_k = results[:k]
+    if not gt or not results:
+        return {"precision": 0, "recall": 0, "f1": 0, "ap": 0, "rr": 0}
+
+    precision = len([sr for sr in top_k if sr in gt]) / len(top_k)
+    recall = len(set(top_k) & set(gt)) / len(set(gt))
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0
+    correct = [sr in gt for sr in results]
+    ap = sum(sum(correct[:i + 1]) / (i + 1) * correct[i] for i in range(len(results))) / len(gt)
+    rr = next((1 / (i + 1) for i, sr in enumerate(results) if sr in gt), 0)
+    return {"precision": precision, "recall": recall, "f1": f1, "ap": ap, "rr": rr}
+
+
+def _random_rows(count, seed=0, depth=12, pages=4):
+    """Generate rows with duplicates, mixed case filenames and integer or string page numbers."""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        def document():
+            filename = rng.choice(["a.pdf", "A.pdf", "b.pdf"])
+            page = rng.randint(1, pages)
+            return {"filename": filename, "page_number": rng.choice([page, str(page)])}
+
+        search_result = [document() for _ in range(rng.randint(0, depth))]
+        rows.append((search_result, [document() for _ in range(rng.randint(0, 3))]))
+    return rows
+
+
+class TestSearchEvaluators(unittest.TestCase):
+    """Validate that the evaluators keep the semantics of the original implementations."""
+
+    def test_evaluators_match_reference(self):
+        """Every evaluator gives the same value as the original implementation."""
+        for search_result, ground_truth in _random_rows(300):
+            for k in (1, 3, 5, 10):
+                expected = _reference_metrics(search_result, ground_truth, k)
+                self.assertAlmostEqual(PrecisionAtKEvaluator(k).evaluate(search_result, ground_truth),
+                                       expected["precision"])
+                self.assertAlmostEqual(RecallAtKEvaluator(k).evaluate(search_result, ground_truth), expected["recall"])
+                self.assertAlmostEqual(F1AtKEvaluator(k).evaluate(search_result, ground_truth), expected["f1"])
+            self.assertAlmostEqual(AveragePrecisionEvaluator().evaluate(search_result, ground_truth), expected["ap"])
+            self.assertAlmostEqual(ReciprocalRankEvaluator().evaluate(search_result, ground_truth), expected["rr"])
+
+    def test_deep_results_match_reference(self):
+        """Metrics of deep result lists, as used for recall analysis, match the original implementation."""
+        for search_result, ground_truth in _random_rows(5, seed=2, depth=1000, pages=200):
+            expected = _reference_metrics(search_result, ground_truth, 100)
+            self.assertAlmostEqual(RecallAtKEvaluator(100).evaluate(search_result, ground_truth), expected["recall"])
+            self.assertAlmostEqual(AveragePrecisionEvaluator().evaluate(search_result, ground_truth), expected["ap"])
+            self.assertAlmostEqual(ReciprocalRankEvaluator().evaluate(search_result, ground_truth), expected["rr"])
+
+    def test_evaluator_outputs(self):
+        """The evaluators return their metric under the same names, with 0 for empty search results."""
+        search_result = [{"filename": "PerksPlus.pdf", "page_number": 3}, {"filename": "other.pdf", "page_number": 1}]
+        ground_truth = [{"filename": "perksplus.pdf", "page_number": "3"}]
+        self.assertEqual(PrecisionAtKEvaluator(k=5)(search_result=search_result, ground_truth=ground_truth),
+                         {"precision_at_5": 0.5})
+        self.assertEqual(F1AtKEvaluator(k=3)(search_result=[], ground_truth=ground_truth), {"f1_score_at_3": 0})
+        self.assertEqual(ReciprocalRankEvaluator()(search_result=search_result, ground_truth=ground_truth),
+                         {"reciprocal_rank": 1.0})
+
+    def test_batch_matches_evaluators(self):
+        """Batch evaluation gives the values of the evaluators for every row."""
+        rows = _random_rows(200, seed=1)
+        metrics = evaluate_batch(rows, ks=(3, 10))
+        for i, (search_result, ground_truth) in enumerate(rows):
+            self.assertAlmostEqual(metrics["recall_at_3"][i],
+                                   RecallAtKEvaluator(3).evaluate(search_result, ground_truth))
+            self.assertAlmostEqual(metrics["precision_at_10"][i],
+                                   PrecisionAtKEvaluator(10).evaluate(search_result, ground_truth))
+            self.assertAlmostEqual(metrics["f1_score_at_3"][i], F1AtKEvaluator(3).evaluate(search_result, ground_truth))
+            self.assertAlmostEqual(metrics["average_precision"][i],
+                                   AveragePrecisionEvaluator().evaluate(search_result, ground_truth))
+            self.assertAlmostEqual(metrics["reciprocal_rank"][i],
+                                   ReciprocalRankEvaluator().evaluate(search_result, ground_truth))
+        self.assertEqual(len(evaluate_batch([])["average_precision"]), 0)
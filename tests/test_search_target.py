@@ -0,0 +1,124 @@
+"""Unit tests for the concurrent search evaluation target and its adaptive limiter."""
+
+import pickle
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import requests
+from azure.core.exceptions import HttpResponseError
+
+from src.evaluation.targets.adaptive_limiter import AdaptiveConcurrencyLimiter
+from src.evaluation.targets.search_evaluation_target import SearchEvaluationTarget
+
+
+def _http_error(status_code, headers=None):
+    response = SimpleNamespace(status_code=status_code, reason="error", headers=headers or {})
+    return HttpResponseError(message=f"status {status_code}", response=response)
+
+
+class TestAdaptiveConcurrencyLimiter(unittest.TestCase):
+    """Validate the backoff of the limiter."""
+
+    def test_throttled_requests_are_retried(self):
+        """A throttled request is retried after the retry hint, and halves the concurrency limit."""
+        limiter = AdaptiveConcurrencyLimiter(max_concurrency=8)
+        responses = iter([_http_error(429, {"retry-after-ms": "20"}), _http_error(503), "ok"])
+
+        def call():
+            response = next(responses)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        with patch("src.evaluation.targets.adaptive_limiter.random.uniform", return_value=0.01):
+            start = time.monotonic()
+            self.assertEqual(limiter.run(call), "ok")
+        self.assertGreaterEqual(time.monotonic() - start, 0.03)
+        self.assertEqual(limiter.get_stats(), {"requests": 1, "throttled": 2, "limit": 2})
+
+        # Successful requests grow the limit back to the cap
+        for _ in range(100):
+            limiter.run(lambda: None)
+        self.assertEqual(limiter.get_stats()["limit"], 8)
+
+    def test_other_errors_are_raised(self):
+        """Errors other than throttling are raised without retrying, and the limit is released."""
+        limiter = AdaptiveConcurrencyLimiter(max_concurrency=1)
+        with self.assertRaises(HttpResponseError):
+            limiter.run(lambda: (_ for _ in ()).throw(_http_error(400)))
+        with self.assertRaises(HttpResponseError):
+            AdaptiveConcurrencyLimiter(max_concurrency=1, max_attempts=1).run(
+                lambda: (_ for _ in ()).throw(_http_error(429))
+            )
+        self.assertEqual(limiter.run(lambda: "ok"), "ok")
+
+
+class TestSearchEvaluationTarget(unittest.TestCase):
+    """Validate the batch API of the search target."""
+
+    def test_batch_keeps_order_and_contract(self):
+        """Queries run concurrently up to the cap, and every query gets its own result or error."""
+        target = SearchEvaluationTarget("index", "semantic", "https://search.example.net", "key", max_concurrency=4)
+        lock = threading.Lock()
+        state = {"in_flight": 0, "max_in_flight": 0}
+
+        def search(query, top):
+            with lock:
+                state["in_flight"] += 1
+                state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            time.sleep(0.01)
+            with lock:
+                state["in_flight"] -= 1
+            if query == "question 7":
+                raise ValueError("bad query")
+            return [{"filename": query, "page_number": top}]
+
+        with patch.object(target, "_search", side_effect=search):
+            results = target.batch([{"query": f"question {i}", "top": i} for i in range(20)])
+
+        self.assertEqual(results[7], {"error": "bad query", "search_result": []})
+        for i, result in enumerate(results):
+            if i != 7:
+                expected = [{"filename": f"question {i}", "page_number": i}]
+                self.assertEqual(result, {"error": "", "search_result": expected})
+        self.assertGreater(state["max_in_flight"], 1)
+        self.assertLessEqual(state["max_in_flight"], 4)
+
+    def test_client_retries_unthrottled_errors(self):
+        """The search client retries transient errors itself, and leaves throttled responses to the limiter."""
+        target = SearchEvaluationTarget("index", "semantic", "https://search.example.net", "key")
+        status_codes = iter([500, 504, 429])
+        sent = []
+
+        def send(session, request, **kwargs):
+            response = requests.Response()
+            response.status_code = next(status_codes)
+            response.headers["content-type"] = "application/json"
+            response._content = b"{}"
+            response.raw, response.url, response.request = MagicMock(), request.url, request
+            sent.append(response.status_code)
+            return response
+
+        with patch("requests.Session.send", send), patch("time.sleep"):
+            with self.assertRaises(HttpResponseError) as raised:
+                list(target.search_client.search("question"))
+        self.assertEqual(raised.exception.status_code, 429)
+        self.assertEqual(sent, [500, 504, 429])
+
+    def test_pickle_round_trip(self):
+        """A pickled target is restored with its configuration and new connections."""
+        target = SearchEvaluationTarget("index", "semantic", "https://search.example.net", "key", max_concurrency=4)
+        restored = pickle.loads(pickle.dumps(target))
+        self.assertEqual(
+            (restored.index_name, restored.semantic_config, restored.endpoint, restored.max_concurrency),
+            ("index", "semantic", "https://search.example.net", 4),
+        )
+        self.assertIsNot(restored.search_client, target.search_client)
+        self.assertEqual(restored.limiter.max_concurrency, 4)
+
+        with patch.object(restored, "_search", return_value=[{"filename": "a.pdf", "page_number": 1}]):
+            self.assertEqual(restored.batch([{"query": "question"}]),
+                             [{"error": "", "search_result": [{"filename": "a.pdf", "page_number": 1}]}])
@@ -0,0 +1,98 @@
+"""Unit tests for the built-in recursive text splitter."""
+
+import glob
+import os
+import unittest
+
+from langchain.docstore.document import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from Chunk.pdf_loader import parse_pdf_pages
+from Chunk.text_splitter import RecursiveTextSplitter
+
+DATA_FOLDER = os.path.join(os.path.dirname(__file__), "..", "data")
+
+
+class TestRecursiveTextSplitter(unittest.TestCase):
+    """Validate that the splitter gives the same output as langchain's splitter."""
+
+    def assert_same_chunks(self, text, **kwargs):
+        """Compare the chunks of both splitters for the same parameters."""
+        expected = RecursiveCharacterTextSplitter(**kwargs).split_text(text)
+        actual = RecursiveTextSplitter(**kwargs).split_text(text)
+        self.assertEqual(actual, expected)
+
+    def test_same_output_for_pdf_pages(self):
+        """Chunks of the sample PDF documents match langchain's chunks."""
+        for file_path in glob.glob(os.path.join(DATA_FOLDER, "*.pdf")):
+            with open(file_path, "rb") as f:
+                pages = parse_pdf_pages(f, os.path.basename(file_path))
+            for page in pages:
+                self.assert_same_chunks(page.page_content, chunk_size=1000, chunk_overlap=100)
+                self.assert_same_chunks(page.page_content, chunk_size=120, chunk_overlap=30)
+
+    def test_same_output_for_edge_cases(self):
+        """Leading, repeated and missing separators are handled like langchain does."""
+        texts = ["", "   ", "\n\nabc\n\n\n\ndef ghi", "a" * 50, "word " * 40, "x\ny\n\nz " * 20]
+        for text in texts:
+            self.assert_same_chunks(text, chunk_size=10, chunk_overlap=3)
+            self.assert_same_chunks(text, chunk_size=10, chunk_overlap=0, separators=["\n", " "])
+
+    def test_custom_length_function(self):
+        """Sizes can be measured with any length function, e.g. a tokenizer."""
+        def length(text):
+            return len(text.split())
+
+        text = "one two three four five six seven eight nine ten " * 5
+        expected = RecursiveCharacterTextSplitter(chunk_size=8, chunk_overlap=2, length_function=length)
+        actual = RecursiveTextSplitter(chunk_size=8, chunk_overlap=2, length_function=length)
+        self.assertEqual(actual.split_text(text), expected.split_text(text))
+
+    def test_offsets_point_into_text(self):
+        """Offsets address the chunks in the original text."""
+        text = "first paragraph\n\nsecond paragraph\n\nthird paragraph"
+        splitter = RecursiveTextSplitter(chunk_size=20, chunk_overlap=0)
+        for (start, end), chunk in zip(splitter.split_text_with_offsets(text), splitter.split_text(text)):
+            self.assertEqual(text[start:end], chunk)
+
+    def test_overlap_larger_than_chunk(self):
+        """An overlap larger than the chunk size is rejected."""
+        with self.assertRaises(ValueError):
+            RecursiveTextSplitter(chunk_size=10, chunk_overlap=20)
+
+    def test_iter_split_documents_matches_split_documents(self):
+        """Splitting lazily without carried overlap gives the same chunks as splitting all documents at once."""
+        file_path = sorted(glob.glob(os.path.join(DATA_FOLDER, "*.pdf")))[0]
+        with open(file_path, "rb") as f:
+            pages = parse_pdf_pages(f, os.path.basename(file_path))
+        splitter = RecursiveTextSplitter(chunk_size=300, chunk_overlap=50)
+        expected = [(chunk.page_content, chunk.metadata) for chunk in splitter.split_documents(pages)]
+        actual = [(chunk.page_content, chunk.metadata) for chunk in splitter.iter_split_documents(iter(pages))]
+        self.assertEqual(actual, expected)
+
+    def test_iter_split_documents_carries_overlap(self):
+        """The end of a page is prepended to the next page, cut at a word boundary."""
+        pages = [
+            Document(page_content="alpha beta gamma delta", metadata={"page": 0}),
+            Document(page_content="   ", metadata={"page": 1}),
+            Document(page_content="epsilon zeta", metadata={"page": 2}),
+        ]
+        splitter = RecursiveTextSplitter(chunk_size=30, chunk_overlap=12)
+        chunks = list(splitter.iter_split_documents(pages, carry_overlap=True))
+        self.assertEqual(
+            [chunk.page_content for chunk in chunks], ["alpha beta gamma delta", "gamma delta\nepsilon zeta"]
+        )
+        self.assertEqual([chunk.metadata["page"] for chunk in chunks], [0, 2])
+
+    def test_iter_document_chunks_offsets(self):
+        """Offsets address the chunks in their page, and are negative for text carried over from the previous page."""
+        pages = [
+            Document(page_content="alpha beta gamma delta", metadata={"page": 0}),
+            Document(page_content="epsilon zeta", metadata={"page": 1}),
+        ]
+        splitter = RecursiveTextSplitter(chunk_size=30, chunk_overlap=12)
+        for carry_overlap in [False, True]:
+            for page, chunk, start, end in splitter.iter_document_chunks(pages, carry_overlap):
+                self.assertEqual(page.page_content[max(0, start):end], chunk[len(chunk) - (end - max(0, start)):])
+        _, chunk, start, end = list(splitter.iter_document_chunks(pages, carry_overlap=True))[-1]
+        self.assertEqual((chunk, start, end), ("gamma delta\nepsilon zeta", -12, 12))